@@ -1,5 +1,6 @@
 # SPDX-License-Identifier: GPL-2.0
 
+import concurrent.futures
 import os
 
 debug_do_print = False
@@ -20,6 +21,49 @@ def debug_dryrun(read_outputs):
 def debug_get_dryrun_logs():
     return debug_dryrun_logs
 
+# Contents of files that known to be written or read while write_file() is
+# skipping writes of unchanged contents.  None if not skipping.
+diff_writes_contents = None
+nr_issued_writes = 0
+nr_skipped_writes = 0
+
+def start_diff_writes():
+    '''
+    Make write_file() skip writing contents that same to the current content
+    of the file, until stop_diff_writes() is called.
+    '''
+    global diff_writes_contents
+    global nr_issued_writes
+    global nr_skipped_writes
+    diff_writes_contents = {}
+    nr_issued_writes = 0
+    nr_skipped_writes = 0
+
+def stop_diff_writes():
+    '''Returns number of issued writes and skipped writes'''
+    global diff_writes_contents
+    diff_writes_contents = None
+    return nr_issued_writes, nr_skipped_writes
+
+def current_content(filepath):
+    '''Returns the current content of the file, or None if unknown'''
+    if not filepath in diff_writes_contents:
+        if debug_dryrun_logs is not None:
+            content = debug_dryrun_read_outputs.get(filepath)
+        else:
+            try:
+                with open(filepath, 'r') as f:
+                    content = f.read()
+            except Exception:
+                content = None
+        diff_writes_contents[filepath] = content
+    return diff_writes_contents[filepath]
+
+def forget_contents_under(dir_path):
+    prefix = os.path.join(dir_path, '')
+    for filepath in [p for p in diff_writes_contents if p.startswith(prefix)]:
+        del diff_writes_contents[filepath]
+
 '''Returns content and error'''
 def read_file(filepath):
     if debug_dryrun_logs is not None:
@@ -36,22 +80,56 @@ def read_file(filepath):
         print('read \'%s\': \'%s\'' % (filepath, content.strip()))
     return content, None
 
-def read_files(root):
+def __read_files(root, skip_dirs, executor, read_in_parallel):
     contents = {}
-    for filename in os.listdir(root):
-        filepath = os.path.join(root, filename)
-        if os.path.isdir(filepath):
-            contents[filename] = read_files(filepath)
-        else:
-            contents[filename], err = read_file(filepath)
-            if err != None:
-                contents[filename] = 'read failed (%s)' % err
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if skip_dirs is not None and entry.name in skip_dirs:
+                    continue
+                if executor is not None and read_in_parallel(entry.path):
+                    contents[entry.name] = executor.submit(
+                            __read_files, entry.path, skip_dirs, executor,
+                            read_in_parallel)
+                else:
+                    contents[entry.name] = __read_files(
+                            entry.path, skip_dirs, executor,
+                            read_in_parallel)
+            else:
+                contents[entry.name], err = read_file(entry.path)
+                if err != None:
+                    contents[entry.name] = 'read failed (%s)' % err
     return contents
 
-'''
-Returns None if success error string otherwise
-'''
-def write_file(filepath, content):
+def read_files(root, skip_dirs=None):
+    '''
+    Read files under root directory recursively and returns the contents in a
+    nested dict.  Directories having names in skip_dirs are not read.
+    '''
+    return __read_files(root, skip_dirs, None, None)
+
+def wait_read_files(contents):
+    for name, content in contents.items():
+        if isinstance(content, concurrent.futures.Future):
+            content = content.result()
+            contents[name] = content
+        if type(content) is dict:
+            wait_read_files(content)
+    return contents
+
+def read_files_concurrent(root, read_in_parallel, skip_dirs=None,
+                          max_workers=None):
+    '''
+    Same to read_files(), but read subtrees of directories in a thread pool.
+    read_in_parallel() receives the path to each directory, and returns
+    whether the subtree of the directory should be read in parallel with
+    others.  The subtrees can also have such directories.
+    '''
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        return wait_read_files(__read_files(
+            root, skip_dirs, executor, read_in_parallel))
+
+def __write_file(filepath, content):
     if debug_do_print:
         print('write \'%s\' to \'%s\'' % (content.strip(), filepath))
     if debug_dryrun_logs is not None:
@@ -65,6 +143,27 @@ def write_file(filepath, content):
         return 'writing %s to %s failed (%s)' % (content.strip(), filepath, e)
     return None
 
+'''
+Returns None if success error string otherwise
+'''
+def write_file(filepath, content):
+    global nr_issued_writes
+    global nr_skipped_writes
+    if diff_writes_contents is None:
+        return __write_file(filepath, content)
+
+    current = current_content(filepath)
+    if current is not None and current.strip() == content.strip():
+        nr_skipped_writes += 1
+        return None
+    nr_issued_writes += 1
+    err = __write_file(filepath, content)
+    # writing nr_* files recreates the sibling directories
+    if os.path.basename(filepath).startswith('nr_'):
+        forget_contents_under(os.path.dirname(filepath))
+    diff_writes_contents[filepath] = content if err is None else None
+    return err
+
 def dev_mount_point(dev):
     '''Returns mount point of specific device.  None if not mounted'''
     with open('/proc/mounts', 'r') as f:
@@ -2,14 +2,17 @@
 
 import os
 import subprocess
+import sys
 import tempfile
 
-def pr_with_pager_if_needed(text):
+def nr_terminal_lines():
     try:
-        nr_terminal_lines = os.get_terminal_size().lines
+        return os.get_terminal_size().lines
     except:
-        nr_terminal_lines = 50
-    if text.count('\n') <= nr_terminal_lines:
+        return 50
+
+def pr_with_pager_if_needed(text):
+    if text.count('\n') <= nr_terminal_lines():
         print(text)
         return
 
@@ -18,3 +21,53 @@ def pr_with_pager_if_needed(text):
         f.write(text)
     subprocess.call(['less', '--RAW-CONTROL-CHARS', '--no-init', tmp_path])
     os.remove(tmp_path)
+
+def write_lines(f, lines, first_line_written):
+    '''
+    Write the lines to the file in chunks, joining those with newlines.
+    Returns whether any line has written.
+    '''
+    chunk = []
+    for line in lines:
+        if first_line_written:
+            chunk.append('\n')
+        first_line_written = True
+        chunk.append(line)
+        if len(chunk) >= 1024:
+            f.write(''.join(chunk))
+            chunk = []
+    f.write(''.join(chunk))
+    return first_line_written
+
+def pr_lines(lines):
+    '''
+    Same to print('\\n'.join(lines)), but print the lines in chunks as those
+    are made.
+    '''
+    write_lines(sys.stdout, lines, False)
+    sys.stdout.write('\n')
+
+def pr_lines_with_pager_if_needed(lines):
+    '''
+    Same to pr_with_pager_if_needed('\\n'.join(lines)), but keep only lines
+    for a screen in memory.  Lines after those are written to the pager input
+    file in chunks as those are made.
+    '''
+    max_nr_lines = nr_terminal_lines()
+    lines = iter(lines)
+    buffered = []
+    nr_newlines = -1
+    for line in lines:
+        buffered.append(line)
+        nr_newlines += line.count('\n') + 1
+        if nr_newlines > max_nr_lines:
+            break
+    else:
+        print('\n'.join(buffered))
+        return
+
+    fd, tmp_path = tempfile.mkstemp(prefix='damo_show-')
+    with open(tmp_path, 'w') as f:
+        write_lines(f, lines, write_lines(f, buffered, False))
+    subprocess.call(['less', '--RAW-CONTROL-CHARS', '--no-init', tmp_path])
+    os.remove(tmp_path)
@@ -1,15 +1,27 @@
 # SPDX-License-Identifier: GPL-2.0
 
 import argparse
+import array
+import bisect
 import collections
+import concurrent.futures
 import copy
 import datetime
+import heapq
+import io
 import json
+import mmap
+import operator
 import os
+import queue
 import random
+import re
 import shutil
 import signal
+import struct
 import subprocess
+import sys
+import threading
 import time
 import zlib
 
@@ -110,6 +122,8 @@ class DamonSnapshot:
     total_bytes = None
     damos_stats = None
     sample_interval_us = None
+    # cache of damo_report_access.SnapshotMetricDist objects
+    metric_dists = None
 
     def update_total_bytes(self):
         self.total_bytes = sum([r.size() for r in self.regions])
@@ -243,22 +257,40 @@ class DamonRecord:
                 self.target_id == other.target_id)
 
     def merge(self, other):
-        self.snapshots += other.snapshots
-        self.snapshots.sort(key=lambda s: s.start_time)
+        # snapshots of records are usually sorted by the start time already.
+        # Do sorted merge if so.
+        for snapshots in [self.snapshots, other.snapshots]:
+            if not snapshots_sorted(snapshots):
+                snapshots.sort(key=lambda s: s.start_time)
+        self.snapshots = list(heapq.merge(
+            self.snapshots, other.snapshots, key=lambda s: s.start_time))
+
+def snapshots_sorted(snapshots):
+    for idx in range(1, len(snapshots)):
+        if snapshots[idx - 1].start_time > snapshots[idx].start_time:
+            return False
+    return True
 
 # for monitoring results manipulation
 
 def merge_records(records):
     merged_records = []
+    # merge target candidates for each kdamond/context/scheme/target
+    candidates = {}
     for record in records:
+        key = (record.kdamond_idx, record.context_idx, record.scheme_idx,
+               record.target_id)
+        if not key in candidates:
+            candidates[key] = []
         merged = False
-        for merged_record in merged_records:
+        for merged_record in candidates[key]:
             if merged_record.can_merge(record):
                 merged_record.merge(record)
                 merged = True
                 break
         if not merged:
             merged_records.append(record)
+            candidates[key].append(record)
     return merged_records
 
 def regions_intersect(r1, r2):
@@ -270,52 +302,80 @@ def sz_filter_passed_for_new_size(region, new_size):
     filter_pass_ratio = region.sz_filter_passed / region.size()
     return int(filter_pass_ratio * new_size)
 
-def add_region(regions, region, nr_acc_to_add):
-    for r in regions:
-        if not regions_intersect(r, region):
-            continue
-        if not r in nr_acc_to_add:
-            nr_acc_to_add[r] = 0
-        nr_acc_to_add[r] = max(nr_acc_to_add[r],
-                region.nr_accesses.samples)
-
-        new_regions = []
-        if region.start < r.start:
-            new_regions.append(_damon.DamonRegion(
-                region.start, r.start,
-                region.nr_accesses.samples, _damon.unit_samples,
-                region.age.aggr_intervals, _damon.unit_aggr_intervals,
-                sz_filter_passed_for_new_size(
-                    region, r.start - region.start)))
-        if r.end < region.end:
-            new_regions.append(_damon.DamonRegion(
-                    r.end, region.end,
-                    region.nr_accesses.samples, _damon.unit_samples,
-                    region.age.aggr_intervals,
-                    _damon.unit_aggr_intervals,
-                    sz_filter_passed_for_new_size(
-                        region, region.end - r.end)))
-
-        for new_r in new_regions:
-            add_region(regions, new_r, nr_acc_to_add)
-        return
-    regions.append(region)
+def region_gap_piece(region, start, end):
+    if start == region.start and end == region.end:
+        return region
+    return _damon.DamonRegion(
+            start, end, region.nr_accesses.samples, _damon.unit_samples,
+            region.age.aggr_intervals, _damon.unit_aggr_intervals,
+            sz_filter_passed_for_new_size(region, end - start))
+
+def add_snapshot_regions(regions, snapshot_regions):
+    '''
+    Add regions of a snapshot to address-sorted, non-overlapping regions.
+
+    Suppose the existing regions has a region 1-10:5, and the snapshot has two
+    regions, 1-5:2, 5-10: 4.  The result should be 1-10:9.  That is, maximum
+    nr_accesses of intersecting snapshot regions is added to each existing
+    region.  Parts of the snapshot regions that intersect with no existing
+    region are added as new regions.
+
+    Returns the updated regions, and the added regions with their indices on
+    snapshot_regions.
+    '''
+    nr_acc_to_add = {}
+    added = []
+    incoming = sorted(enumerate(snapshot_regions),
+                      key=lambda x: (x[1].start, x[1].end))
+    idx = 0
+    nr_regions = len(regions)
+    for region_idx, region in incoming:
+        # skip existing regions that cannot intersect with this and later ones
+        while idx < nr_regions and regions[idx].end <= region.start:
+            idx += 1
+        nr_accesses = region.nr_accesses.samples
+        gap_start = region.start
+        intersected = False
+        for r_idx in range(idx, nr_regions):
+            r = regions[r_idx]
+            if r.start >= region.end:
+                break
+            intersected = True
+            if nr_acc_to_add.get(r_idx, -1) < nr_accesses:
+                nr_acc_to_add[r_idx] = nr_accesses
+            if gap_start < r.start:
+                added.append([region_idx, region_gap_piece(
+                    region, gap_start, r.start)])
+            if gap_start < r.end:
+                gap_start = r.end
+        if not intersected:
+            added.append([region_idx, region])
+        elif gap_start < region.end:
+            added.append([region_idx, region_gap_piece(
+                region, gap_start, region.end)])
+
+    for r_idx, nr_acc in nr_acc_to_add.items():
+        nr_accesses = regions[r_idx].nr_accesses
+        nr_accesses.samples += nr_acc
+
+    if added:
+        regions = list(heapq.merge(regions, [r for _, r in added],
+                                   key=lambda r: (r.start, r.end)))
+    return regions, added
 
 def aggregate_snapshots(snapshots):
+    # new_regions is kept address-sorted, for finding intersecting regions of
+    # each snapshot with a sweep.  Return the regions in the order of the
+    # addition, though, for backward compatibility.
     new_regions = []
-    for snapshot in snapshots:
-        # Suppose the first snapshot has a region 1-10:5, and the second
-        # snapshot has two regions, 1-5:2, 5-10: 4.  Aggregated snapshot should
-        # be 1-10:9.  That is, we should add maximum nr_accesses of
-        # intersecting regions.  nr_acc_to_add contains the information.
-        nr_acc_to_add = {}
-        for region in snapshot.regions:
-            add_region(new_regions, region, nr_acc_to_add)
-        for region in nr_acc_to_add:
-            region.nr_accesses.samples += nr_acc_to_add[region]
-            region.nr_accesses.val = region.nr_accesses.samples
-            region.nr_accesses.unit = _damon.unit_samples
-
+    added_order = {}
+    for snapshot_idx, snapshot in enumerate(snapshots):
+        new_regions, added = add_snapshot_regions(
+                new_regions, snapshot.regions)
+        for order_idx, [region_idx, region] in enumerate(added):
+            added_order[id(region)] = (snapshot_idx, region_idx, order_idx)
+
+    new_regions.sort(key=lambda r: added_order[id(r)])
     new_snapshot = DamonSnapshot(snapshots[0].start_time,
             snapshots[-1].end_time, new_regions, None)
     return new_snapshot
@@ -471,16 +531,21 @@ def damon_trace_fields(line, trace_cmd='trace-cmd-report'):
     event = event[len('damon:'):]
     return ['%s:' % timestamp, '%s:' % event] + trace_fields
 
-def parse_damon_trace(trace_text, trace_cmd, monitoring_intervals):
+def damon_trace_snapshots(trace_lines):
     '''
-    Parse DAMON tracepoints.  trace_text could be output of 'perf script' or
-    'trace-cmd report'.
+    Parse DAMON tracepoints on given lines of 'perf script' or 'trace-cmd
+    report' output.  Yield target id and DamonSnapshot of the target as soon as
+    all regions of the snapshot are parsed.  Snapshots that are not completed
+    until the end of the lines are yielded at the end.  The first snapshot of
+    each target has no start time.
+
+    Raises an exception if the trace is not time-sorted.
     '''
-    records = []
-    snapshot = None
+    pending_snapshots = collections.OrderedDict()
+    last_end_times = {}
     snapshot_sample_interval_us = None
 
-    for line in trace_text.split('\n'):
+    for line in trace_lines:
         fields = damon_trace_fields(line)
         if fields is None:
             continue
@@ -493,53 +558,132 @@ def parse_damon_trace(trace_text, trace_cmd, monitoring_intervals):
         if region is None:
             continue
 
-        record = record_of(target_id, records, monitoring_intervals)
-        if len(record.snapshots) == 0:
-            start_time = None
-        else:
-            start_time = record.snapshots[-1].end_time
-            if start_time > end_time:
-                return None, 'trace is not time-sorted'
+        start_time = last_end_times.get(target_id)
+        if start_time is not None and start_time > end_time:
+            raise Exception('trace is not time-sorted')
 
+        snapshot = pending_snapshots.get(target_id)
         if snapshot is None:
             snapshot = DamonSnapshot(
                     start_time, end_time, regions=[], total_bytes=None,
                     damos_stats=None,
                     sample_interval_us=snapshot_sample_interval_us)
-            record.snapshots.append(snapshot)
-        snapshot = record.snapshots[-1]
+            pending_snapshots[target_id] = snapshot
+            last_end_times[target_id] = end_time
         snapshot.regions.append(region)
 
         if len(snapshot.regions) == nr_regions:
-            snapshot = None
-
-    for record in records:
-        for snapshot in record.snapshots:
+            del pending_snapshots[target_id]
             snapshot.update_total_bytes()
+            yield target_id, snapshot
+
+    for target_id, snapshot in pending_snapshots.items():
+        snapshot.update_total_bytes()
+        yield target_id, snapshot
+
+def parse_damon_trace_lines(trace_lines, monitoring_intervals):
+    '''
+    Parse DAMON tracepoints on given lines of 'perf script' or 'trace-cmd
+    report' output.  Returns DamonRecord list and an error.
+    '''
+    records = []
+    try:
+        for target_id, snapshot in damon_trace_snapshots(trace_lines):
+            record = record_of(target_id, records, monitoring_intervals)
+            record.snapshots.append(snapshot)
+    except Exception as e:
+        return None, '%s' % e
 
     set_first_snapshot_start_time(records)
     return records, None
 
+def parse_damon_trace(trace_text, trace_cmd, monitoring_intervals):
+    '''
+    Parse DAMON tracepoints.  trace_text could be output of 'perf script' or
+    'trace-cmd report'.
+    '''
+    return parse_damon_trace_lines(io.StringIO(trace_text),
+                                   monitoring_intervals)
+
+def trace_output_lines(cmd):
+    '''
+    Run given tracer output command, e.g., 'perf script', and yield each line
+    of its stdout as soon as it is read from the pipe.  Raises an exception if
+    the command fails.
+    '''
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL, encoding='utf-8') as proc:
+        for line in proc.stdout:
+            yield line
+    if proc.returncode != 0:
+        raise Exception('\'%s\' returned non-zero exit status %d' %
+                        (' '.join(cmd), proc.returncode))
+
+def perf_script_lines(record_file, perf_cmd='perf'):
+    # in some setup, perf record file ends up having no proper ownership.
+    # There's no reason to be strict about that from damo.  As long as we can,
+    # just parse it with '--force' option.
+    return trace_output_lines(
+            [perf_cmd, 'script', '--force', '-i', record_file])
+
+def trace_cmd_report_lines(record_file):
+    return trace_output_lines(['trace-cmd', 'report', '-i', record_file])
+
 def parse_perf_damon_record(
         record_file, monitoring_intervals, perf_cmd='perf'):
     '''Returns DamonRecord list and error'''
-    try:
-        with open(os.devnull, 'w') as fnull:
-            # in some setup, perf record file ends up having no proper
-            # ownership.  There's no reason to be strict about that from
-            # damo.  As long as we can, just parse it with '--force'
-            # option.
-            perf_script_output = subprocess.check_output(
-                    [perf_cmd, 'script', '--force', '-i', record_file],
-                    stderr=fnull).decode()
-    except Exception as e:
-        return None, 'failed perf-script (%s)' % e
-    return parse_damon_trace(
-            perf_script_output, 'perf-script', monitoring_intervals)
+    records, err = parse_damon_trace_lines(
+            perf_script_lines(record_file, perf_cmd), monitoring_intervals)
+    if err is not None:
+        return None, 'failed perf-script (%s)' % err
+    return records, None
+
+def compact_snapshot_from_kvpairs(kv, region_columns):
+    '''
+    Returns a ColumnarSnapshot having the regions in region_columns, or a
+    DamonSnapshot if the regions cannot be stored in the columns.
+    '''
+    region_offset = region_columns.add_regions_kvpairs(kv['regions'])
+    if region_offset is None:
+        return DamonSnapshot.from_kvpairs(kv)
+    nr_regions = len(kv['regions'])
+
+    damos_stats = None
+    if 'damos_stats' in kv and kv['damos_stats'] is not None:
+        damos_stats = _damon.DamosStats.from_kvpairs(kv['damos_stats'])
+    sample_interval_us = None
+    if 'sample_interval_us' in kv and kv['sample_interval_us'] is not None:
+        sample_interval_us = _damo_fmt_str.text_to_us(
+                kv['sample_interval_us'])
+    if 'total_bytes' in kv and kv['total_bytes'] is not None:
+        total_bytes = _damo_fmt_str.text_to_bytes(kv['total_bytes'])
+    else:
+        end = region_offset + nr_regions
+        total_bytes = (
+                sum(region_columns.column('end')[region_offset:end]) -
+                sum(region_columns.column('start')[region_offset:end]))
+    return ColumnarSnapshot(
+            region_columns, region_offset, nr_regions,
+            _damo_fmt_str.text_to_ns(kv['start_time']),
+            _damo_fmt_str.text_to_ns(kv['end_time']),
+            total_bytes, damos_stats, sample_interval_us, {})
+
+def records_from_kvpairs(records_kvpairs):
+    # Keep regions in compact columns until those are really accessed.
+    region_columns = RegionColumns()
+    records = []
+    for kvp in records_kvpairs:
+        snapshots_kvpairs = kvp['snapshots']
+        kvp['snapshots'] = []
+        record = DamonRecord.from_kvpairs(kvp)
+        record.snapshots = [
+                compact_snapshot_from_kvpairs(s, region_columns)
+                for s in snapshots_kvpairs]
+        records.append(record)
+    return records
 
 def parse_json(json_str):
-    kvpairs = json.loads(json_str)
-    return [DamonRecord.from_kvpairs(kvp) for kvp in kvpairs]
+    return records_from_kvpairs(json.loads(json_str))
 
 def parse_compressed_json(record_file):
     with open(record_file, 'rb') as f:
@@ -552,32 +696,422 @@ def parse_json_file(record_file):
         json_str = f.read()
     return parse_json(json_str)
 
+class JsonLinesWriter:
+    '''
+    Append-only writer of a json lines file.  Each appended object is written
+    and flushed as a line at once, so the objects written so far can be read
+    even if the writer is not closed, e.g., due to a crash.  The file is
+    (re-)created when the first object is appended after the construction or
+    close().
+    '''
+    file_path = None
+    file_permission = None
+    to_kvpairs = None   # function receiving an object and returning kvpairs
+    file = None
+    nr_written = None
+
+    def __init__(self, file_path, file_permission=None,
+                 to_kvpairs=lambda obj: obj.to_kvpairs()):
+        self.file_path = file_path
+        self.file_permission = file_permission
+        self.to_kvpairs = to_kvpairs
+        self.nr_written = 0
+
+    def append(self, obj):
+        if self.file is None:
+            self.file = open(self.file_path, 'w')
+            if self.file_permission is not None:
+                os.chmod(self.file_path, self.file_permission)
+            self.nr_written = 0
+        self.file.write(json.dumps(self.to_kvpairs(obj)) + '\n')
+        self.file.flush()
+        self.nr_written += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def json_lines_kvpairs(file_path):
+    '''
+    Yield kvpairs of each line of the given json lines file.  An incomplete
+    last line that could be left by a crash of the writer is ignored.
+    '''
+    with open(file_path, 'r') as f:
+        for line in f:
+            if line.strip() == '':
+                continue
+            try:
+                kvpairs = json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith('\n'):
+                    raise
+                return
+            yield kvpairs
+
+def load_json_objects(file_path):
+    '''
+    Returns list of kvpairs in the given json list file or json lines file.
+    '''
+    with open(file_path, 'r') as f:
+        head = f.read(4096)
+    if head.lstrip()[:1] == '[':
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    return list(json_lines_kvpairs(file_path))
+
+def parse_json_lines_file(record_file):
+    return records_from_kvpairs(json_lines_kvpairs(record_file))
+
+# Columnar record file format.
+#
+# The file starts with 'columnar_magic', followed by a header of
+# 'columnar_header_fmt' (format version, metadata length), and json-encoded
+# metadata.  The metadata describes records and columns.  After the metadata,
+# the snapshots index (one row of 'columnar_snapshot_columns' per snapshot) and
+# the region columns follow, each column as an 8-bytes aligned, little endian,
+# fixed-width array.  Regions of a snapshot are found on the region columns
+# using the 'region_offset' and 'nr_regions' of the snapshot's index row.
+#
+# The file is memory-mapped when it is read, and snapshot regions are
+# constructed only when those are accessed.
+
+columnar_magic = b'DAMOCREC'
+columnar_version = 1
+columnar_header_fmt = '<IQ'
+columnar_none = -2**63
+
+# name and array type code of columns
+columnar_snapshot_columns = [
+        ['start_time', 'q'], ['end_time', 'q'], ['total_bytes', 'Q'],
+        ['region_offset', 'Q'], ['nr_regions', 'Q']]
+columnar_region_columns = [
+        ['start', 'Q'], ['end', 'Q'], ['nr_accesses', 'q'], ['age_usec', 'q'],
+        ['age_aggr_intervals', 'q'], ['sz_filter_passed', 'q']]
+
+class ColumnarRecordFile:
+    '''
+    Memory-mapped columnar record file.  Provide columns of snapshots and
+    regions as arrays-like objects, reading only touched pages from the file.
+    '''
+    mmap = None
+    meta = None
+    columns = None  # column name to array-like object
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        offset = len(columnar_magic)
+        version, meta_len = struct.unpack_from(
+                columnar_header_fmt, self.mmap, offset)
+        if version != columnar_version:
+            raise Exception('unsupported columnar format version %d' %
+                            version)
+        offset += struct.calcsize(columnar_header_fmt)
+        self.meta = json.loads(self.mmap[offset:offset + meta_len].decode())
+        offset = columnar_aligned(offset + meta_len)
+
+        self.columns = {}
+        buf = memoryview(self.mmap)
+        for columns, nr_rows in [
+                [columnar_snapshot_columns, self.meta['nr_snapshots']],
+                [columnar_region_columns, self.meta['nr_regions']]]:
+            for name, typecode in columns:
+                self.columns[name] = columnar_column(
+                        buf[offset:offset + nr_rows * 8], typecode,
+                        sys.byteorder)
+                offset += nr_rows * 8
+
+    def column(self, name):
+        return self.columns[name]
+
+    def snapshot_regions(self, region_offset, nr_regions):
+        return columns_to_regions(self.columns, region_offset, nr_regions)
+
+def columnar_column(buf, typecode, byteorder):
+    '''
+    Returns an array-like object for the little endian column in the buffer,
+    on a host of the byte order.
+    '''
+    if byteorder == 'little':
+        return buf.cast(typecode)
+    column = array.array(typecode)
+    column.frombytes(buf)
+    column.byteswap()
+    return column
+
+class RegionColumns:
+    '''
+    In-memory array-backed columns of regions, for compact storage of regions
+    that loaded from non-columnar record files.  Provides same interface to
+    ColumnarRecordFile.
+    '''
+    columns = None
+
+    def __init__(self):
+        self.columns = {name: array.array(typecode) for name, typecode in
+                        columnar_region_columns + [['nr_accesses_percent', 'q']]}
+
+    def column(self, name):
+        return self.columns[name]
+
+    def snapshot_regions(self, region_offset, nr_regions):
+        return columns_to_regions(self.columns, region_offset, nr_regions)
+
+    def add_regions_kvpairs(self, regions_kvpairs):
+        '''
+        Add regions of the given kvpairs to the columns.  Returns the index of
+        the first added region, or None if the regions cannot be stored in the
+        columns as is.
+        '''
+        values = {name: [] for name in self.columns}
+        try:
+            for kv in regions_kvpairs:
+                nr_accesses = kv['nr_accesses']
+                age = kv['age']
+                for name, value in [
+                        ['start', _damo_fmt_str.text_to_bytes(kv['start'])],
+                        ['end', _damo_fmt_str.text_to_bytes(kv['end'])],
+                        ['nr_accesses', _damo_fmt_str.text_to_nr(
+                            nr_accesses['samples'])
+                         if nr_accesses.get('samples') is not None
+                         else None],
+                        ['nr_accesses_percent', _damo_fmt_str.text_to_percent(
+                            nr_accesses['percent'])
+                         if nr_accesses.get('percent') is not None
+                         else None],
+                        ['age_usec', _damo_fmt_str.text_to_us(age['usec'])
+                         if age['usec'] is not None else None],
+                        ['age_aggr_intervals', _damo_fmt_str.text_to_nr(
+                            age['aggr_intervals'])
+                         if age['aggr_intervals'] is not None else None],
+                        ['sz_filter_passed', _damo_fmt_str.text_to_bytes(
+                            kv['sz_filter_passed'])
+                         if 'sz_filter_passed' in kv else 0]]:
+                    # keep the types of the values, e.g., float percent
+                    if value is None:
+                        value = columnar_none
+                    elif type(value) is not int or value == columnar_none:
+                        return None
+                    values[name].append(value)
+                if kv.get('probe_hits', []) != []:
+                    return None
+            arrays = {name: array.array(self.columns[name].typecode, vals)
+                      for name, vals in values.items()}
+        except (KeyError, TypeError, ValueError, OverflowError):
+            return None
+        region_offset = len(self.columns['start'])
+        for name, arr in arrays.items():
+            self.columns[name].extend(arr)
+        return region_offset
+
+def columns_to_regions(columns, region_offset, nr_regions):
+    regions = []
+    end = region_offset + nr_regions
+    starts = columns['start'][region_offset:end]
+    ends = columns['end'][region_offset:end]
+    nr_accesses = columns['nr_accesses'][region_offset:end]
+    if 'nr_accesses_percent' in columns:
+        nr_accesses_percent = columns['nr_accesses_percent'][
+                region_offset:end]
+    else:
+        nr_accesses_percent = None
+    ages_usec = columns['age_usec'][region_offset:end]
+    ages_aggr = columns['age_aggr_intervals'][region_offset:end]
+    szs_passed = columns['sz_filter_passed'][region_offset:end]
+    for idx in range(nr_regions):
+        region = _damon.DamonRegion(starts[idx], ends[idx])
+        region.nr_accesses = _damon.DamonNrAccesses(None, None)
+        if nr_accesses[idx] != columnar_none:
+            region.nr_accesses.samples = nr_accesses[idx]
+        if (nr_accesses_percent is not None and
+                nr_accesses_percent[idx] != columnar_none):
+            region.nr_accesses.percent = nr_accesses_percent[idx]
+        region.age = _damon.DamonAge(None, None)
+        if ages_usec[idx] != columnar_none:
+            region.age.usec = ages_usec[idx]
+        if ages_aggr[idx] != columnar_none:
+            region.age.aggr_intervals = ages_aggr[idx]
+        if szs_passed[idx] != columnar_none:
+            region.sz_filter_passed = szs_passed[idx]
+        else:
+            region.sz_filter_passed = None
+        region.probe_hits = []
+        regions.append(region)
+    return regions
+
+class ColumnarSnapshot(DamonSnapshot):
+    '''
+    DamonSnapshot of region columns of a columnar record file or in memory.
+    The regions are constructed from the columns when those are accessed for
+    the first time.
+    '''
+    record_file = None  # ColumnarRecordFile or RegionColumns
+    region_offset = None
+    nr_regions = None
+    probe_hits = None   # region index to probe hits
+    # intervals for add_unset_unit() of regions that will be constructed
+    unset_units_intervals = None
+    _regions = None
+
+    def __init__(self, record_file, region_offset, nr_regions, start_time,
+                 end_time, total_bytes, damos_stats, sample_interval_us,
+                 probe_hits):
+        self.record_file = record_file
+        self.region_offset = region_offset
+        self.nr_regions = nr_regions
+        self.probe_hits = probe_hits
+        super().__init__(start_time, end_time, None, total_bytes, damos_stats,
+                         sample_interval_us)
+
+    @property
+    def regions(self):
+        if self._regions is None:
+            self._regions = self.regions_slice(0, self.nr_regions)
+        return self._regions
+
+    @regions.setter
+    def regions(self, regions):
+        self._regions = regions
+
+    def regions_constructed(self):
+        return self._regions is not None
+
+    def regions_slice(self, start_idx, end_idx):
+        '''Returns regions of the given index range, constructing only those
+        if the regions are not constructed yet'''
+        if self._regions is not None:
+            return self._regions[start_idx:end_idx]
+        regions = self.record_file.snapshot_regions(
+                self.region_offset + start_idx, end_idx - start_idx)
+        for idx, hits in self.probe_hits.items():
+            if start_idx <= int(idx) and int(idx) < end_idx:
+                regions[int(idx) - start_idx].probe_hits = hits
+        if self.unset_units_intervals is not None:
+            for region in regions:
+                region.nr_accesses.add_unset_unit(self.unset_units_intervals)
+                region.age.add_unset_unit(self.unset_units_intervals)
+        return regions
+
+    def region_column(self, name):
+        '''Returns values of the given column for regions of this snapshot,
+        without constructing the regions'''
+        if self._regions is not None:
+            raise Exception('regions are already constructed')
+        return self.record_file.column(name)[
+                self.region_offset:self.region_offset + self.nr_regions]
+
+def columnar_aligned(offset):
+    return (offset + 7) // 8 * 8
+
+def columnar_value(value):
+    if value is None:
+        return columnar_none
+    return int(value)
+
+def columnar_none_or(value):
+    if value == columnar_none:
+        return None
+    return value
+
+def parse_columnar(record_file):
+    col_file = ColumnarRecordFile(record_file)
+    start_times = col_file.column('start_time')
+    end_times = col_file.column('end_time')
+    total_bytes = col_file.column('total_bytes')
+    region_offsets = col_file.column('region_offset')
+    nrs_regions = col_file.column('nr_regions')
+
+    records = []
+    for record_meta in col_file.meta['records']:
+        kvpairs = dict(record_meta)
+        kvpairs['snapshots'] = []
+        record = DamonRecord.from_kvpairs(kvpairs)
+        snapshot_extras = record_meta['snapshot_extras']
+        for idx in range(record_meta['snapshot_offset'],
+                         record_meta['snapshot_offset'] +
+                         record_meta['nr_snapshots']):
+            extras = snapshot_extras.get('%d' % idx, {})
+            damos_stats = None
+            if extras.get('damos_stats') is not None:
+                damos_stats = _damon.DamosStats.from_kvpairs(
+                        extras['damos_stats'])
+            record.snapshots.append(ColumnarSnapshot(
+                col_file, region_offsets[idx], nrs_regions[idx],
+                columnar_none_or(start_times[idx]),
+                columnar_none_or(end_times[idx]), total_bytes[idx],
+                damos_stats, extras.get('sample_interval_us'),
+                extras.get('probe_hits', {})))
+        records.append(record)
+    return records
+
+def is_columnar_file(record_file):
+    with open(record_file, 'rb') as f:
+        return f.read(len(columnar_magic)) == columnar_magic
+
+def records_file_type(record_file):
+    '''
+    Detect the type of the record file from its first bytes.  Returns one of
+    'file_types'.
+    '''
+    with open(record_file, 'rb') as f:
+        head = f.read(4096)
+    if head.startswith(columnar_magic):
+        return file_type_columnar
+    # zlib header.  zlib.compress() always uses 32 KiB window (0x78).  Text
+    # files can also start with such bytes, e.g., 'x ', so confirm it by
+    # decompressing the head.
+    if (len(head) >= 2 and head[0] == 0x78 and
+            (head[0] << 8 | head[1]) % 31 == 0):
+        try:
+            zlib.decompressobj().decompress(head, 65536)
+            return file_type_json_compressed
+        except zlib.error:
+            pass
+    if head.lstrip()[:1] == b'[':
+        return file_type_json
+    if head.lstrip()[:1] == b'{':
+        return file_type_json_lines
+    try:
+        head.decode('ascii')
+        return file_type_perf_script
+    except UnicodeDecodeError:
+        return file_type_perf_data
+
 def parse_records_file(record_file, monitoring_intervals=None):
     '''
     Return monitoring results records and error string
     '''
+    try:
+        file_type = records_file_type(record_file)
+    except Exception as e:
+        return None, 'reading %s failed (%s)' % (record_file, e)
 
-    if not _damo_subproc.avail_cmd('file'):
-        return None, "'file' command seems not installed"
+    if file_type == file_type_columnar:
+        try:
+            return parse_columnar(record_file), None
+        except Exception as e:
+            return None, 'failed parsing columnar file (%s)' % e
 
-    file_type = subprocess.check_output(
-            ['file', '-b', record_file]).decode().strip()
-    if file_type == 'JSON data':
+    if file_type == file_type_json:
         try:
             return parse_json_file(record_file), None
         except Exception as e:
             return None, 'failed parsing json file (%s)' % e
-    if file_type == 'zlib compressed data':
+    if file_type == file_type_json_compressed:
         try:
             return parse_compressed_json(record_file), None
         except Exception as e:
             return None, 'failed parsing json compressed file (%s)' % e
+    if file_type == file_type_json_lines:
+        try:
+            return parse_json_lines_file(record_file), None
+        except Exception as e:
+            return None, 'failed parsing json lines file (%s)' % e
 
-    if file_type == 'ASCII text':
+    if file_type == file_type_perf_script:
         with open(record_file, 'r') as f:
-            perf_script_output = f.read()
-        return parse_damon_trace(
-                perf_script_output, 'perf-script', monitoring_intervals)
+            return parse_damon_trace_lines(f, monitoring_intervals)
 
     return parse_perf_damon_record(
             record_file, monitoring_intervals, perf_cmd='perf')
@@ -595,6 +1129,435 @@ def write_json(records, file_path):
     with open(file_path, 'w') as f:
         f.write(json_str)
 
+def write_json_lines(records, file_path):
+    writer = JsonLinesWriter(
+            file_path, to_kvpairs=lambda record: record.to_kvpairs(raw=True))
+    for record in records:
+        writer.append(record)
+    writer.close()
+
+def json_list_chunks(kvpairs_list):
+    '''
+    Yield json.dumps(list(kvpairs_list), indent=4) output in chunks of each
+    list item, without keeping the whole list in memory.
+    '''
+    empty = True
+    for kvpairs in kvpairs_list:
+        item_str = json.dumps(kvpairs, indent=4).replace('\n', '\n    ')
+        yield ('[\n    ' if empty else ',\n    ') + item_str
+        empty = False
+    yield '[]' if empty else '\n]'
+
+def convert_json_lines_to_json(src_file, dst_file, compress):
+    '''
+    Convert the json lines records file to json or json_compressed records
+    file, one record at a time.
+    '''
+    if compress:
+        compressor = zlib.compressobj()
+    with open(dst_file, 'wb') as f:
+        for chunk in json_list_chunks(json_lines_kvpairs(src_file)):
+            if compress:
+                f.write(compressor.compress(chunk.encode()))
+            else:
+                f.write(chunk.encode())
+        if compress:
+            f.write(compressor.flush())
+
+class GuideRegion:
+    start_addr = None
+    end_addr = None
+    heats = None
+
+    def heat_per_byte(self):
+        if self.heats is None:
+            return 0
+        return float(self.heats) / (self.end_addr - self.start_addr)
+
+    def __init__(self, start_addr, end_addr):
+        self.start_addr = start_addr
+        self.end_addr = end_addr
+
+    def to_kvpairs(self):
+        return [self.start_addr, self.end_addr, self.heats]
+
+    @classmethod
+    def from_kvpairs(cls, kvpairs):
+        self = cls(kvpairs[0], kvpairs[1])
+        self.heats = kvpairs[2]
+        return self
+
+class GuideInfo:
+    kdamond_idx = None
+    context_idx = None
+    scheme_idx = None
+    tid = None
+    start_time = None
+    end_time = None
+    lowest_addr = None
+    highest_addr = None
+    gaps = None
+    contig_regions = None  # list of GuideRegion objects
+
+    def __init__(self, kdamond_idx, context_idx, scheme_idx, tid, start_time):
+        self.kdamond_idx = kdamond_idx
+        self.context_idx = context_idx
+        self.scheme_idx = scheme_idx
+        self.tid = tid
+        self.start_time = start_time
+        self.gaps = []
+
+    def regions(self):
+        regions = []
+        region = [self.lowest_addr]
+        for gap in self.gaps:
+            for idx, point in enumerate(gap):
+                if idx == 0:
+                    region.append(point)
+                    regions.append(region)
+                else:
+                    region = [point]
+        region.append(self.highest_addr)
+        regions.append(region)
+        return regions
+
+    def total_space(self):
+        ret = 0
+        for r in self.regions():
+            ret += r[1] - r[0]
+        return ret
+
+    def to_str(self, raw):
+        lines = []
+        if self.kdamond_idx is not None:
+            lines.append('kdamond_idx: %s' % self.kdamond_idx)
+        if self.context_idx is not None:
+            lines.append('context_idx: %s' % self.context_idx)
+        if self.scheme_idx is not None:
+            lines.append('scheme_idx: %s' % self.scheme_idx)
+        if self.tid is not None:
+            lines.append('target_id: %s' % self.tid)
+        lines.append('time: [%s, %s) (%s)' % (
+            _damo_fmt_str.format_time_ns(self.start_time, raw),
+            _damo_fmt_str.format_time_ns(self.end_time, raw),
+            _damo_fmt_str.format_time_ns(
+                self.end_time - self.start_time, raw)))
+        for idx, region in enumerate(self.contig_regions):
+            lines.append('region\t%2d: [%s, %s) (%s)' % (
+                idx,
+                _damo_fmt_str.format_sz_accurate(region.start_addr, raw),
+                _damo_fmt_str.format_sz_accurate(region.end_addr, raw),
+                _damo_fmt_str.format_sz(
+                    region.end_addr - region.start_addr, raw)))
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.to_str(raw=True)
+
+    def to_kvpairs(self):
+        return {
+                'kdamond_idx': self.kdamond_idx,
+                'context_idx': self.context_idx,
+                'scheme_idx': self.scheme_idx,
+                'tid': self.tid,
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                'lowest_addr': self.lowest_addr,
+                'highest_addr': self.highest_addr,
+                'gaps': self.gaps,
+                'contig_regions': [r.to_kvpairs()
+                                   for r in self.contig_regions],
+                }
+
+    @classmethod
+    def from_kvpairs(cls, kvpairs):
+        self = cls(kvpairs['kdamond_idx'], kvpairs['context_idx'],
+                   kvpairs['scheme_idx'], kvpairs['tid'],
+                   kvpairs['start_time'])
+        self.end_time = kvpairs['end_time']
+        self.lowest_addr = kvpairs['lowest_addr']
+        self.highest_addr = kvpairs['highest_addr']
+        self.gaps = kvpairs['gaps']
+        self.contig_regions = [GuideRegion.from_kvpairs(r)
+                               for r in kvpairs['contig_regions']]
+        return self
+
+def is_overlap(region1, region2):
+    if region1[1] < region2[0]:
+        return False
+    if region2[1] < region1[0]:
+        return False
+    return True
+
+def overlap_region_of(region1, region2):
+    return [max(region1[0], region2[0]), min(region1[1], region2[1])]
+
+def overlapping_regions(regions1, regions2):
+    overlap_regions = []
+    for r1 in regions1:
+        for r2 in regions2:
+            if is_overlap(r1, r2):
+                r1 = overlap_region_of(r1, r2)
+        if r1:
+            overlap_regions.append(r1)
+    return overlap_regions
+
+def oldest_monitor_time(snapshot, record_intervals):
+    if record_intervals is None:
+        return snapshot.start_time
+    longest_age = 0
+    for region in snapshot.regions:
+        if longest_age < region.age.aggr_intervals:
+            longest_age = region.age.aggr_intervals
+    aggr_interval_ns = record_intervals.aggr * 1000
+    return snapshot.start_time - longest_age * aggr_interval_ns
+
+def rec_to_guide_id(record):
+    return '%s %s %s %s' % (record.kdamond_idx, record.context_idx,
+                            record.scheme_idx, record.target_id)
+
+def snapshot_regions_columns(snapshot):
+    '''
+    Returns start addresses, end addresses and nr_accesses in samples of the
+    regions of the snapshot.  Avoid constructing the regions if possible.
+    '''
+    if (isinstance(snapshot, ColumnarSnapshot) and
+            not snapshot.regions_constructed()):
+        samples = snapshot.region_column('nr_accesses')
+        if not columnar_none in samples:
+            return (snapshot.region_column('start'),
+                    snapshot.region_column('end'), samples)
+    regions = snapshot.regions
+    return ([r.start for r in regions], [r.end for r in regions],
+            [r.nr_accesses.samples for r in regions])
+
+def sorted_ranges(starts, ends):
+    '''
+    Returns if the ranges are sorted by address and not overlapping each
+    other.
+    '''
+    return (all(map(operator.le, starts, ends)) and
+            all(map(operator.le, ends[:-1], starts[1:])))
+
+def update_guide_addrs(guide, starts, ends):
+    '''
+    Update lowest and highest addresses of the guide, and returns gaps between
+    the regions of the given start and end addresses.
+    '''
+    if (len(starts) > 0 and guide.lowest_addr != 0 and
+            guide.highest_addr != 0 and not 0 in starts and not 0 in ends):
+        if guide.lowest_addr is None:
+            guide.lowest_addr = min(starts)
+        else:
+            guide.lowest_addr = min(guide.lowest_addr, min(starts))
+        if guide.highest_addr is None:
+            guide.highest_addr = max(ends)
+        else:
+            guide.highest_addr = max(guide.highest_addr, max(ends))
+        return [[end, start] for end, start in zip(ends[:-1], starts[1:])
+                if end != start]
+
+    # zero address is treated as unset below
+    last_addr = None
+    gaps = []
+    for saddr, eaddr in zip(starts, ends):
+        if not guide.lowest_addr or saddr < guide.lowest_addr:
+            guide.lowest_addr = saddr
+        if not guide.highest_addr or eaddr > guide.highest_addr:
+            guide.highest_addr = eaddr
+
+        if not last_addr:
+            last_addr = eaddr
+            continue
+        if last_addr != saddr:
+            gaps.append([last_addr, saddr])
+        last_addr = eaddr
+    return gaps
+
+def overlapping_sorted_regions(regions1, regions2):
+    '''
+    Same to overlapping_regions(), but regions2 should be sorted and not
+    overlapping each other.  Find regions of regions2 that could overlap
+    with each region of regions1 via bisection.
+    '''
+    regions2_ends = [r[1] for r in regions2]
+    overlap_regions = []
+    for r1 in regions1:
+        idx = bisect.bisect_left(regions2_ends, r1[0])
+        while idx < len(regions2) and regions2[idx][0] <= r1[1]:
+            if is_overlap(r1, regions2[idx]):
+                r1 = overlap_region_of(r1, regions2[idx])
+            idx += 1
+        overlap_regions.append(r1)
+    return overlap_regions
+
+def add_guide_heats(contig_regions, starts, ends, nrs_accesses):
+    '''
+    Add heats of regions of the given columns to contig_regions, which should
+    be sorted and not overlapping each other.
+    '''
+    gregion_ends = [r.end_addr for r in contig_regions]
+    for start, end, nr_accesses in zip(starts, ends, nrs_accesses):
+        if nr_accesses == 0:
+            continue
+        idx = bisect.bisect_left(gregion_ends, start)
+        while (idx < len(contig_regions) and
+               contig_regions[idx].start_addr <= end):
+            gregion = contig_regions[idx]
+            idx += 1
+            if gregion.heats is None:
+                gregion.heats = 0
+            gregion.heats += (end - start) * nr_accesses
+
+def get_guide_info(records):
+    "return the set of guide information for the moitoring result"
+    guides = {}
+    for record in records:
+        guide_id = rec_to_guide_id(record)
+        for snapshot in record.snapshots:
+            if not guide_id in guides:
+                guides[guide_id] = GuideInfo(
+                        record.kdamond_idx, record.context_idx,
+                        record.scheme_idx, record.target_id,
+                        oldest_monitor_time(snapshot, record.intervals))
+            guide = guides[guide_id]
+            monitor_time = snapshot.end_time
+            guide.end_time = monitor_time
+
+            starts, ends, _ = snapshot_regions_columns(snapshot)
+            gaps = update_guide_addrs(guide, starts, ends)
+
+            if not guide.gaps:
+                guide.gaps = gaps
+            elif sorted_ranges([g[0] for g in gaps], [g[1] for g in gaps]):
+                guide.gaps = overlapping_sorted_regions(guide.gaps, gaps)
+            else:
+                guide.gaps = overlapping_regions(guide.gaps, gaps)
+
+    for guide_id, guide in guides.items():
+        guide_regions = []
+        for start, end in guide.regions():
+            guide_regions.append(GuideRegion(start, end))
+        guide.contig_regions = guide_regions
+        contig_regions_sorted = sorted_ranges(
+                [r.start_addr for r in guide_regions],
+                [r.end_addr for r in guide_regions])
+
+        for record in records:
+            if rec_to_guide_id(record) != guide_id:
+                continue
+            for snapshot in record.snapshots:
+                if contig_regions_sorted:
+                    add_guide_heats(guide.contig_regions,
+                                    *snapshot_regions_columns(snapshot))
+                    continue
+                for region in snapshot.regions:
+                    if region.nr_accesses.samples == 0:
+                        continue
+                    for gregion in guide.contig_regions:
+                        if (region.end < gregion.start_addr or
+                            gregion.end_addr < region.start):
+                            continue
+                        if gregion.heats is None:
+                            gregion.heats = 0
+                        gregion.heats += ((region.end - region.start) *
+                                          region.nr_accesses.samples)
+
+    return sorted(list(guides.values()), key=lambda x: x.total_space(),
+                    reverse=True)
+
+def write_columnar(records, file_path):
+    snapshot_columns = {name: array.array(typecode)
+                        for name, typecode in columnar_snapshot_columns}
+    region_columns = {name: array.array(typecode)
+                      for name, typecode in columnar_region_columns}
+    records_meta = []
+    nr_snapshots = 0
+    nr_regions = 0
+    for record in records:
+        record_meta = record.to_kvpairs(raw=True)
+        del record_meta['snapshots']
+        record_meta['snapshot_offset'] = nr_snapshots
+        record_meta['nr_snapshots'] = len(record.snapshots)
+        snapshot_extras = {}
+        for snapshot in record.snapshots:
+            extras = {}
+            if snapshot.damos_stats is not None:
+                extras['damos_stats'] = snapshot.damos_stats.to_kvpairs(
+                        raw=True)
+            if snapshot.sample_interval_us is not None:
+                extras['sample_interval_us'] = snapshot.sample_interval_us
+            probe_hits = {}
+
+            for idx, region in enumerate(snapshot.regions):
+                region_columns['start'].append(region.start)
+                region_columns['end'].append(region.end)
+                nr_accesses = region.nr_accesses
+                age = region.age
+                if nr_accesses is None:
+                    nr_accesses = _damon.DamonNrAccesses(None, None)
+                    age = _damon.DamonAge(None, None)
+                elif (nr_accesses.samples is None and
+                      record.intervals is not None):
+                    # don't change the records to save
+                    nr_accesses = copy.copy(nr_accesses)
+                    nr_accesses.add_unset_unit(record.intervals)
+                region_columns['nr_accesses'].append(
+                        columnar_value(nr_accesses.samples))
+                region_columns['age_usec'].append(columnar_value(age.usec))
+                region_columns['age_aggr_intervals'].append(
+                        columnar_value(age.aggr_intervals))
+                region_columns['sz_filter_passed'].append(
+                        columnar_value(region.sz_filter_passed))
+                if region.probe_hits:
+                    probe_hits['%d' % idx] = region.probe_hits
+            if probe_hits:
+                extras['probe_hits'] = probe_hits
+
+            total_bytes = snapshot.total_bytes
+            if total_bytes is None:
+                total_bytes = sum([r.size() for r in snapshot.regions])
+            snapshot_columns['start_time'].append(
+                    columnar_value(snapshot.start_time))
+            snapshot_columns['end_time'].append(
+                    columnar_value(snapshot.end_time))
+            snapshot_columns['total_bytes'].append(int(total_bytes))
+            snapshot_columns['region_offset'].append(nr_regions)
+            snapshot_columns['nr_regions'].append(len(snapshot.regions))
+            if extras:
+                snapshot_extras['%d' % nr_snapshots] = extras
+            nr_snapshots += 1
+            nr_regions += len(snapshot.regions)
+        record_meta['snapshot_extras'] = snapshot_extras
+        records_meta.append(record_meta)
+
+    # let report commands reuse the guides instead of reading all regions
+    guides = [g.to_kvpairs()
+              for g in get_guide_info(records)]
+    meta = json.dumps({'nr_snapshots': nr_snapshots, 'nr_regions': nr_regions,
+                       'records': records_meta, 'guides': guides}).encode()
+    with open(file_path, 'wb') as f:
+        f.write(columnar_magic)
+        f.write(struct.pack(columnar_header_fmt, columnar_version, len(meta)))
+        f.write(meta)
+        f.write(b'\0' * (columnar_aligned(f.tell()) - f.tell()))
+        for columns, column_names in [
+                [snapshot_columns, columnar_snapshot_columns],
+                [region_columns, columnar_region_columns]]:
+            for name, _ in column_names:
+                column = columns[name]
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                f.write(column.tobytes())
+
+def fake_snapshot_of(snapshot):
+    snap_duration = snapshot.end_time - snapshot.start_time
+    # -1 nr_accesses.samples / -1 age.aggr_intervals means fake
+    fake_regions = [_damon.DamonRegion(0, 0,
+        -1, _damon.unit_samples, -1, _damon.unit_aggr_intervals)]
+    return DamonSnapshot(snapshot.end_time,
+            snapshot.end_time + snap_duration, fake_regions, None)
+
 def add_fake_snapshot_if_needed(records):
     '''
     perf and record file format stores only snapshot end time.  For a record
@@ -606,17 +1569,33 @@ def add_fake_snapshot_if_needed(records):
         snapshots = record.snapshots
         if len(snapshots) != 1:
             continue
-        snapshot = snapshots[0]
-        snap_duration = snapshot.end_time - snapshot.start_time
-        # -1 nr_accesses.samples / -1 age.aggr_intervals means fake
-        fake_regions = [_damon.DamonRegion(0, 0,
-            -1, _damon.unit_samples, -1, _damon.unit_aggr_intervals)]
-        fake_snapshot = DamonSnapshot(snapshot.end_time,
-                snapshot.end_time + snap_duration, fake_regions, None)
-        snapshots.append(fake_snapshot)
+        snapshots.append(fake_snapshot_of(snapshots[0]))
 
-def write_perf_script(records, file_path):
+def with_fake_snapshots(target_snapshots):
+    '''
+    Streaming version of add_fake_snapshot_if_needed().  Yield given target id
+    and snapshot pairs, and then fake snapshots for targets that had only
+    single snapshot.
     '''
+    single_snapshots = collections.OrderedDict()
+    seen_targets = set()
+    for target_id, snapshot in target_snapshots:
+        if target_id in seen_targets:
+            single_snapshots.pop(target_id, None)
+        else:
+            seen_targets.add(target_id)
+            single_snapshots[target_id] = snapshot
+        yield target_id, snapshot
+    for target_id, snapshot in single_snapshots.items():
+        if snapshot.start_time is None:
+            continue
+        yield target_id, fake_snapshot_of(snapshot)
+
+def write_perf_script_snapshots(target_snapshots, file_path):
+    '''
+    Write given target id and snapshot pairs in perf script output format.
+    The pairs are written as soon as those are received.
+
     Example of the normal perf script output:
 
     kdamond.0  4452 [000] 82877.315633: damon:damon_aggregated: \
@@ -624,20 +1603,23 @@ def write_perf_script(records, file_path):
             140731667070976-140731668037632: 0 3
     '''
 
-    add_fake_snapshot_if_needed(records)
     with open(file_path, 'w') as f:
-        for record in records:
-            snapshots = record.snapshots
-            for snapshot in snapshots:
-                for region in snapshot.regions:
-                    f.write(' '.join(['kdamond.x', 'xxxx', 'xxxx',
-                        '%f:' % (snapshot.end_time / 1000000000.0),
-                        'damon:damon_aggregated:',
-                        'target_id=%s' % record.target_id,
-                        'nr_regions=%d' % len(snapshot.regions),
-                        '%d-%d: %d %s' % (region.start, region.end,
-                            region.nr_accesses.samples,
-                            region.age.aggr_intervals)]) + '\n')
+        for target_id, snapshot in target_snapshots:
+            for region in snapshot.regions:
+                f.write(' '.join(['kdamond.x', 'xxxx', 'xxxx',
+                    '%f:' % (snapshot.end_time / 1000000000.0),
+                    'damon:damon_aggregated:',
+                    'target_id=%s' % target_id,
+                    'nr_regions=%d' % len(snapshot.regions),
+                    '%d-%d: %d %s' % (region.start, region.end,
+                        region.nr_accesses.samples,
+                        region.age.aggr_intervals)]) + '\n')
+
+def write_perf_script(records, file_path):
+    add_fake_snapshot_if_needed(records)
+    write_perf_script_snapshots(
+            ((record.target_id, snapshot) for record in records
+             for snapshot in record.snapshots), file_path)
 
 def parse_file_permission_str(file_permission_str):
     try:
@@ -652,11 +1634,13 @@ file_type_perf_script = 'perf_script'   # perf script output
 file_type_perf_data = 'perf_data'       # perf record result file
 file_type_json = 'json'                 # list of DamonRecord objects in json
 file_type_json_compressed = 'json_compressed'
+file_type_columnar = 'columnar'         # memory-mappable region columns
+file_type_json_lines = 'json_lines'     # a DamonRecord object per line
 
 file_types = [file_type_json_compressed, file_type_json, file_type_perf_script,
-        file_type_perf_data]
+        file_type_perf_data, file_type_columnar, file_type_json_lines]
 self_write_supported_file_types = [file_type_json_compressed, file_type_json,
-        file_type_perf_script]
+        file_type_perf_script, file_type_columnar, file_type_json_lines]
 
 def write_damon_records(records, file_path, file_type, file_permission=None):
     '''Returns None if success, an error string otherwise'''
@@ -669,11 +1653,47 @@ def write_damon_records(records, file_path, file_type, file_permission=None):
         write_json(records, file_path)
     elif file_type == file_type_perf_script:
         write_perf_script(records, file_path)
+    elif file_type == file_type_columnar:
+        write_columnar(records, file_path)
+    elif file_type == file_type_json_lines:
+        write_json_lines(records, file_path)
 
     if file_permission is not None:
         os.chmod(file_path, file_permission)
     return None
 
+def convert_trace_to_damon_data(
+        trace_lines, dst_file, file_format, file_permission,
+        monitoring_intervals):
+    '''
+    Convert given lines of 'perf script' or 'trace-cmd report' output to given
+    format of DAMON record file.  If the format is perf_script, snapshots are
+    written as soon as those are parsed, without keeping those in memory.
+    Returns None if success, an error string otherwise.
+    '''
+    if file_format != file_type_perf_script:
+        records, err = parse_damon_trace_lines(
+                trace_lines, monitoring_intervals)
+        if err:
+            return err
+        return write_damon_records(records, dst_file, file_format,
+                file_permission)
+
+    # dst_file could be the source of trace_lines.  Write to a temporal file.
+    tmp_file = '%s.tmp' % dst_file
+    try:
+        write_perf_script_snapshots(
+                with_fake_snapshots(damon_trace_snapshots(trace_lines)),
+                tmp_file)
+    except Exception as e:
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+        return '%s' % e
+    os.rename(tmp_file, dst_file)
+    if file_permission is not None:
+        os.chmod(dst_file, file_permission)
+    return None
+
 def convert_perf_to_damon_data(
         src_file, dst_file, file_format, file_permission=None,
         monitoring_intervals=None, perf_cmd='perf'):
@@ -681,31 +1701,115 @@ def convert_perf_to_damon_data(
         os.chmod(dst_file, file_permission)
         return None
 
-    records, err = parse_perf_damon_record(
-            src_file, monitoring_intervals, perf_cmd=perf_cmd)
-    if err:
-        return err
-    return write_damon_records(records, dst_file, file_format,
-            file_permission)
+    err = convert_trace_to_damon_data(
+            perf_script_lines(src_file, perf_cmd), dst_file, file_format,
+            file_permission, monitoring_intervals)
+    if err is not None:
+        return 'failed perf-script (%s)' % err
+    return None
 
 def convert_trace_cmd_to_damon_data(
         file_path, file_format, file_permission, monitoring_intervals):
-    try:
-        with open(os.devnull, 'w') as fnull:
-            output = subprocess.check_output(
-                    ['trace-cmd', 'report', '-i', file_path],
-                    stderr=fnull).decode()
-    except Exception as e:
-        return 'trace-cmd report fail (%s)' % e
-    records, err = parse_damon_trace(
-            output, 'trace-cmd-report', monitoring_intervals)
-    if err:
+    err = convert_trace_to_damon_data(
+            trace_cmd_report_lines(file_path), file_path, file_format,
+            file_permission, monitoring_intervals)
+    if err is not None:
         return 'trace-cmd output parsing fail (%s)' % err
-    return write_damon_records(records, file_path, file_format,
-                               file_permission)
+    return None
 
 # for recording
 
+class ProcFile:
+    '''
+    A /proc file that is kept opened and read from the beginning via pread()
+    for each sampling, to avoid opening and closing it for every sampling.
+    '''
+    fd = None
+    sz_buf = None
+
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDONLY)
+        self.sz_buf = 4096
+
+    def read(self):
+        chunks = []
+        offset = 0
+        while True:
+            chunk = os.pread(self.fd, self.sz_buf, offset)
+            if len(chunk) == 0:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+        if offset > self.sz_buf:
+            self.sz_buf = offset
+        return b''.join(chunks)
+
+    def close(self):
+        os.close(self.fd)
+
+class ProcSampler:
+    '''
+    Reader of /proc files for periodic sampling.  Files are kept opened
+    between samplings, up to max_open_files.  Files of processes that
+    terminated or not sampled anymore are closed.
+    '''
+    files = None            # path to ProcFile
+    last_contents = None    # path to content of last read
+    max_open_files = 256
+
+    def __init__(self):
+        self.files = {}
+        self.last_contents = {}
+
+    def read(self, path):
+        proc_file = self.files.get(path)
+        try:
+            if proc_file is None:
+                if len(self.files) >= self.max_open_files:
+                    with open(path, 'rb') as f:
+                        return f.read()
+                proc_file = ProcFile(path)
+                self.files[path] = proc_file
+            return proc_file.read()
+        except OSError:
+            # the process may terminated.
+            if proc_file is not None:
+                proc_file.close()
+                del self.files[path]
+            return None
+
+    def read_files(self, paths):
+        '''
+        Returns contents of the files, or None for files that cannot be read.
+        '''
+        paths_set = set(paths)
+        for path in [p for p in self.files if not p in paths_set]:
+            self.files.pop(path).close()
+        for path in [p for p in self.last_contents if not p in paths_set]:
+            del self.last_contents[path]
+        contents = [self.read(path) for path in paths]
+        for path, content in zip(paths, contents):
+            self.last_contents[path] = content
+        return contents
+
+    def close(self):
+        for proc_file in self.files.values():
+            proc_file.close()
+        self.files = {}
+        self.last_contents = {}
+
+def target_pids(kdamonds, include_kdamonds=False):
+    pids = []
+    for kdamond in kdamonds:
+        if include_kdamonds:
+            pids.append(kdamond.pid)
+        for ctx in kdamond.contexts:
+            for target in ctx.targets:
+                if target.pid is None:
+                    continue
+                pids.append(target.pid)
+    return pids
+
 # Meaning of the fields of ProcMemFootprint are as below.
 #
 # ======== ===============================       ==============================
@@ -725,6 +1829,8 @@ def convert_trace_cmd_to_damon_data(
 #
 # The above table is stolen from Documentation/filesystems/proc.rst file of
 # Linux
+statm_fields = ['size', 'resident', 'shared', 'trs', 'lrs', 'drs', 'dt']
+
 class ProcMemFootprint:
     size = None
     resident = None
@@ -734,16 +1840,21 @@ class ProcMemFootprint:
     drs = None
     dt = None
 
-    def __init__(self, pid=None):
+    def __init__(self, pid=None, statm=None):
         if pid is None:
             return
 
-        try:
-            with open('/proc/%s/statm' % pid, 'r') as f:
-                fields = [int(x) for x in f.read().split()]
-        except:
+        if statm is None:
+            try:
+                with open('/proc/%s/statm' % pid, 'r') as f:
+                    statm = f.read()
+            except:
+                pass
+        if statm is None:
             # the process may terminated.  Just think it as not using memory.
             fields = [0 for _ in range(7)]
+        else:
+            fields = [int(x) for x in statm.split()]
         self.size = fields[0]
         self.resident = fields[1]
         self.shared = fields[2]
@@ -767,6 +1878,12 @@ class ProcMemFootprint:
         self.dt = kvpairs['dt']
         return self
 
+meminfo_fields = {b'MemTotal': 'total', b'MemFree': 'free',
+                  b'MemAvailable': 'available', b'Buffers': 'buffers',
+                  b'Cached': 'cached'}
+meminfo_pattern = re.compile(
+        rb'^(MemTotal|MemFree|MemAvailable|Buffers|Cached):\s+(\d+)', re.M)
+
 class SysMemFootprint:
     total = None
     free = None
@@ -774,22 +1891,14 @@ class SysMemFootprint:
     buffers = None
     cached = None
 
-    def __init__(self, populate):
+    def __init__(self, populate, meminfo=None):
         if populate is False:
             return
-        with open('/proc/meminfo', 'r') as f:
-            for line in f:
-                fields = line.split()
-                if fields[0] == 'MemTotal:':
-                    self.total = int(fields[1])
-                if fields[0] == 'MemFree:':
-                    self.free = int(fields[1])
-                if fields[0] == 'MemAvailable:':
-                    self.available = int(fields[1])
-                if fields[0] == 'Buffers:':
-                    self.buffers = int(fields[1])
-                if fields[0] == 'Cached:':
-                    self.cached = int(fields[1])
+        if meminfo is None:
+            with open('/proc/meminfo', 'rb') as f:
+                meminfo = f.read()
+        for key, value in meminfo_pattern.findall(meminfo):
+            setattr(self, meminfo_fields[key], int(value))
 
     def to_kvpairs(self):
         return self.__dict__
@@ -805,61 +1914,88 @@ class SysMemFootprint:
         return self
 
 class MemFootprintsSnapshot:
+    '''
+    Memory footprints of processes and the system at a time.  Footprints of
+    the processes are stored in per-statm-field typed columns, each having
+    the values of the processes in the order of 'pids'.
+    '''
     time = None
-    footprints = None
+    pids = None
+    columns = None  # statm field name to array of the processes' values
+    sys_footprint = None
 
-    def __init__(self, pids=None):
+    def __init__(self, pids=None, sampler=None):
         if pids is None:
             return
 
+        if sampler is None:
+            sampler = ProcSampler()
         self.time = time.time()
-        self.footprints = {}
-        for pid in pids:
-            self.footprints[pid] = ProcMemFootprint(pid)
-        self.footprints['sys'] = SysMemFootprint(populate=True)
+        # footprint of a process is recorded once
+        self.pids = list(dict.fromkeys(pids))
+        pids = self.pids
+        self.columns = {name: array.array('q') for name in statm_fields}
+        contents = sampler.read_files(
+                ['/proc/%s/statm' % pid for pid in pids] + ['/proc/meminfo'])
+        for statm in contents[:-1]:
+            if statm is None:
+                # the process may terminated.  Think it as not using memory.
+                fields = [0] * len(statm_fields)
+            else:
+                fields = statm.split()
+            for name, field in zip(statm_fields, fields):
+                self.columns[name].append(int(field))
+        self.sys_footprint = SysMemFootprint(
+                populate=True, meminfo=contents[-1])
+
+    @property
+    def footprints(self):
+        footprints = {}
+        for idx, pid in enumerate(self.pids):
+            fp = ProcMemFootprint()
+            for name in statm_fields:
+                setattr(fp, name, self.columns[name][idx])
+            footprints[pid] = fp
+        footprints[None] = self.sys_footprint
+        return footprints
 
     def to_kvpairs(self):
-        footprints = []
-        for target, fp in self.footprints.items():
-            if target == 'sys':
-                pid = None
-            else:
-                pid = target
-            footprints.append({'pid': pid, 'footprint': fp.to_kvpairs()})
-        return {'time': self.time, 'footprints': footprints}
+        return {'time': self.time, 'pids': self.pids,
+                'statm_columns': {name: column.tolist()
+                                  for name, column in self.columns.items()},
+                'sys_footprint': self.sys_footprint.to_kvpairs()}
 
     @classmethod
     def from_kvpairs(cls, kvpairs):
         self = cls()
         self.time = kvpairs['time']
-        self.footprints = {}
+        if 'statm_columns' in kvpairs:
+            self.pids = kvpairs['pids']
+            self.columns = {name: array.array('q', column) for name, column
+                            in kvpairs['statm_columns'].items()}
+            self.sys_footprint = SysMemFootprint.from_kvpairs(
+                    kvpairs['sys_footprint'])
+            return self
+
+        # old format having kvpairs per process
+        self.pids = []
+        self.columns = {name: array.array('q') for name in statm_fields}
         for fp in kvpairs['footprints']:
             pid, footprint = fp['pid'], fp['footprint']
             if pid is None:
-                self.footprints[pid] = SysMemFootprint.from_kvpairs(footprint)
-            else:
-                self.footprints[pid] = ProcMemFootprint.from_kvpairs(footprint)
+                self.sys_footprint = SysMemFootprint.from_kvpairs(footprint)
+                continue
+            self.pids.append(pid)
+            for name in statm_fields:
+                self.columns[name].append(footprint[name])
         return self
 
-def record_mem_footprint(kdamonds, snapshots):
-    pids = []
-    for kdamond in kdamonds:
-        for ctx in kdamond.contexts:
-            for target in ctx.targets:
-                if target.pid is None:
-                    continue
-                pids.append(target.pid)
-    snapshots.append(MemFootprintsSnapshot(pids))
-
-def save_mem_footprint(snapshots, filepath, file_permission):
-    with open(filepath, 'w') as f:
-        json.dump([s.to_kvpairs() for s in snapshots], f, indent=4)
-    os.chmod(filepath, file_permission)
+def record_mem_footprint(kdamonds, snapshots, sampler=None):
+    snapshots.append(MemFootprintsSnapshot(target_pids(kdamonds), sampler))
 
 def load_mem_footprint(filepath):
-    with open(filepath, 'r') as f:
-        kvpairs = json.load(f)
-    return [MemFootprintsSnapshot.from_kvpairs(x) for x in kvpairs]
+    return [MemFootprintsSnapshot.from_kvpairs(x)
+            for x in load_json_objects(filepath)]
 
 class Vma:
     start = None
@@ -880,28 +2016,33 @@ class Vma:
         self.start = kvpairs['start']
         self.end = kvpairs['end']
         self.name = kvpairs['name']
+        return self
+
+def parse_maps_line(line):
+    fields = line.split()
+    start, end = [int(addr, 16) for addr in fields[0].split(b'-')]
+    return start, end, fields[-1].decode()
 
 class ProcVmas:
     pid = None
     vmas = None
 
-    def __init__(self, pid):
+    def __init__(self, pid, maps=None):
         self.pid = pid
         self.vmas = []
 
         if pid is None:
             return
 
-        try:
-            with open('/proc/%s/maps' % pid, 'r') as f:
-                for line in f:
-                    fields = line.split()
-                    start, end = [int(addr, 16) for addr in fields[0].split('-')]
-                    name = fields[-1]
-                    self.vmas.append(Vma(start, end, name))
-        except:
-            # the process may terminated.
-            return
+        if maps is None:
+            try:
+                with open('/proc/%s/maps' % pid, 'rb') as f:
+                    maps = f.read()
+            except:
+                # the process may terminated.
+                return
+        for line in maps.splitlines():
+            self.vmas.append(Vma(*parse_maps_line(line)))
 
     def to_kvpairs(self):
         kvpairs = {'pid': self.pid}
@@ -913,22 +2054,62 @@ class ProcVmas:
         self = cls(None)
         self.pid = kvpairs['pid']
         self.vmas = [Vma.from_kvpairs(kvp) for kvp in kvpairs['vmas']]
+        return self
+
+def maps_diff(old_maps, new_maps):
+    '''
+    Returns [start, end, name] of vmas that added and removed from old_maps to
+    new_maps, which are /proc/<pid>/maps contents.
+    '''
+    old_lines = set(old_maps.splitlines()) if old_maps else set()
+    new_lines = set(new_maps.splitlines()) if new_maps else set()
+    added = set(parse_maps_line(l) for l in new_lines - old_lines)
+    removed = set(parse_maps_line(l) for l in old_lines - new_lines)
+    # changes of fields other than start, end and name are not interested
+    unchanged = added & removed
+    return ([list(v) for v in sorted(added - unchanged)],
+            [list(v) for v in sorted(removed - unchanged)])
 
 class ProcVmasSnapshot:
+    '''
+    Memory mappings of processes at a time.  When being recorded, only the
+    mappings that added and removed since the last snapshot are saved, as
+    'vmas_diffs'.  load_proc_vmas() restores full mappings from those.
+    '''
     time = None
     procvmas = None
+    pids = None
+    vmas_diffs = None   # list of [pid, added vmas, removed vmas]
 
-    def __init__(self, pids):
+    def __init__(self, pids, sampler=None):
         if pids is None:
             return
 
         self.time = time.time()
-        self.procvmas = []
-        for pid in pids:
-            self.procvmas.append(ProcVmas(pid))
+        if sampler is None:
+            self.procvmas = []
+            for pid in pids:
+                self.procvmas.append(ProcVmas(pid))
+            return
+
+        self.pids = pids
+        self.vmas_diffs = []
+        paths = ['/proc/%s/maps' % pid for pid in pids]
+        last_contents = [sampler.last_contents.get(p) for p in paths]
+        for pid, last, maps in zip(pids, last_contents,
+                                   sampler.read_files(paths)):
+            if maps == last:
+                continue
+            added, removed = maps_diff(last, maps)
+            if len(added) > 0 or len(removed) > 0:
+                self.vmas_diffs.append([pid, added, removed])
 
     def to_kvpairs(self):
         kvpairs = {'time': self.time}
+        if self.vmas_diffs is not None:
+            kvpairs['pids'] = self.pids
+            kvpairs['vmas_diffs'] = self.vmas_diffs
+            return kvpairs
         kvpairs['procvmas'] = [p.to_kvpairs() for p in self.procvmas]
         return kvpairs
 
@@ -936,28 +2117,40 @@ class ProcVmasSnapshot:
     def from_kvpairs(cls, kvpairs):
         self = cls(None)
         self.time = kvpairs['time']
+        if 'vmas_diffs' in kvpairs:
+            self.pids = kvpairs['pids']
+            self.vmas_diffs = kvpairs['vmas_diffs']
+            return self
         self.procvmas = [ProcVmas.from_kvpairs(kvp)
                          for kvp in kvpairs['procvmas']]
+        return self
 
-def record_proc_vmas(kdamonds, snapshots):
-    pids = []
-    for kdamond in kdamonds:
-        for ctx in kdamond.contexts:
-            for target in ctx.targets:
-                if target.pid is None:
-                    continue
-                pids.append(target.pid)
-    snapshots.append(ProcVmasSnapshot(pids))
-
-def save_proc_vmas(snapshots, filepath, file_permission):
-    with open(filepath, 'w') as f:
-        json.dump([s.to_kvpairs() for s in snapshots], f, indent=4)
-    os.chmod(filepath, file_permission)
+def record_proc_vmas(kdamonds, snapshots, sampler=None):
+    snapshots.append(ProcVmasSnapshot(target_pids(kdamonds), sampler))
 
 def load_proc_vmas(filepath):
-    with open(filepath, 'r') as f:
-        kvpairs = json.load(f)
-    return [ProcVmasSnapshot.from_kvpairs(x) for x in kvpairs]
+    snapshots = [ProcVmasSnapshot.from_kvpairs(x)
+                 for x in load_json_objects(filepath)]
+    vmas_of_pids = {}
+    for snapshot in snapshots:
+        if snapshot.vmas_diffs is None:
+            continue
+        # the recorder forgets processes that not sampled
+        for pid in [p for p in vmas_of_pids if not p in snapshot.pids]:
+            del vmas_of_pids[pid]
+        for pid, added, removed in snapshot.vmas_diffs:
+            vmas = vmas_of_pids.setdefault(pid, {})
+            for start, end, name in removed:
+                vmas.pop((start, end, name), None)
+            for start, end, name in added:
+                vmas[(start, end, name)] = True
+        snapshot.procvmas = []
+        for pid in snapshot.pids:
+            procvmas = ProcVmas(None)
+            procvmas.pid = pid
+            procvmas.vmas = [Vma(*v) for v in sorted(vmas_of_pids.get(pid, {}))]
+            snapshot.procvmas.append(procvmas)
+    return snapshots
 
 class ProcStat:
     fields = None
@@ -981,6 +2174,7 @@ class ProcStat:
     def from_kvpairs(cls, kvpairs):
         self = cls(None)
         self.fields = kvpairs['fields']
+        return self
 
     def __str__(self):
         if self.fields is None:
@@ -1006,14 +2200,22 @@ class ProcStatsSnapshot:
     time = None
     proc_stats = None
 
-    def __init__(self, pids):
+    def __init__(self, pids, sampler=None):
         if pids is None:
             return
 
         self.time = time.time()
         self.proc_stats = []
-        for pid in pids:
-            self.proc_stats.append(ProcStat(pid))
+        if sampler is None:
+            for pid in pids:
+                self.proc_stats.append(ProcStat(pid))
+            return
+        stats = sampler.read_files(['/proc/%s/stat' % pid for pid in pids])
+        for pid, stat in zip(pids, stats):
+            proc_stat = ProcStat(None)
+            if stat is not None:
+                proc_stat.fields = stat.decode().split()
+            self.proc_stats.append(proc_stat)
 
     def to_kvpairs(self):
         kvpairs = {'time': self.time}
@@ -1026,27 +2228,15 @@ class ProcStatsSnapshot:
         self.time = kvpairs['time']
         self.proc_stats = [ProcStat.from_kvpairs(kvp)
                          for kvp in kvpairs['proc_stats']]
+        return self
 
-def record_proc_stats(kdamonds, snapshots):
-    pids = []
-    for kdamond in kdamonds:
-        pids.append(kdamond.pid)
-        for ctx in kdamond.contexts:
-            for target in ctx.targets:
-                if target.pid is None:
-                    continue
-                pids.append(target.pid)
-    snapshots.append(ProcStatsSnapshot(pids))
-
-def save_proc_stats(snapshots, filepath, file_permission):
-    with open(filepath, 'w') as f:
-        json.dump([s.to_kvpairs() for s in snapshots], f, indent=4)
-    os.chmod(filepath, file_permission)
+def record_proc_stats(kdamonds, snapshots, sampler=None):
+    snapshots.append(ProcStatsSnapshot(
+        target_pids(kdamonds, include_kdamonds=True), sampler))
 
 def load_proc_stats(filepath):
-    with open(filepath, 'r') as f:
-        kvpairs = json.load(f)
-    return [ProcStatsSnapshot.from_kvpairs(x) for x in kvpairs]
+    return [ProcStatsSnapshot.from_kvpairs(x)
+            for x in load_json_objects(filepath)]
 
 def all_targets_terminated(targets):
     for target in targets:
@@ -1079,17 +2269,25 @@ class RecordingHandle:
     f'{handle.file_path}'
       - The DAMON monitoring results.  Have a json list of DamonRecord kvpair
         objects.  Each DamonRecord is for each target or scheme of the kdamond.
+    f'{handle.file_path}.partial'
+      - Snapshots based DAMON monitoring results that recorded so far.  Have a
+        DamonRecord kvpair object per line.  Converted to f'{handle.file_path}'
+        and removed when the recording is finished.
     f'{handle.file_path}.profile'
       - 'perf record' output file.
     f'{handle.file_path}.mem_footprint'
-      - System and monitoring target process memory footprints.  Have a json
-        list of MemFootprintsSnapshot kvpair objects.
+      - System and monitoring target process memory footprints.  Have a
+        MemFootprintsSnapshot kvpair object per line.
     f'{handle.file_path}.vmas'
-      - Monitoring target process memory mappings.  Have a json list of
-        ProcVmaSnapshot kvpair objects.
+      - Monitoring target process memory mappings.  Have a ProcVmaSnapshot
+        kvpair object per line.  Each line has only the mappings that added
+        or removed since the previous line.
     f'{handle.file_path}.proc_stats'
       - Kdamonds and monitoring target processes /proc/PID/stat contents.  Have
-        a json list of ProcStatsSnapshot kvpair objects.
+        a ProcStatsSnapshot kvpair object per line.
+
+    The json lines files are written as soon as each snapshot is taken, so
+    those can be read even if the recording is not finished properly.
     '''
 
     file_path = None
@@ -1108,8 +2306,8 @@ class RecordingHandle:
 
     # for access patterns snapshot
     snapshot_request = None # SnapshotRequest object.
-    snapshot_records = None # list of DamonRecord objects retrieved via
-                            # get_snapshot_records_of()
+    snapshot_records = None # JsonLinesWriter of DamonRecord objects retrieved
+                            # via get_snapshot_records_of()
     snapshot_count = None
     snapshot_interval_sec = None
 
@@ -1121,15 +2319,26 @@ class RecordingHandle:
     kdamonds = None
     add_child_tasks = None
     mem_footprint_snapshots = None
+    mem_footprint_sampler = None
 
     # for vmas recording
     vmas_snapshots = None
+    vmas_sampler = None
 
     # for /proc/<pid>/stat recording
     proc_stats = None
+    proc_stats_sampler = None
 
     timeout = None
 
+    # RecordingProducer objects for periodic samplings, and the queue and the
+    # thread for writing the samplings in background.
+    producers = None
+    write_queue = None
+    writer_thread = None
+    # set by signal handlers to make the recording loop stop
+    stop_requested = False
+
     # max length of records per output file.
     # If a recording is continued longer than this, all information recorded so
     # far is saved at self.file_path.%Y-%m-%d-%H-%M-%S/ directory.
@@ -1158,16 +2367,30 @@ class RecordingHandle:
         self.kdamonds = kdamonds
         self.add_child_tasks = add_child_tasks
         if record_mem_footprint is True:
-            self.mem_footprint_snapshots = []
+            self.mem_footprint_snapshots = JsonLinesWriter(
+                    '%s.mem_footprint' % file_path, file_permission)
+            self.mem_footprint_sampler = ProcSampler()
         if record_vmas is True:
-            self.vmas_snapshots = []
+            self.vmas_snapshots = JsonLinesWriter(
+                    '%s.vmas' % file_path, file_permission)
+            self.vmas_sampler = ProcSampler()
 
         if record_proc_stats is True:
-            self.proc_stats = []
+            self.proc_stats = JsonLinesWriter(
+                    '%s.proc_stats' % file_path, file_permission)
+            self.proc_stats_sampler = ProcSampler()
 
         self.timeout = timeout
 
         self.snapshot_request = snapshot_request
+        if snapshot_request is not None:
+            if file_format == file_type_json_lines:
+                records_path = file_path
+            else:
+                records_path = '%s.partial' % file_path
+            self.snapshot_records = JsonLinesWriter(
+                    records_path, file_permission,
+                    lambda record: record.to_kvpairs(raw=True))
         self.snapshot_interval_sec = snapshot_interval_sec
         self.snapshot_count = snapshot_count
 
@@ -1229,75 +2452,269 @@ def record_source_is_running(record_handle):
     return poll_target_pids(record_handle.kdamonds) or \
             _damon.any_kdamond_running()
 
+class RecordingProducer:
+    '''
+    A periodic sampling for recording.  Each sampling is scheduled on a
+    deadline that is computed from the start time and the interval, so that
+    the interval is kept regardless of how long the samplings take.  If a
+    sampling is delayed by more than the interval, the samplings for the
+    passed deadlines are dropped.
+
+    'sample_fn' receives a list, and appends objects to write to 'writer' to
+    the list.
+    '''
+    name = None
+    interval_sec = None
+    sample_fn = None
+    writer = None       # JsonLinesWriter, or None
+    next_deadline = None
+
+    nr_samples = None
+    nr_dropped = None   # samplings that dropped due to delays
+    total_drift_sec = None  # sum of delays of samplings from the deadlines
+    max_drift_sec = None
+
+    def __init__(self, name, interval_sec, sample_fn, writer, start_time):
+        self.name = name
+        self.interval_sec = interval_sec
+        self.sample_fn = sample_fn
+        self.writer = writer
+        self.next_deadline = start_time
+        self.nr_samples = 0
+        self.nr_dropped = 0
+        self.total_drift_sec = 0
+        self.max_drift_sec = 0
+
+    def sample(self, now, write_queue):
+        drift = now - self.next_deadline
+        self.total_drift_sec += drift
+        self.max_drift_sec = max(self.max_drift_sec, drift)
+        self.nr_samples += 1
+        objs = []
+        self.sample_fn(objs)
+        for obj in objs:
+            write_queue.put([self.writer.append, obj])
+
+        self.next_deadline += self.interval_sec
+        now = time.time()
+        if now > self.next_deadline:
+            nr_missed = int(
+                    (now - self.next_deadline) // self.interval_sec) + 1
+            self.nr_dropped += nr_missed
+            self.next_deadline += nr_missed * self.interval_sec
+
+    def fmt_stat(self):
+        if self.nr_samples == 0:
+            return '%s: no sample' % self.name
+        return '%s: %d samples, %d dropped, drift avg %s max %s' % (
+                self.name, self.nr_samples, self.nr_dropped,
+                _damo_fmt_str.format_time_sec(
+                    self.total_drift_sec / self.nr_samples, False),
+                _damo_fmt_str.format_time_sec(self.max_drift_sec, False))
+
+def recording_producers(handle, interval_sec, start_time):
+    '''
+    Returns RecordingProducer objects for the handle, in the order of the
+    samplings.  Snapshot producer, if exists, is the last one.
+    '''
+    producers = []
+    if handle.add_child_tasks is True:
+        producers.append(RecordingProducer(
+            'child_tasks', interval_sec,
+            lambda objs: _damon.add_commit_vaddr_child_targets(
+                handle.kdamonds), None, start_time))
+    if handle.mem_footprint_snapshots is not None:
+        producers.append(RecordingProducer(
+            'mem_footprint', interval_sec,
+            lambda objs: record_mem_footprint(
+                handle.kdamonds, objs, handle.mem_footprint_sampler),
+            handle.mem_footprint_snapshots, start_time))
+    if handle.vmas_snapshots is not None:
+        producers.append(RecordingProducer(
+            'vmas', interval_sec,
+            lambda objs: record_proc_vmas(
+                handle.kdamonds, objs, handle.vmas_sampler),
+            handle.vmas_snapshots, start_time))
+    if handle.proc_stats is not None:
+        producers.append(RecordingProducer(
+            'proc_stats', interval_sec,
+            lambda objs: record_proc_stats(
+                handle.kdamonds, objs, handle.proc_stats_sampler),
+            handle.proc_stats, start_time))
+    if handle.snapshot_request:
+        producers.append(RecordingProducer(
+            'snapshot', interval_sec,
+            lambda objs: record_snapshot_records(handle, objs),
+            handle.snapshot_records, start_time))
+    return producers
+
+def record_snapshot_records(handle, records):
+    snapshot_records, err = get_snapshot_records_of(handle.snapshot_request)
+    if err is not None:
+        print('failed getting snapshot')
+        exit(1)
+    records += snapshot_records
+
+def recording_writer_loop(write_queue):
+    '''
+    Do writes that queued by the recording loop, until None is queued.  Each
+    write is a list of a function and its argument.
+    '''
+    while True:
+        work = write_queue.get()
+        if work is None:
+            break
+        fn, arg = work
+        try:
+            fn(arg)
+        except Exception as e:
+            print('recording output write failed (%s)' % e)
+
+def rollover_recording_outputs(handle_and_kdamonds):
+    '''
+    Save the outputs so far and restart the tracing.  'handle_and_kdamonds'
+    is the recording handle and the kvpairs of its kdamonds at the time of the
+    rollover, since the kdamonds can be changed by the recording loop.
+    '''
+    handle, kdamonds_kvpairs = handle_and_kdamonds
+    # the json lines writers start new files from next append
+    try:
+        save_recording_outputs(handle, handle.file_path, kdamonds_kvpairs)
+    finally:
+        start_damon_tracing(handle)
+
+def sleep_recording(handle, wakeup_time):
+    '''Sleep until wakeup_time, or stop of the recording is requested'''
+    while not handle.stop_requested:
+        now = time.time()
+        if now >= wakeup_time:
+            break
+        time.sleep(min(wakeup_time - now, 0.1))
+
 def start_recording(handle):
+    '''
+    Run the periodic samplings of the recording until the recording source is
+    finished, the timeout is passed, the requested number of snapshots are
+    taken, or handle.stop_requested is set.  The samplings are written by a
+    background thread, so that those are not delayed by the writes and the
+    output files rollover.
+    '''
     start_damon_tracing(handle)
 
     start_time = time.time()
     last_output_saved_time = start_time
     nr_snapshots_to_take = handle.snapshot_count
     if handle.snapshot_interval_sec:
-        sleep_time = handle.snapshot_interval_sec
+        interval_sec = handle.snapshot_interval_sec
     else:
-        sleep_time = 1
-    while record_source_is_running(handle):
-        if handle.add_child_tasks is True:
-            _damon.add_commit_vaddr_child_targets(handle.kdamonds)
-
-        if handle.mem_footprint_snapshots is not None:
-            record_mem_footprint(handle.kdamonds,
-                                 handle.mem_footprint_snapshots)
-        if handle.vmas_snapshots is not None:
-            record_proc_vmas(handle.kdamonds, handle.vmas_snapshots)
-
-        if handle.proc_stats is not None:
-            record_proc_stats(handle.kdamonds, handle.proc_stats)
-
+        interval_sec = 1
+
+    handle.write_queue = queue.Queue()
+    handle.writer_thread = threading.Thread(
+            target=recording_writer_loop, args=[handle.write_queue],
+            daemon=True)
+    handle.writer_thread.start()
+    handle.producers = recording_producers(handle, interval_sec, start_time)
+    samplers = handle.producers
+    snapshot_producer = None
+    if handle.snapshot_request:
+        samplers = handle.producers[:-1]
+        snapshot_producer = handle.producers[-1]
+        start_snapshot_sessions()
+
+    while not handle.stop_requested and record_source_is_running(handle):
+        now = time.time()
+        for producer in samplers:
+            if producer.next_deadline <= now:
+                producer.sample(time.time(), handle.write_queue)
+
+        now = time.time()
         if (handle.timeout is not None and
-            time.time() - start_time >= handle.timeout):
+            now - start_time >= handle.timeout):
             break
-        if (handle.max_seconds_per_file is not None and time.time() -
-            last_output_saved_time >= handle.max_seconds_per_file):
-            last_output_saved_time = time.time()
+        if (handle.max_seconds_per_file is not None and
+            now - last_output_saved_time >= handle.max_seconds_per_file):
+            last_output_saved_time = now
             handle.max_seconds_per_file_exceeded = True
-
-            save_recording_outputs(handle, handle.file_path)
-
-            if handle.mem_footprint_snapshots is not None:
-                handle.mem_footprint_snapshots = []
-            if handle.vmas_snapshots is not None:
-                handle.vmas_snapshots = []
-            if handle.proc_stats is not None:
-                handle.proc_stats = []
-            if handle.snapshot_records is not None:
-                handle.snapshot_records = []
-            start_damon_tracing(handle)
-
-        if handle.snapshot_request:
-            if handle.snapshot_records is None:
-                handle.snapshot_records = []
-            snapshot_records, err = get_snapshot_records_of(
-                    handle.snapshot_request)
-            if err is not None:
-                print('failed getting snapshot')
-                exit(1)
-            handle.snapshot_records += snapshot_records
+            handle.write_queue.put([rollover_recording_outputs, [
+                handle, [k.to_kvpairs() for k in handle.kdamonds]]])
+            if handle.vmas_sampler is not None:
+                # save all vmas in the first snapshot of the new file
+                handle.vmas_sampler.last_contents = {}
+
+        if (snapshot_producer is not None and
+                snapshot_producer.next_deadline <= now):
+            snapshot_producer.sample(now, handle.write_queue)
             nr_snapshots_to_take -= 1
             if nr_snapshots_to_take == 0:
                 break
 
-        time.sleep(sleep_time)
+        wakeup_time = min([p.next_deadline for p in handle.producers] +
+                          [time.time() + interval_sec])
+        if handle.timeout is not None:
+            wakeup_time = min(wakeup_time, start_time + handle.timeout)
+        sleep_recording(handle, wakeup_time)
+
+def stop_recording_writer(handle):
+    if handle.writer_thread is None:
+        return
+    handle.write_queue.put(None)
+    handle.writer_thread.join()
+    handle.writer_thread = None
+
+def save_json_lines(writer, file_path, file_permission):
+    '''
+    Close the JsonLinesWriter and move its file to 'file_path'.  Make an empty
+    file if nothing has written.
+    '''
+    writer.close()
+    if not os.path.isfile(writer.file_path):
+        open(writer.file_path, 'w').close()
+    if writer.file_path != file_path:
+        os.rename(writer.file_path, file_path)
+    os.chmod(file_path, file_permission)
+
+def save_snapshot_records(writer, file_path, file_format, file_permission):
+    '''
+    Close the JsonLinesWriter of snapshot records, and save the records at
+    'file_path' in 'file_format'.
+    '''
+    writer.close()
+    if not os.path.isfile(writer.file_path):
+        return
+    if writer.nr_written == 0:
+        os.remove(writer.file_path)
+        return
+    if file_format == file_type_json_lines:
+        save_json_lines(writer, file_path, file_permission)
+        return
+    if file_format in [file_type_json, file_type_json_compressed]:
+        convert_json_lines_to_json(
+                writer.file_path, file_path,
+                file_format == file_type_json_compressed)
+        os.chmod(file_path, file_permission)
+    else:
+        err = write_damon_records(parse_json_lines_file(writer.file_path),
+                                  file_path, file_format, file_permission)
+        if err is not None:
+            print('saving snapshot records failed (%s).  Those are left at %s'
+                  % (err, writer.file_path))
+            return
+    os.remove(writer.file_path)
 
-def save_recording_outputs(handle, file_path):
+def save_recording_outputs(handle, file_path, kdamonds_kvpairs=None):
     if handle.max_seconds_per_file_exceeded is True:
         dirname = '%s.%s' % (
                 handle.file_path,
                 datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S'))
         os.mkdir(dirname)
-        file_path = os.path.join(dirname, file_path)
+        file_path = os.path.join(dirname, os.path.basename(file_path))
 
+    if kdamonds_kvpairs is None:
+        kdamonds_kvpairs = [k.to_kvpairs() for k in handle.kdamonds]
     kdamonds_file_path = '%s.kdamonds' % file_path
     with open(kdamonds_file_path, 'w') as f:
-        json.dump([k.to_kvpairs() for k in handle.kdamonds], f, indent=4)
+        json.dump(kdamonds_kvpairs, f, indent=4)
     os.chmod(kdamonds_file_path, handle.file_permission)
 
     if handle.damon_tracer_pipe:
@@ -1330,9 +2747,9 @@ def save_recording_outputs(handle, file_path):
                     file_path, handle.file_format, handle.file_permission,
                     handle.monitoring_intervals)
 
-    if handle.snapshot_records:
-        write_damon_records(handle.snapshot_records, file_path,
-                            handle.file_format, handle.file_permission)
+    if handle.snapshot_records is not None:
+        save_snapshot_records(handle.snapshot_records, file_path,
+                              handle.file_format, handle.file_permission)
 
     if handle.perf_profile_pipe is not None:
         try:
@@ -1348,24 +2765,33 @@ def save_recording_outputs(handle, file_path):
                       file_path)
             os.chmod('%s.profile' % file_path, handle.file_permission)
 
-    if handle.mem_footprint_snapshots is not None:
-        save_mem_footprint(
-                handle.mem_footprint_snapshots,
-                '%s.mem_footprint' % file_path, handle.file_permission)
-    if handle.vmas_snapshots is not None:
-        save_proc_vmas(handle.vmas_snapshots, '%s.vmas' % file_path,
-                       handle.file_permission)
-    if handle.proc_stats is not None:
-        save_proc_stats(handle.proc_stats, '%s.proc_stats' % file_path,
-                        handle.file_permission)
+    for writer, suffix in [[handle.mem_footprint_snapshots, 'mem_footprint'],
+                           [handle.vmas_snapshots, 'vmas'],
+                           [handle.proc_stats, 'proc_stats']]:
+        if writer is not None:
+            save_json_lines(writer, '%s.%s' % (file_path, suffix),
+                            handle.file_permission)
 
 def finish_recording(handle):
+    stop_recording_writer(handle)
+    err = stop_snapshot_sessions()
+    if err is not None:
+        print('snapshot sessions stop failed (%s)' % err)
     save_recording_outputs(handle, handle.file_path)
+    if handle.producers is not None:
+        for producer in handle.producers:
+            if producer.nr_dropped > 0:
+                print('some samplings are dropped due to delays (%s)' %
+                      producer.fmt_stat())
+    for sampler in [handle.mem_footprint_sampler, handle.vmas_sampler,
+                    handle.proc_stats_sampler]:
+        if sampler is not None:
+            sampler.close()
 
 # for snapshot
 
 def current_kdamonds_interval_updated():
-    kdamonds = _damon.current_kdamonds()
+    kdamonds = _damon.current_kdamonds(tried_regions_of=[])
     intervals_autotuning = False
     for kd in kdamonds:
         for ctx in kd.contexts:
@@ -1377,7 +2803,15 @@ def current_kdamonds_interval_updated():
     if not intervals_autotuning:
         return kdamonds
     _damon.update_tuned_intervals()
-    return _damon.current_kdamonds()
+    return _damon.current_kdamonds(tried_regions_of=[])
+
+def find_scheme_idx(ctx, scheme_to_find):
+    '''Returns index of the context's scheme that effectively same to
+    'scheme_to_find', or None if no such scheme'''
+    for sidx, scheme in enumerate(ctx.schemes):
+        if scheme.effectively_equal(scheme_to_find, ctx.intervals):
+            return sidx
+    return None
 
 def find_install_scheme(scheme_to_find):
     '''Install given scheme to all contexts if effectively same scheme is not
@@ -1390,16 +2824,12 @@ def find_install_scheme(scheme_to_find):
     kdamonds = current_kdamonds_interval_updated()
     for kidx, kdamond in enumerate(kdamonds):
         for cidx, ctx in enumerate(kdamond.contexts):
-            ctx_has_the_scheme = False
-            for sidx, scheme in enumerate(ctx.schemes):
-                if scheme.effectively_equal(scheme_to_find, ctx.intervals):
-                    if _damo_sysinfo.damon_feature_available(
-                            'sysfs/schemes_apply_interval'):
-                        scheme_to_find.apply_interval_us = ctx.intervals.sample
-                    ctx_has_the_scheme = True
-                    indices.append([kidx, cidx, sidx])
-                    break
-            if ctx_has_the_scheme:
+            sidx = find_scheme_idx(ctx, scheme_to_find)
+            if sidx is not None:
+                if _damo_sysinfo.damon_feature_available(
+                        'sysfs/schemes_apply_interval'):
+                    scheme_to_find.apply_interval_us = ctx.intervals.sample
+                indices.append([kidx, cidx, sidx])
                 continue
 
             if _damo_sysinfo.damon_feature_available(
@@ -1452,26 +2882,62 @@ def tried_regions_to_snapshot(scheme, intervals, merge_regions):
     return DamonSnapshot(snapshot_start_time_ns, snapshot_end_time_ns, regions,
             total_bytes, scheme.stats)
 
+def kdamond_tried_regions_to_records(kdamond_idx, kdamond, idxs,
+                                     merge_regions):
+    records = []
+    if kdamond.state != 'on':
+        return records
+    for ctx_idx, ctx in enumerate(kdamond.contexts):
+        for scheme_idx, scheme in enumerate(ctx.schemes):
+            if not [kdamond_idx, ctx_idx, scheme_idx] in idxs:
+                continue
+
+            snapshot = tried_regions_to_snapshot(scheme, ctx.intervals,
+                    merge_regions)
+
+            records.append(DamonRecord(kdamond_idx, ctx_idx, ctx.intervals,
+                scheme_idx, target_id=None, scheme_filters=scheme.filters))
+            records[-1].snapshots.append(snapshot)
+            break
+    return records
+
 def tried_regions_to_records_of(idxs, merge_regions):
     '''idxs: list of kdamond/context/scheme indices to get records for.  If it
     is None, return records for all schemes'''
     records = []
-    for kdamond_idx, kdamond in enumerate(_damon.current_kdamonds()):
-        if kdamond.state != 'on':
-            continue
-        for ctx_idx, ctx in enumerate(kdamond.contexts):
-            for scheme_idx, scheme in enumerate(ctx.schemes):
-                if not [kdamond_idx, ctx_idx, scheme_idx] in idxs:
-                    continue
+    for kdamond_idx, kdamond in enumerate(
+            _damon.current_kdamonds(tried_regions_of=idxs)):
+        records += kdamond_tried_regions_to_records(
+                kdamond_idx, kdamond, idxs, merge_regions)
+    return records
 
-                snapshot = tried_regions_to_snapshot(scheme, ctx.intervals,
-                        merge_regions)
+def update_get_kdamond_snapshot_records(kdamond_idx, do_update, scheme_idxs,
+                                        merge_regions):
+    '''
+    Update tried regions of the kdamond if 'do_update' is True, and returns
+    records for the kdamond's schemes of 'scheme_idxs' and an error.
+    '''
+    err = None
+    nr_tries = 0
+    while do_update and nr_tries < 5:
+        nr_tries += 1
 
-                records.append(DamonRecord(kdamond_idx, ctx_idx, ctx.intervals,
-                    scheme_idx, target_id=None, scheme_filters=scheme.filters))
-                records[-1].snapshots.append(snapshot)
-                break
-    return records
+        # todo: update schemes stats only if really required
+        err = _damon.update_schemes_stats([kdamond_idx])
+        if err is None:
+            # todo: update tuned intervals only if auto-tuning is ongoing
+            err = _damon.update_tuned_intervals([kdamond_idx])
+        if err is None:
+            err = _damon.update_schemes_tried_regions([kdamond_idx])
+        if err is None:
+            break
+        time.sleep(random.randrange(2**(nr_tries - 1), 2**nr_tries) / 100)
+    if err is not None:
+        return None, 'kdamond %s: %s' % (kdamond_idx, err)
+
+    kdamond = _damon.current_kdamond(kdamond_idx, tried_regions_of=scheme_idxs)
+    return kdamond_tried_regions_to_records(
+            kdamond_idx, kdamond, scheme_idxs, merge_regions), None
 
 def update_get_snapshot_records(kdamond_idxs, scheme_idxs,
         total_sz_only, merge_regions):
@@ -1483,34 +2949,24 @@ def update_get_snapshot_records(kdamond_idxs, scheme_idxs,
             records = tried_regions_to_records_of(scheme_idxs, merge_regions)
             return records, None
 
-    err = 'assumed error'
-    nr_tries = 0
-    while err is not None and nr_tries < 5:
-        nr_tries += 1
-
-        # todo: update schemes stats only if really required
-        err = _damon.update_schemes_stats(kdamond_idxs)
-        if err is not None:
-            time.sleep(random.randrange(
-                2**(nr_tries - 1), 2**nr_tries) / 100)
-            continue
-
-        # todo: update tuned intervals only if auto-tuning is ongoing
-        err = _damon.update_tuned_intervals(kdamond_idxs)
-        if err is not None:
-            time.sleep(random.randrange(
-                2**(nr_tries - 1), 2**nr_tries) / 100)
-            continue
-
-        err = _damon.update_schemes_tried_regions(kdamond_idxs)
-
-        if err is not None:
-            time.sleep(random.randrange(
-                2**(nr_tries - 1), 2**nr_tries) / 100)
-    if err is not None:
-        return None, 'updating schemes tried regions fail: %s' % err
-
-    records = tried_regions_to_records_of(scheme_idxs, merge_regions)
+    # Update and read each kdamond in parallel, so that the latency is
+    # bounded by the slowest kdamond, and failures of a kdamond make only the
+    # kdamond retried.
+    update_idxs = set(int(idx) for idx in kdamond_idxs)
+    idxs = sorted(update_idxs | set(idx[0] for idx in scheme_idxs))
+    # probe the feature before the threads use it
+    _damo_sysinfo.damon_feature_available('sysfs/schemes_tried_regions')
+    with concurrent.futures.ThreadPoolExecutor(
+            max(len(idxs), 1)) as executor:
+        futures = [executor.submit(
+            update_get_kdamond_snapshot_records, idx, idx in update_idxs,
+            scheme_idxs, merge_regions) for idx in idxs]
+        records = []
+        for future in futures:
+            kdamond_records, err = future.result()
+            if err is not None:
+                return None, 'updating schemes tried regions fail: %s' % err
+            records += kdamond_records
     return records, None
 
 def kdamonds_copy_intervals(src_kdamonds, dst_kdamonds):
@@ -1524,13 +2980,150 @@ def kdamonds_copy_intervals(src_kdamonds, dst_kdamonds):
             dst_ctx = dst_kdamond.contexts[cidx]
             dst_ctx.intervals = ctx.intervals
 
+class SnapshotSession:
+    '''
+    A monitoring scheme for snapshots that installed on the first snapshot and
+    reused for following snapshots, until close() is called.
+    '''
+    monitor_scheme = None
+    scheme_idxs = None  # kdamond/context/scheme indices of the scheme
+    installed = None    # whether the scheme is installed by this session
+
+    def __init__(self, monitor_scheme):
+        self.monitor_scheme = monitor_scheme
+        self.installed = False
+
+    def install(self):
+        '''Install the scheme if not installed.  Returns an error'''
+        installed, idxs, kdamonds, err = find_install_scheme(
+                self.monitor_scheme)
+        if err is not None:
+            return err
+        self.scheme_idxs = idxs
+        if installed:
+            self.installed = True
+        return None
+
+    def scheme_idxs_valid(self):
+        '''
+        Returns whether the scheme is still at the installed indices.  Others
+        could update the kdamonds after the installation.
+        '''
+        kdamonds = current_kdamonds_interval_updated()
+        for kidx, cidx, sidx in self.scheme_idxs:
+            if kidx >= len(kdamonds) or cidx >= len(kdamonds[kidx].contexts):
+                return False
+            ctx = kdamonds[kidx].contexts[cidx]
+            if sidx >= len(ctx.schemes) or not \
+                    ctx.schemes[sidx].effectively_equal(
+                            self.monitor_scheme, ctx.intervals):
+                return False
+        return True
+
+    def snapshot_records(self, total_sz_only, merge_regions):
+        '''
+        Return DamonRecord objects each having single DamonSnapshot and an
+        error.  If the scheme is not found at the installed indices, e.g., due
+        to kdamonds update from others, install it again.  If the snapshot
+        fails, install it again and retry once.
+        '''
+        running_kdamond_idxs = _damon.running_kdamond_idxs()
+        if len(running_kdamond_idxs) == 0:
+            return None, 'no kdamond running'
+        for i in range(2):
+            if (self.scheme_idxs is None or i > 0 or
+                    not self.scheme_idxs_valid()):
+                err = self.install()
+                if err:
+                    return None, 'monitoring scheme install failed: %s' % err
+            records, err = update_get_snapshot_records(
+                    running_kdamond_idxs, self.scheme_idxs, total_sz_only,
+                    merge_regions)
+            if err is None and len(records) > 0:
+                break
+        return records, err
+
+    def hide_scheme(self, kdamonds):
+        '''
+        Remove the scheme from the contexts that the scheme was installed to,
+        if it is still there.  Others could update the kdamonds after the
+        installation, so find the scheme again rather than trusting the
+        installed indices.
+        '''
+        if self.scheme_idxs is None:
+            return
+        for kidx, cidx, sidx in self.scheme_idxs:
+            if kidx >= len(kdamonds) or cidx >= len(kdamonds[kidx].contexts):
+                continue
+            ctx = kdamonds[kidx].contexts[cidx]
+            if sidx >= len(ctx.schemes) or not \
+                    ctx.schemes[sidx].effectively_equal(
+                            self.monitor_scheme, ctx.intervals):
+                sidx = find_scheme_idx(ctx, self.monitor_scheme)
+                if sidx is None:
+                    continue
+            del ctx.schemes[sidx]
+
+    def close(self):
+        '''Uninstall the scheme if this session installed it.  Returns an
+        error'''
+        if not self.installed:
+            return None
+        self.installed = False
+        if not _damon.any_kdamond_running():
+            return None
+        kdamonds = current_kdamonds_interval_updated()
+        self.hide_scheme(kdamonds)
+        self.scheme_idxs = None
+        err = _damon.commit(kdamonds)
+        if err is not None:
+            return 'monitoring scheme uninstall failed: %s' % err
+        return None
+
+# SnapshotSession objects for each monitoring scheme, if sticky snapshot
+# sessions are started by start_snapshot_sessions()
+snapshot_sessions = None
+
+def start_snapshot_sessions():
+    '''
+    Make following snapshots keep their monitoring schemes installed until
+    stop_snapshot_sessions() is called, to avoid installing and uninstalling
+    the scheme for each of repeated snapshots.
+    '''
+    global snapshot_sessions
+    if snapshot_sessions is None:
+        snapshot_sessions = {}
+
+def stop_snapshot_sessions():
+    '''Uninstall the monitoring schemes of the sessions.  Returns an
+    error'''
+    global snapshot_sessions
+    if snapshot_sessions is None:
+        return None
+    errs = []
+    for session in snapshot_sessions.values():
+        err = session.close()
+        if err is not None:
+            errs.append(err)
+    snapshot_sessions = None
+    if len(errs) > 0:
+        return ', '.join(errs)
+    return None
+
 def get_snapshot_records(monitor_scheme, total_sz_only, merge_regions):
     'return DamonRecord objects each having single DamonSnapshot and an error'
+    if snapshot_sessions is not None:
+        key = json.dumps(monitor_scheme.to_kvpairs(raw=True), sort_keys=True)
+        if not key in snapshot_sessions:
+            snapshot_sessions[key] = SnapshotSession(monitor_scheme)
+        return snapshot_sessions[key].snapshot_records(
+                total_sz_only, merge_regions)
+
     running_kdamond_idxs = _damon.running_kdamond_idxs()
     if len(running_kdamond_idxs) == 0:
         return None, 'no kdamond running'
 
-    orig_kdamonds = _damon.current_kdamonds()
+    orig_kdamonds = _damon.current_kdamonds(tried_regions_of=[])
 
     installed, idxs, updated_kdamonds, err = find_install_scheme(
             monitor_scheme)
@@ -1617,43 +3210,42 @@ def filter_records_by_addr(records, addr_ranges):
             snapshot.regions = filtered_regions
             snapshot.update_total_bytes()
 
+def snapshot_in_sz_ranges(snapshot, sz_ranges):
+    for min_, max_ in sz_ranges:
+        if min_ <= snapshot.total_bytes and snapshot.total_bytes <= max_:
+            return True
+    return False
+
 def filter_records_by_snapshot_sz(records, sz_ranges):
     for record in records:
-        filtered_snapshots = []
-        for snapshot in record.snapshots:
-            for min_, max_ in sz_ranges:
-                if (min_ <= snapshot.total_bytes and
-                        snapshot.total_bytes <= max_):
-                    filtered_snapshots.append(snapshot)
-                    break
-        record.snapshots = filtered_snapshots
+        record.snapshots = [s for s in record.snapshots
+                            if snapshot_in_sz_ranges(s, sz_ranges)]
+
+def snapshot_in_time_ranges(snapshot, time_ranges):
+    for start_sec, end_sec in time_ranges:
+        if (snapshot.start_time >= start_sec and
+            snapshot.end_time <= end_sec):
+            return True
+    return False
 
 def filter_records_by_snapshot_time(records, time_ranges):
     for record in records:
-        filtered_snapshots = []
-        for snapshot in record.snapshots:
-            filter_out = True
-            for start_sec, end_sec in time_ranges:
-                if (snapshot.start_time >= start_sec and
-                    snapshot.end_time <= end_sec):
-                    filter_out = False
-                    break
-            if filter_out is False:
+        record.snapshots = [s for s in record.snapshots
+                            if snapshot_in_time_ranges(s, time_ranges)]
+
+def snapshots_in_index_ranges(snapshots, index_ranges):
+    filtered_snapshots = []
+    for idx, snapshot in enumerate(snapshots):
+        for start_idx, end_idx in index_ranges:
+            if start_idx <= idx and idx <= end_idx:
                 filtered_snapshots.append(snapshot)
-        record.snapshots = filtered_snapshots
+                break
+    return filtered_snapshots
 
 def filter_records_by_snapshot_indices(records, index_ranges):
     for record in records:
-        filtered_snapshots = []
-        for idx, snapshot in enumerate(record.snapshots):
-            filter_out = True
-            for start_idx, end_idx in index_ranges:
-                if start_idx <= idx and idx <= end_idx:
-                    filter_out = False
-                    break
-            if filter_out is False:
-                filtered_snapshots.append(snapshot)
-        record.snapshots = filtered_snapshots
+        record.snapshots = snapshots_in_index_ranges(record.snapshots,
+                                                     index_ranges)
 
 def filter_records_by_temperature(records, temperature_ranges,
                                   temperature_weights):
@@ -1672,6 +3264,129 @@ def filter_records_by_temperature(records, temperature_ranges,
             snapshot.regions = filtered_regions
             snapshot.update_total_bytes()
 
+def columns_min_max(values, fallbacks, fallback_to_value):
+    '''
+    Returns min/max of the region column 'values', using 'fallbacks' column
+    values that converted by monotonic increasing 'fallback_to_value()' for
+    unset values, like add_unset_unit() does.  'values' can be None if the
+    column is not available.
+    '''
+    if values is not None and min(values) != columnar_none:
+        return [min(values), max(values)]
+    if ((values is None or max(values) == columnar_none) and
+            min(fallbacks) != columnar_none):
+        return [fallback_to_value(min(fallbacks)),
+                fallback_to_value(max(fallbacks))]
+    if values is None:
+        values = [columnar_none] * len(fallbacks)
+    converted = [v if v != columnar_none else
+                 fallback_to_value(columnar_none_or(f))
+                 for v, f in zip(values, fallbacks)]
+    return [min(converted), max(converted)]
+
+class SnapshotRegionsIndex:
+    '''
+    Summary of regions of a snapshot, for filtering the regions without
+    looking into each of those when possible.  Made from the region columns if
+    the snapshot is a ColumnarSnapshot that not yet constructed the regions.
+    '''
+    starts = None
+    ends = None
+    addr_sorted = None  # sorted by address, and not overlapping each other
+    sz_min_max = None
+    nr_accesses_percent_min_max = None
+    age_usec_min_max = None
+    total_bytes = None
+
+    def __init__(self, snapshot, intervals):
+        '''
+        Index regions of the snapshot.  Min/max access rate and age are
+        indexed only if 'intervals' is not None.  In the case, unset units of
+        constructed regions are set.
+        '''
+        from_columns = (isinstance(snapshot, ColumnarSnapshot) and
+                        not snapshot.regions_constructed())
+        if from_columns:
+            self.starts = snapshot.region_column('start')
+            self.ends = snapshot.region_column('end')
+        else:
+            self.starts = [r.start for r in snapshot.regions]
+            self.ends = [r.end for r in snapshot.regions]
+        self.addr_sorted = all(
+                map(operator.le, self.ends[:-1], self.starts[1:]))
+        if len(self.starts) == 0:
+            self.total_bytes = 0
+            return
+        sizes = list(map(operator.sub, self.ends, self.starts))
+        self.sz_min_max = [min(sizes), max(sizes)]
+        self.total_bytes = sum(sizes)
+
+        if intervals is None:
+            return
+        max_samples = intervals.aggr / intervals.sample
+        if from_columns:
+            columns = snapshot.record_file.columns
+            percents = None
+            if 'nr_accesses_percent' in columns:
+                percents = snapshot.region_column('nr_accesses_percent')
+            self.nr_accesses_percent_min_max = columns_min_max(
+                    percents, snapshot.region_column('nr_accesses'),
+                    lambda samples: int(samples * 100.0 / max_samples))
+            self.age_usec_min_max = columns_min_max(
+                    snapshot.region_column('age_usec'),
+                    snapshot.region_column('age_aggr_intervals'),
+                    lambda aggr_intervals: aggr_intervals * intervals.aggr)
+            return
+        for region in snapshot.regions:
+            region.nr_accesses.add_unset_unit(intervals)
+            region.age.add_unset_unit(intervals)
+        percents = [r.nr_accesses.percent for r in snapshot.regions]
+        self.nr_accesses_percent_min_max = [min(percents), max(percents)]
+        ages = [r.age.usec for r in snapshot.regions]
+        self.age_usec_min_max = [min(ages), max(ages)]
+
+    def pattern_match(self, pattern):
+        '''
+        Returns 'all' if all regions fit in the access pattern, 'none' if no
+        region fits in, or 'some' otherwise.
+        '''
+        if len(self.starts) == 0:
+            return 'all'
+        bounds = [[self.sz_min_max, pattern.sz_bytes]]
+        if self.nr_accesses_percent_min_max is not None:
+            nr_acc = pattern.nr_acc_min_max
+            age = pattern.age_min_max
+            bounds += [
+                    [self.nr_accesses_percent_min_max,
+                     [nr_acc[0].percent, nr_acc[1].percent]],
+                    [self.age_usec_min_max, [age[0].usec, age[1].usec]]]
+        match = 'all'
+        for [min_, max_], [min_allowed, max_allowed] in bounds:
+            if max_ < min_allowed or max_allowed < min_:
+                return 'none'
+            if min_ < min_allowed or max_allowed < max_:
+                match = 'some'
+        return match
+
+    def addr_ranges_spans(self, addr_ranges):
+        '''
+        Returns sorted and non-overlapping [start, end) index ranges of regions
+        that could overlap with the address ranges.
+        '''
+        if not self.addr_sorted:
+            return [[0, len(self.starts)]]
+        spans = []
+        for start, end in sorted(addr_ranges):
+            start_idx = bisect.bisect_right(self.ends, start)
+            end_idx = bisect.bisect_left(self.starts, end)
+            if start_idx >= end_idx:
+                continue
+            if len(spans) > 0 and start_idx <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], end_idx)
+            else:
+                spans.append([start_idx, end_idx])
+        return spans
+
 class SnapshotRequest:
     '''
     Request for getting single snapshot records from running kdamonds.
@@ -1845,23 +3560,101 @@ class RecordFilter:
         kvpairs['temperature_weights'] = self.temperature_weights
         return kvpairs
 
-    def filter_records(self, records):
-        if self.access_pattern is not None:
-            for record in records:
-                filter_by_pattern(record, self.access_pattern)
-        if self.address_ranges is not None:
-            filter_records_by_addr(records, self.address_ranges)
-        if self.snapshot_sz_ranges is not None:
-            filter_records_by_snapshot_sz(records, self.snapshot_sz_ranges)
-        if self.snapshot_time_ranges is not None:
-            filter_records_by_snapshot_time(records, self.snapshot_time_ranges)
-        if self.snapshot_index_ranges is not None:
-            filter_records_by_snapshot_indices(records,
-                                               self.snapshot_index_ranges)
+    def filter_snapshot_regions(self, snapshot, intervals):
+        '''
+        Apply the access pattern and the address ranges filters to regions of
+        the snapshot, using SnapshotRegionsIndex of the snapshot.
+        '''
+        pattern = self.access_pattern
+        addr_ranges = self.address_ranges
+        if pattern is None and addr_ranges is None:
+            return
+        if pattern is None:
+            index = SnapshotRegionsIndex(snapshot, None)
+            match = 'all'
+        else:
+            index = SnapshotRegionsIndex(snapshot, intervals)
+            match = index.pattern_match(pattern)
+        if match == 'none':
+            snapshot.regions = []
+            if addr_ranges is not None:
+                snapshot.total_bytes = 0
+            return
+        is_columnar = isinstance(snapshot, ColumnarSnapshot)
+        if (match == 'all' and pattern is not None and
+                intervals is not None and is_columnar):
+            # regions that will be constructed should have the units set, as
+            # same to those that checked by region_of_pattern().
+            snapshot.unset_units_intervals = intervals
+        if addr_ranges is None:
+            if match == 'all':
+                return
+            spans = [[0, len(index.starts)]]
+        else:
+            spans = index.addr_ranges_spans(addr_ranges)
+
+        regions = []
+        for start_idx, end_idx in spans:
+            if is_columnar:
+                candidates = snapshot.regions_slice(start_idx, end_idx)
+            else:
+                candidates = snapshot.regions[start_idx:end_idx]
+            for region in candidates:
+                if match == 'some' and not region_of_pattern(
+                        region, pattern, intervals):
+                    continue
+                if addr_ranges is None:
+                    regions.append(region)
+                else:
+                    regions += filter_by_addr(region, addr_ranges)
+        snapshot.regions = regions
+        if addr_ranges is not None:
+            snapshot.update_total_bytes()
+
+    def filter_record(self, record):
+        '''
+        Apply the filters to the record in one pass.  Snapshot level filters
+        are applied first if possible, so that regions of filtered out
+        snapshots are not looked into.
+        '''
+        # address ranges filter changes total size of snapshots.
+        sz_filter_first = (self.address_ranges is None or
+                           self.snapshot_sz_ranges is None)
+        snapshots = []
+        for snapshot in record.snapshots:
+            if (self.snapshot_time_ranges is not None and
+                    not snapshot_in_time_ranges(
+                        snapshot, self.snapshot_time_ranges)):
+                continue
+            if (sz_filter_first and self.snapshot_sz_ranges is not None and
+                    not snapshot_in_sz_ranges(
+                        snapshot, self.snapshot_sz_ranges)):
+                continue
+            snapshots.append(snapshot)
+        # snapshot indices are counted after the time and size filters.
+        if sz_filter_first and self.snapshot_index_ranges is not None:
+            snapshots = snapshots_in_index_ranges(
+                    snapshots, self.snapshot_index_ranges)
+
+        for snapshot in snapshots:
+            self.filter_snapshot_regions(snapshot, record.intervals)
+
+        if not sz_filter_first:
+            snapshots = [s for s in snapshots
+                         if snapshot_in_sz_ranges(s, self.snapshot_sz_ranges)]
+            if self.snapshot_index_ranges is not None:
+                snapshots = snapshots_in_index_ranges(
+                        snapshots, self.snapshot_index_ranges)
+        record.snapshots = snapshots
+
         if self.temperature_ranges is not None:
-            filter_records_by_temperature(records, self.temperature_ranges,
+            filter_records_by_temperature([record], self.temperature_ranges,
                                           self.temperature_weights)
 
+    def filter_records(self, records):
+        for record in records:
+            self.filter_record(record)
+
 def set_snapshot_damos_filters_option(parser):
     parser.add_argument(
             '--snapshot_damos_filter', nargs='+', action='append', default=[],
@@ -1871,6 +3664,39 @@ def set_snapshot_damos_filters_option(parser):
                 'Format is same to --damos_filter.'
                 ]))
 
+def parse_records_files(record_files):
+    '''
+    Parse multiple record files in parallel, using a process pool.  Returns a
+    list of parse_records_file() return values for each of the files.
+    '''
+    results = [None] * len(record_files)
+    # columnar files are memory-mapped, so cannot be sent from other
+    # processes.  Those are cheap to parse, anyway.
+    idxs_to_parallelize = []
+    for idx, record_file in enumerate(record_files):
+        try:
+            if records_file_type(record_file) != file_type_columnar:
+                idxs_to_parallelize.append(idx)
+        except Exception:
+            # let parse_records_file() returns the error
+            pass
+    nr_workers = min(len(idxs_to_parallelize), os.cpu_count() or 1)
+    if nr_workers > 1:
+        try:
+            with concurrent.futures.ProcessPoolExecutor(nr_workers) as executor:
+                futures = [[idx, executor.submit(
+                    parse_records_file, record_files[idx])]
+                           for idx in idxs_to_parallelize]
+                for idx, future in futures:
+                    results[idx] = future.result()
+        except (OSError, concurrent.futures.BrokenExecutor):
+            # process pool unavailable.  Fallback to sequential parsing.
+            results = [None] * len(record_files)
+    for idx, record_file in enumerate(record_files):
+        if results[idx] is None:
+            results[idx] = parse_records_file(record_file)
+    return results
+
 def get_records(tried_regions_of=None, record_file=None,
                 snapshot_damos_filters=None, record_filter=None,
                 total_sz_only=False, dont_merge_regions=True):
@@ -1900,14 +3726,14 @@ def get_records(tried_regions_of=None, record_file=None,
     else:
         if type(record_file) is not list:
             record_file = [record_file]
+        for record_file_ in record_file:
+            if not os.path.isfile(record_file_):
+                return None, '%s not found' % record_file_
         records = []
-        for record_file in record_file:
-            if not os.path.isfile(record_file):
-                return None, '%s not found' % record_file
-
-            records_, err = parse_records_file(record_file)
+        for record_file_, [records_, err] in zip(
+                record_file, parse_records_files(record_file)):
             if err:
-                return None, ('parsing %s failed (%s)' % (record_file, err))
+                return None, ('parsing %s failed (%s)' % (record_file_, err))
             records += records_
 
     filter_copy.filter_records(records)
@@ -1,19 +1,64 @@
 # SPDX-License-Identifier: GPL-2.0
 
+import importlib
+
 class DamoSubCmd:
     name = None
     msg = None
-    module = None
+    module_name = None
+    _module = None
 
     def __init__(self, name, module, msg):
+        '''
+        'module' can be the name of the module, to import it only when the
+        subcommand is really used.
+        '''
         self.name = name
-        self.module = module
+        if type(module) is str:
+            self.module_name = module
+        else:
+            self.module_name = module.__name__
+            self._module = module
         self.msg = msg
 
-    def add_parser(self, subparsers):
+    @property
+    def module(self):
+        if self._module is None:
+            self._module = importlib.import_module(self.module_name)
+        return self._module
+
+    def add_parser(self, subparsers, set_arguments=True):
         subparser = subparsers.add_parser(self.name, help=self.msg)
         subparser.description = self.msg
-        self.module.set_argparser(subparser)
+        if set_arguments:
+            self.module.set_argparser(subparser)
 
     def execute(self, args):
         self.module.main(args)
+
+# command line arguments that following the subcommand that selected by the
+# last add_parsers() call.  None if no subcommand was selected.
+remaining_cmdline_args = None
+
+def add_parsers(subcmds, subparsers, cmdline_args=None):
+    '''
+    Add parsers for the subcommands.  If the command line arguments that
+    following the parent command are given, set arguments of only the
+    subcommand that selected by those, since others will not be parsed.
+    Nested subcommands can pass 'remaining_cmdline_args' for the same.
+    '''
+    global remaining_cmdline_args
+    selected = None
+    remaining_cmdline_args = None
+    if cmdline_args is not None:
+        for idx, arg in enumerate(cmdline_args):
+            if arg.startswith('-'):
+                continue
+            if arg in [s.name for s in subcmds]:
+                selected = arg
+                remaining_cmdline_args = cmdline_args[idx + 1:]
+            break
+    for subcmd in subcmds:
+        subcmd.add_parser(
+                subparsers, set_arguments=cmdline_args is None or
+                subcmd.name == selected)
@@ -1,10 +1,6 @@
 # SPDX-License-Identifier: GPL-2.0
 
-import subprocess
+import shutil
 
 def avail_cmd(cmd):
-    try:
-        subprocess.check_output(['which', cmd], stderr=subprocess.DEVNULL)
-        return True
-    except:
-        return False
+    return shutil.which(cmd) is not None
@@ -33,10 +33,13 @@ class SystemInfo:
     # DAMON features that available on current kernel.
     avail_damon_features = None
 
+    # areas of the information that probed.  Read sysinfo_areas.
+    probed_areas = None
+
     def __init__(self, damo_version, kernel_version,
                  perf_path=None, perf_version=None, trace_cmd_version=None,
                  sysfs_path=None, tracefs_path=None, debugfs_path=None,
-                 avail_damon_features=None):
+                 avail_damon_features=None, probed_areas=None):
         self.damo_version = damo_version
         self.kernel_version = kernel_version
 
@@ -49,6 +52,9 @@ class SystemInfo:
         self.perf_version = perf_version
 
         self.avail_damon_features = avail_damon_features
+        if probed_areas is None:
+            probed_areas = list(sysinfo_areas)
+        self.probed_areas = probed_areas
 
     def to_kvpairs(self, raw=False):
         return collections.OrderedDict([
@@ -62,6 +68,7 @@ class SystemInfo:
             ('perf_version', self.perf_version),
             ('avail_damon_features',
              [f.to_kvpairs(raw) for f in self.avail_damon_features]),
+            ('probed_areas', self.probed_areas),
             ])
 
     @classmethod
@@ -87,6 +94,10 @@ class SystemInfo:
         debugfs_path = None
         if 'debugfs_path' in kvpairs:
             debugfs_path = kvpairs['debugfs_path']
+        # old cache files have the information of all areas
+        probed_areas = None
+        if 'probed_areas' in kvpairs:
+            probed_areas = kvpairs['probed_areas']
         return cls(
                 damo_version=kvpairs['damo_version'],
                 kernel_version=kvpairs['kernel_version'],
@@ -98,6 +109,7 @@ class SystemInfo:
                 avail_damon_features=[
                     _damon_features.DamonFeature.from_kvpairs(kvp) for kvp in
                     avail_damon_features],
+                probed_areas=probed_areas,
                 )
 
     def __eq__(self, other):
@@ -131,6 +143,17 @@ class SystemInfo:
                     return version, None
         return None, 'only non-upstreamed features'
 
+# Areas of the system information that probed on their first use, since
+# probing those takes time.  Features of each area are listed in
+# SystemInfo.avail_damon_features in this order.
+sysinfo_areas = ['sysfs', 'debugfs', 'trace', 'interface', 'modules', 'tools']
+
+def feature_area(feature_name):
+    area = feature_name.split('/')[0]
+    if area in ['reclaim', 'lru_sort', 'stat']:
+        return 'modules'
+    return area
+
 system_info = None
 sysinfo_file_path = os.path.join(os.environ['HOME'], '.damo.sysinfo')
 
@@ -249,51 +272,66 @@ def get_perf_path_version():
         perf_version = None
     return perf_path, perf_version
 
-def get_sysinfo_from_scratch():
-    damo_version_ = damo_version.get_real_version()
-    kernel_version = subprocess.check_output(['uname', '-r']).decode().strip()
-    sysfs_path = _damo_fs.dev_mount_point('sysfs')
-    tracefs_path = _damo_fs.dev_mount_point('tracefs')
-    debugfs_path = _damo_fs.dev_mount_point('debugfs')
-
-    trace_cmd_version = get_trace_cmd_version()
-    perf_path, perf_version = get_perf_path_version()
+def get_kernel_version():
+    return os.uname().release
 
-    avail_damon_features = []
-    avail_damon_sysfs_features, err = avail_features_on(_damon_sysfs)
-    if err is not None:
-        return None, 'sysfs feature check fail (%s)' % err
-    avail_damon_features += avail_damon_sysfs_features
+def get_sysinfo_from_scratch():
+    '''
+    Returns SystemInfo object having no probed area, and an error.
+    '''
+    sysinfo = SystemInfo(
+            damo_version=damo_version.get_real_version(),
+            kernel_version=get_kernel_version(),
+            sysfs_path=_damo_fs.dev_mount_point('sysfs'),
+            tracefs_path=_damo_fs.dev_mount_point('tracefs'),
+            debugfs_path=_damo_fs.dev_mount_point('debugfs'),
+            avail_damon_features=[], probed_areas=[])
+    return sysinfo, None
 
-    avail_damon_debugfs_features, err = avail_features_on(_damon_dbgfs)
-    if err is not None:
-        return None, 'debugfs feature check fail (%s)' % err
-    avail_damon_features += avail_damon_debugfs_features
+def probe_area(sysinfo, area):
+    '''
+    Probe the given area of the system information and update sysinfo.
+    Returns an error if failed.
+    '''
+    if area == 'tools':
+        sysinfo.trace_cmd_version = get_trace_cmd_version()
+        sysinfo.perf_path, sysinfo.perf_version = get_perf_path_version()
+        sysinfo.probed_areas.append(area)
+        return None
 
-    avail_damon_trace_features, err = get_avail_damon_trace_features()
+    err = None
+    if area == 'sysfs':
+        features, err = avail_features_on(_damon_sysfs)
+    elif area == 'debugfs':
+        features, err = avail_features_on(_damon_dbgfs)
+    elif area == 'trace':
+        features, err = get_avail_damon_trace_features()
+    elif area == 'interface':
+        features = get_avail_damon_interface_features()
+    elif area == 'modules':
+        features = _damon_modules.get_avail_features()
+    else:
+        return 'unknown sysinfo area (%s)' % area
     if err is not None:
-        return None, 'trace feature check fail (%s)' % err
-    avail_damon_features += avail_damon_trace_features
+        return '%s feature check fail (%s)' % (area, err)
+    sysinfo.avail_damon_features += features
+    sysinfo.avail_damon_features.sort(
+            key=lambda f: sysinfo_areas.index(feature_area(f.name)))
+    sysinfo.probed_areas.append(area)
+    return None
 
-    avail_damon_features += get_avail_damon_interface_features()
-    avail_damon_features += _damon_modules.get_avail_features()
-
-    sysinfo = SystemInfo(
-            damo_version=damo_version_,
-            kernel_version=kernel_version,
-            sysfs_path=sysfs_path,
-            tracefs_path=tracefs_path,
-            debugfs_path=debugfs_path,
-            trace_cmd_version=trace_cmd_version,
-            perf_path=perf_path, perf_version=perf_version,
-            avail_damon_features=avail_damon_features)
-    return sysinfo, None
+def invalidate_areas(sysinfo, areas):
+    '''Make the given areas of sysinfo be probed again on next use'''
+    sysinfo.avail_damon_features = [
+            f for f in sysinfo.avail_damon_features
+            if not feature_area(f.name) in areas]
+    sysinfo.probed_areas = [a for a in sysinfo.probed_areas
+                            if not a in areas]
 
 def version_mismatch(sysinfo):
     if sysinfo.damo_version != damo_version.get_real_version():
         return True
-    kernel_version = subprocess.check_output(['uname', '-r']).decode().strip()
-    if sysinfo.kernel_version != kernel_version:
+    if sysinfo.kernel_version != get_kernel_version():
         return True
     return False
 
@@ -303,61 +341,20 @@ def update_cached_info(cached_info):
     if version_mismatch(cached_info):
         return get_sysinfo_from_scratch()
 
-    perf_path, perf_version = get_perf_path_version()
-
     sysfs_path = _damo_fs.dev_mount_point('sysfs')
     if cached_info.sysfs_path != sysfs_path:
         cached_info.sysfs_path = sysfs_path
-        avail_damon_sysfs_features, err = avail_features_on(_damon_sysfs)
-        if err is not None:
-            return None, 'damon sysfs features update fail (%s)' % err
-
-        avail_damon_features = []
-        for f in cached_info.avail_damon_features:
-            interfaces_to_recheck = ['sysfs', 'interface', 'reclaim',
-                                     'lru_sort', 'stat']
-            skip = False
-            for interface in interfaces_to_recheck:
-                if f.name.startswith('%s/' % interface):
-                    skip = True
-                    break
-            if skip:
-                continue
-            avail_damon_features.append(f)
-        avail_damon_features += avail_damon_sysfs_features
-        avail_damon_features += get_avail_damon_interface_features()
-        avail_damon_features += _damon_modules.get_avail_features()
-        cached_info.avail_damon_features = avail_damon_features
+        invalidate_areas(cached_info, ['sysfs', 'interface', 'modules'])
 
     tracefs_path = _damo_fs.dev_mount_point('tracefs')
     if cached_info.tracefs_path != tracefs_path:
         cached_info.tracefs_path = tracefs_path
-        avail_damon_trace_features, err = get_avail_damon_trace_features()
-        if err is not None:
-            return None, 'damon trace features update fail (%s)' % err
-
-        avail_damon_features = []
-        for f in cached_info.avail_damon_features:
-            if f.name.startswith('trace/'):
-                continue
-            avail_damon_features.append(f)
-        avail_damon_features += avail_damon_trace_features
-        cached_info.avail_damon_features = avail_damon_features
+        invalidate_areas(cached_info, ['trace'])
 
     debugfs_path = _damo_fs.dev_mount_point('debugfs')
     if cached_info.debugfs_path != debugfs_path:
         cached_info.debugfs_path = debugfs_path
-        avail_damon_debugfs_features, err = avail_features_on(_damon_dbgfs)
-        if err is not None:
-            return None, 'damon debugfs features update fail (%s)' % err
-
-        avail_damon_features = []
-        for f in cached_info.avail_damon_features:
-            if f.name.startswith('debugfs/'):
-                continue
-            avail_damon_features.append(f)
-        avail_damon_features += avail_damon_debugfs_features
-        cached_info.avail_damon_features = avail_damon_features
+        invalidate_areas(cached_info, ['debugfs'])
 
     return cached_info, None
 
@@ -368,6 +365,8 @@ def load_sysinfo():
     Returns an error if failed.
     '''
     cached_info, cache_read_err = read_sysinfo_file()
+    if cached_info is not None:
+        cached_kvpairs = cached_info.to_kvpairs()
     info, err = update_cached_info(cached_info)
     if err is not None:
         errs = []
@@ -378,7 +377,8 @@ def load_sysinfo():
 
     global system_info
     system_info = info
-    save_sysinfo_file()
+    if cached_info is None or cached_info.to_kvpairs() != cached_kvpairs:
+        save_sysinfo_file()
     return None
 
 def save_sysinfo_file():
@@ -403,29 +403,42 @@ def rm_sysinfo_file():
         return '%s' % e
     return None
 
-def get_sysinfo():
+def get_sysinfo(areas=None):
+    '''
+    Returns SystemInfo object having the given areas of the information
+    probed, and an error.  All areas are probed if 'areas' is None.
+    '''
     if system_info is None:
         err = load_sysinfo()
         if err is not None:
             return None, err
+    if areas is None:
+        areas = sysinfo_areas
+    areas_to_probe = [a for a in areas if not a in system_info.probed_areas]
+    for area in areas_to_probe:
+        err = probe_area(system_info, area)
+        if err is not None:
+            return None, 'sysinfo %s probing fail (%s)' % (area, err)
+    if len(areas_to_probe) > 0:
+        save_sysinfo_file()
     return system_info, None
 
-def get_sysinfo_or_panic():
-    sysinfo, err = get_sysinfo()
+def get_sysinfo_or_panic(areas=None):
+    sysinfo, err = get_sysinfo(areas)
     if err is not None:
         raise Exception('[PANIC] get_sysinfo() fail (%s)' % err)
         exit(1)
     return sysinfo
 
 def damon_tracepoint_available(tracepoint):
-    sysinfo, err = get_sysinfo()
+    sysinfo, err = get_sysinfo(['trace'])
     if err is not None:
         return False
     feature_name = tracepoint_to_feature_name_map[tracepoint]
     return feature_name in [f.name for f in sysinfo.avail_damon_features]
 
 def damon_feature_available(feature_name):
-    sysinfo, err = get_sysinfo()
+    sysinfo, err = get_sysinfo([feature_area(feature_name)])
     if err is not None:
         return False
     for f in sysinfo.avail_damon_features:
@@ -434,7 +447,7 @@ def damon_feature_available(feature_name):
     return False
 
 def available_damon_tracepoints():
-    sysinfo, err = get_sysinfo()
+    sysinfo, err = get_sysinfo(['trace'])
     if err is not None:
         return []
     tracepoints = []
@@ -406,11 +406,12 @@ unit_usec = 'usec'
 unit_aggr_intervals = 'aggr_intervals'
 
 class DamonNrAccesses:
-    samples = None
-    percent = None
-    hz = None
+    # There could be many regions.  Save memory.
+    __slots__ = ['samples', 'percent']
 
     def __init__(self, val, unit):
+        self.samples = None
+        self.percent = None
         if val == None or unit == None:
             return
         if unit == unit_samples:
@@ -465,12 +466,13 @@ class DamonNrAccesses:
                  ])
 
 class DamonAge:
-    usec = None
-    aggr_intervals = None
+    # There could be many regions.  Save memory.
+    __slots__ = ['usec', 'aggr_intervals']
 
     def __init__(self, val, unit):
+        self.usec = None
+        self.aggr_intervals = None
         if val == None and unit != None:
-            self.unit = unit
             return
         if val == None and unit == None:
             return
@@ -521,20 +523,26 @@ class DamonAge:
                         if self.aggr_intervals != None else None)])
 
 class DamonRegion:
-    # [start, end)
-    start = None
-    end = None
-    # nr_accesses and age could be None
-    nr_accesses = None
-    probe_hits = None   # list of integers
-    age = None
-    sz_filter_passed = None
-    scheme = None # non-None if tried region
+    # There could be millions of regions.  Save memory.
+    __slots__ = [
+            # [start, end)
+            'start', 'end',
+            # nr_accesses and age could be None
+            'nr_accesses', 'age',
+            'probe_hits',   # list of integers
+            'sz_filter_passed',
+            'scheme',   # non-None if tried region
+            ]
 
     def __init__(self, start, end, nr_accesses=None, nr_accesses_unit=None,
             age=None, age_unit=None, sz_filter_passed=0, probe_hits=None):
         self.start = _damo_fmt_str.text_to_bytes(start)
         self.end = _damo_fmt_str.text_to_bytes(end)
+        self.nr_accesses = None
+        self.age = None
+        self.probe_hits = None
+        self.sz_filter_passed = None
+        self.scheme = None
 
         if nr_accesses == None:
             return
@@ -575,12 +583,20 @@ class DamonRegion:
         return self.to_str(False)
 
     def __eq__(self, other):
-        return type(self) == type(other) and '%s' % self == '%s' % other
+        if type(self) != type(other):
+            return False
+        if self.start != other.start or self.end != other.end:
+            return False
+        if self.nr_accesses is None or other.nr_accesses is None:
+            return self.nr_accesses is other.nr_accesses
+        return (self.nr_accesses.samples == other.nr_accesses.samples and
+                self.age.aggr_intervals == other.age.aggr_intervals and
+                (self.probe_hits or []) == (other.probe_hits or []) and
+                self.sz_filter_passed == other.sz_filter_passed)
 
     # For aggregate_snapshots() support
     def __hash__(self):
-        identification = '%s-%s' % (self.start, self.end)
-        return hash(identification)
+        return hash((self.start, self.end))
 
     @classmethod
     def from_kvpairs(cls, kvpairs):
@@ -1746,7 +1762,8 @@ def initialize(damon_interface, debug_damon, load_sysinfo):
     if err is not None:
         return err
     if load_sysinfo:
-        sysinfo, err = _damo_sysinfo.get_sysinfo()
+        # DAMON interface features are enough to know if DAMON is available
+        sysinfo, err = _damo_sysinfo.get_sysinfo(['interface'])
         if err is not None:
             return err
         version, err = sysinfo.infer_damon_version()
@@ -1877,7 +1894,7 @@ def update_schemes_status(stats=True, tried_regions=True,
                           quota_effective_bytes=False):
     '''Returns error string or None'''
     schemes_exist = False
-    for kdamond in current_kdamonds():
+    for kdamond in current_kdamonds(tried_regions_of=[]):
         for ctx in kdamond.contexts:
             if len(ctx.schemes) > 0:
                 schemes_exist = True
@@ -1906,27 +1923,53 @@ def update_schemes_status(stats=True, tried_regions=True,
 
     return None
 
-def get_childs_pids(pid):
-    try:
-        childs_pids = subprocess.check_output(
-                ['ps', '--ppid', pid, '-o', 'pid=']
-                ).decode().split()
-    except:
-        childs_pids = []
+def childs_pids_index():
+    '''
+    Scan /proc and returns a dict mapping pids to the sorted list of the pids
+    of their child processes.  All pids are in strings.
+    '''
+    index = {}
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open('/proc/%s/stat' % pid, 'r') as f:
+                stat = f.read()
+        except:
+            # the process has terminated in the middle
+            continue
+        # comm field can have spaces and parentheses
+        ppid = stat[stat.rfind(')') + 1:].split()[1]
+        index.setdefault(ppid, []).append(pid)
+    for childs_pids in index.values():
+        childs_pids.sort(key=int)
+    return index
+
+def get_childs_pids(pid, index=None):
+    '''
+    Returns pids of all descendant processes of the process, in strings.
+    'index' is the output of childs_pids_index().  If it is None, this
+    function makes and uses a new one.
+    '''
+    if index is None:
+        index = childs_pids_index()
+    childs_pids = index.get('%s' % pid, [])
 
-    ret = childs_pids
+    ret = list(childs_pids)
     for child_pid in childs_pids:
-        childs_childs_pids = get_childs_pids(child_pid)
-        ret.extend(childs_childs_pids)
+        ret.extend(get_childs_pids(child_pid, index))
 
     return ret
 
 def pid_running(pid):
     try:
-        subprocess.check_output(['ps', '--pid', '%s' % pid])
+        os.kill(int(pid), 0)
+    except PermissionError:
+        # the process exists, but owned by another user
         return True
     except:
         return False
+    return True
 
 def best_effort_target_arrange(updated_targets, new_targets):
     '''
@@ -1958,6 +2001,7 @@ def add_vaddr_child_targets(ctx):
 
     changes_made = False
     orig_targets = ctx.targets
+    index = childs_pids_index()
     updated_targets = []
     child_targets = []
     for orig_target in orig_targets:
@@ -1965,7 +2009,7 @@ def add_vaddr_child_targets(ctx):
         if not pid_running(orig_target.pid):
             updated_targets[-1].obsolete = True
             changes_made = True
-        for child_pid in get_childs_pids('%s' % orig_target.pid):
+        for child_pid in get_childs_pids(orig_target.pid, index):
             child_targets.append(DamonTarget(pid=child_pid, regions=[]))
             changes_made = True
     if changes_made:
@@ -2003,25 +2047,36 @@ def turn_damon_on(kdamonds_idxs):
     err = _damon_fs.turn_damon_on(kdamonds_idxs)
     if err:
         return err
-    wait_kdamonds_turned_on()
+    return wait_kdamonds_turned_on()
 
 def turn_damon_off(kdamonds_idxs):
     err = _damon_fs.turn_damon_off(kdamonds_idxs)
     if err:
         return err
-    wait_kdamonds_turned_off()
+    return wait_kdamonds_turned_off()
 
 # DAMON status reading
 
 def is_kdamond_running(kdamond_idx):
     return _damon_fs.is_kdamond_running(kdamond_idx)
 
-def current_kdamonds():
-    return _damon_fs.current_kdamonds()
+def current_kdamonds(tried_regions_of=None):
+    '''
+    tried_regions_of: list of kdamond/context/scheme indices to read tried
+    regions of.  If it is None, read tried regions of all schemes.
+    '''
+    return _damon_fs.current_kdamonds(tried_regions_of)
+
+def current_kdamond(kdamond_idx, tried_regions_of=None):
+    '''Same to current_kdamonds(), but returns only the kdamond'''
+    if _damon_fs == _damon_dbgfs:
+        return current_kdamonds(tried_regions_of)[kdamond_idx]
+    return _damon_fs.current_kdamond(kdamond_idx, tried_regions_of)
 
 def update_read_kdamonds(
         nr_retries=0, update_stats=True, update_tried_regions=True,
-        update_quota_effective_bytes=False, do_update_tuned_intervals=False):
+        update_quota_effective_bytes=False, do_update_tuned_intervals=False,
+        tried_regions_of=None):
     err = 'assumed error'
     nr_tries = 0
     while True:
@@ -2040,7 +2095,9 @@ def update_read_kdamonds(
         time.sleep(random.randrange(2**(nr_tries - 1), 2**nr_tries) / 100)
     if err:
         return None, err
-    return current_kdamonds(), None
+    if not update_tried_regions and tried_regions_of is None:
+        tried_regions_of = []
+    return current_kdamonds(tried_regions_of), None
 
 def nr_kdamonds():
     return _damon_fs.nr_kdamonds()
@@ -2055,12 +2112,41 @@ def any_kdamond_running():
             return True
     return False
 
-def wait_kdamonds_turned_on():
-    for idx in range(nr_kdamonds()):
-        while not is_kdamond_running(idx):
-            time.sleep(1)
+# seconds that the last successful wait_kdamonds_turned_{on,off}() took
+last_kdamonds_wait_secs = None
 
-def wait_kdamonds_turned_off():
-    for idx in range(nr_kdamonds()):
-        while is_kdamond_running(idx):
-            time.sleep(1)
+def wait_kdamonds_state(running, timeout):
+    '''
+    Wait until all kdamonds are running, or not running.  Check the states
+    of all kdamonds together, with delays that start from a millisecond and
+    doubled up to 100 milliseconds.  Returns an error if timed out.  If
+    'timeout' is None, wait without the timeout.
+    '''
+    global last_kdamonds_wait_secs
+
+    start_time = time.time()
+    deadline = start_time + timeout if timeout is not None else None
+    delay = 0.001
+    idxs = list(range(nr_kdamonds()))
+    while True:
+        idxs = [idx for idx in idxs if is_kdamond_running(idx) != running]
+        if len(idxs) == 0:
+            break
+        sleep_secs = delay
+        if deadline is not None:
+            now = time.time()
+            if now >= deadline:
+                return 'kdamonds %s are not turned %s in %s seconds' % (
+                        ', '.join(['%d' % idx for idx in idxs]),
+                        'on' if running else 'off', timeout)
+            sleep_secs = min(sleep_secs, deadline - now)
+        time.sleep(sleep_secs)
+        delay = min(delay * 2, 0.1)
+    last_kdamonds_wait_secs = time.time() - start_time
+    return None
+
+def wait_kdamonds_turned_on(timeout=10):
+    return wait_kdamonds_state(True, timeout)
+
+def wait_kdamonds_turned_off(timeout=10):
+    return wait_kdamonds_state(False, timeout)
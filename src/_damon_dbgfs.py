@@ -314,7 +314,8 @@ def files_content_to_kdamonds(files_content):
     pid = files_content['kdamond_pid'].strip()
     return [_damon.Kdamond(state, pid, [ctx])]
 
-def current_kdamonds():
+def current_kdamonds(tried_regions_of=None):
+    # debugfs doesn't support tried regions.  Just ignore tried_regions_of.
     return files_content_to_kdamonds(
             _damo_fs.read_files(get_damon_dir()))
 
@@ -16,7 +16,7 @@ import _damon_features
 import damo_pa_layout
 
 def get_param_dir(module_name):
-    sysinfo = _damo_sysinfo.get_sysinfo_or_panic()
+    sysinfo = _damo_sysinfo.get_sysinfo_or_panic(areas=[])
     return os.path.join(sysinfo.sysfs_path, 'module', module_name,
                         'parameters')
 
@@ -806,19 +806,47 @@ def write_kdamonds_dir(dir_path, kdamonds):
         if err is not None:
             return err
 
-def stage_kdamonds(kdamonds):
+# number of writes that issued and skipped by the last staging
+last_staging_nr_writes = None
+last_staging_nr_skipped_writes = None
+
+def stage_with(write_fn, kdamonds, only_changes):
+    global last_staging_nr_writes
+    global last_staging_nr_skipped_writes
+
+    if not only_changes:
+        return write_fn(kdamonds)
+    _damo_fs.start_diff_writes()
+    try:
+        err = write_fn(kdamonds)
+    finally:
+        nr_writes, nr_skipped_writes = _damo_fs.stop_diff_writes()
+    last_staging_nr_writes = nr_writes
+    last_staging_nr_skipped_writes = nr_skipped_writes
+    if _damo_fs.debug_do_print:
+        print('staging issued %d writes, skipped %d unchanged files' %
+              (nr_writes, nr_skipped_writes))
+    return err
+
+def stage_kdamonds(kdamonds, only_changes=True):
     """Write DAMON parameters for kdamonds to the sysfs files.
 
     Args:
         kdamonds: A list of _damon.Kdamond objects.
+        only_changes: Skip writing files that already have the parameters.
 
     Returns:
         None for success, an error string if failed.
     """
     # Assume caller checked supported()
-    return write_kdamonds_dir(get_kdamonds_dir(), kdamonds)
+    return stage_with(
+            lambda kds: write_kdamonds_dir(get_kdamonds_dir(), kds),
+            kdamonds, only_changes)
 
-def stage_kdamonds_targets(kdamonds):
+def stage_kdamonds_targets(kdamonds, only_changes=True):
+    return stage_with(write_kdamonds_targets, kdamonds, only_changes)
+
+def write_kdamonds_targets(kdamonds):
     kdamonds_dir_path = get_kdamonds_dir()
 
     err = ensure_nr_file_for(os.path.join(kdamonds_dir_path, 'nr_kdamonds'), kdamonds)
@@ -1179,9 +1207,67 @@ def files_content_to_kdamonds(files_contents):
             for content in numbered_dirs_content(
                 files_contents, 'nr_kdamonds')]
 
-def current_kdamonds():
+def read_in_parallel(dir_path):
+    '''Returns whether the directory is that for a kdamond or a scheme'''
+    return os.path.basename(dir_path).isdigit() and os.path.basename(
+            os.path.dirname(dir_path)) in ['kdamonds', 'schemes']
+
+def read_tried_regions_files(contents, tried_regions_of):
+    '''
+    Read tried regions directories of schemes of given kdamond/context/scheme
+    indices into 'contents', which is read_files() output for kdamonds
+    directory.
+    '''
+    for kdamond_idx, context_idx, scheme_idx in tried_regions_of:
+        try:
+            scheme_content = contents['%d' % kdamond_idx]['contexts'][
+                    '%d' % context_idx]['schemes']['%d' % scheme_idx]
+        except KeyError:
+            continue
+        tried_regions_dir = scheme_tried_regions_dir_of(
+                kdamond_idx, context_idx, scheme_idx)
+        if not os.path.isdir(tried_regions_dir):
+            continue
+        scheme_content['tried_regions'] = _damo_fs.read_files(
+                tried_regions_dir)
+
+def read_kdamonds_files(tried_regions_of):
+    # subtrees of kdamonds and schemes are independent.  Read those in
+    # parallel.
+    if tried_regions_of is None:
+        return _damo_fs.read_files_concurrent(
+                get_kdamonds_dir(), read_in_parallel)
+
+    # tried regions directories could have thousands of regions.  Read only
+    # requested ones.
+    contents = _damo_fs.read_files_concurrent(
+            get_kdamonds_dir(), read_in_parallel,
+            skip_dirs=['tried_regions'])
+    read_tried_regions_files(contents, tried_regions_of)
+    return contents
+
+def current_kdamonds(tried_regions_of=None):
+    '''
+    tried_regions_of: list of kdamond/context/scheme indices to read tried
+    regions of.  If it is None, read tried regions of all schemes.
+    '''
     # Assume caller checked supported()
-    return files_content_to_kdamonds(_damo_fs.read_files(get_kdamonds_dir()))
+    return files_content_to_kdamonds(read_kdamonds_files(tried_regions_of))
+
+def current_kdamond(kdamond_idx, tried_regions_of=None):
+    '''
+    Same to current_kdamonds(), but read and return only the kdamond of the
+    index.
+    '''
+    kdamond_dir = kdamond_dir_of(kdamond_idx)
+    if tried_regions_of is None:
+        return files_content_to_kdamond(_damo_fs.read_files_concurrent(
+            kdamond_dir, read_in_parallel))
+    contents = _damo_fs.read_files_concurrent(
+            kdamond_dir, read_in_parallel, skip_dirs=['tried_regions'])
+    read_tried_regions_files({'%d' % kdamond_idx: contents},
+                             tried_regions_of)
+    return files_content_to_kdamond(contents)
 
 def get_nr_kdamonds_file():
     return os.path.join(get_kdamonds_dir(), 'nr_kdamonds')
@@ -1277,7 +1363,7 @@ def mk_feature_supports_map():
     for feature in features_sysfs_support_from_begining:
         supports_map[feature] = True
 
-    orig_kdamonds = current_kdamonds()
+    orig_kdamonds = current_kdamonds(tried_regions_of=[])
     # While DAMON is running, feature checking I/O can fail, corrupt something,
     # or make something complicated.  Just don't do that.
     for kd in orig_kdamonds:
@@ -0,0 +1,263 @@
+# SPDX-License-Identifier: GPL-2.0
+
+"""
+Serve DAMON snapshot, stats and tune requests over a Unix domain socket.
+"""
+
+import argparse
+import copy
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+
+import _damo_records
+import _damon
+import _damon_args
+import damo_tune
+
+class Coalescer:
+    '''
+    Run update_fn() for callers of get(), sharing one run among callers that
+    called get() while a run is ongoing.  Each caller receives the result of
+    a run that started after the call, so the result is never older than the
+    call.
+    '''
+    update_fn = None
+    cond = None
+    updating = None
+    nr_started = None
+    nr_done = None
+    result = None
+
+    def __init__(self, update_fn):
+        self.update_fn = update_fn
+        self.cond = threading.Condition()
+        self.updating = False
+        self.nr_started = 0
+        self.nr_done = 0
+
+    def get(self):
+        with self.cond:
+            target = self.nr_started + 1
+            while self.nr_done < target:
+                if self.updating:
+                    self.cond.wait()
+                    continue
+                self.updating = True
+                self.nr_started += 1
+                run_idx = self.nr_started
+                self.cond.release()
+                try:
+                    result = self.update_fn()
+                finally:
+                    self.cond.acquire()
+                    self.updating = False
+                    self.cond.notify_all()
+                self.result = result
+                self.nr_done = run_idx
+            return self.result
+
+class Daemon:
+    '''
+    Keeps a monitoring scheme for snapshots installed to all contexts of
+    running kdamonds, and serves requests using it.  DAMON sysfs accesses
+    are serialized with 'lock'.
+    '''
+    session = None      # _damo_records.SnapshotSession
+    lock = None
+    snapshot_coalescers = None
+
+    def __init__(self):
+        self.session = _damo_records.SnapshotSession(_damon.Damos(
+                access_pattern=_damon.DamosAccessPattern(), filters=[]))
+        self.lock = threading.Lock()
+        self.snapshot_coalescers = {}
+        for total_sz_only in [False, True]:
+            for merge_regions in [False, True]:
+                self.snapshot_coalescers[total_sz_only, merge_regions] = \
+                        Coalescer(
+                                lambda t=total_sz_only, m=merge_regions:
+                                self.update_snapshot_records(t, m))
+
+    def update_snapshot_records(self, total_sz_only, merge_regions):
+        '''Returns records having single snapshot and an error'''
+        with self.lock:
+            return self.session.snapshot_records(total_sz_only, merge_regions)
+
+    def snapshot(self, request):
+        records, err = self.snapshot_coalescers[
+                bool(request.get('total_sz_only', False)),
+                bool(request.get('merge_regions', False))].get()
+        if err is not None:
+            return {'err': err}
+        access_pattern = None
+        if request.get('access_pattern') is not None:
+            access_pattern = _damon.DamosAccessPattern.from_kvpairs(
+                    request['access_pattern'])
+        address_ranges = request.get('address_ranges')
+        if access_pattern is not None or address_ranges is not None:
+            # the records are shared with other requests
+            records = copy.deepcopy(records)
+            _damo_records.RecordFilter(
+                    access_pattern, address_ranges, None, None, None, None,
+                    None).filter_records(records)
+        return {'err': None,
+                'records': [r.to_kvpairs(raw=True) for r in records]}
+
+    def stats(self, request):
+        with self.lock:
+            kdamonds, err = _damon.update_read_kdamonds(
+                    nr_retries=5, update_stats=True,
+                    update_tried_regions=False,
+                    update_quota_effective_bytes=True)
+        if err is not None:
+            return {'err': err}
+        self.session.hide_scheme(kdamonds)
+        return {'err': None,
+                'kdamonds': [k.to_kvpairs(raw=True) for k in kdamonds]}
+
+    def tune(self, request):
+        '''Commit kdamonds for 'damo tune' command line arguments'''
+        parser = argparse.ArgumentParser(prog='damo tune', add_help=False,
+                                         exit_on_error=False)
+        damo_tune.set_argparser(parser)
+        try:
+            args = parser.parse_args(request.get('args', []))
+        except (argparse.ArgumentError, SystemExit) as e:
+            return {'err': 'wrong tune arguments (%s)' % e}
+
+        kdamonds, err = _damon_args.kdamonds_for(args)
+        if err is not None:
+            return {'err': 'kdamonds making fail (%s)' % err}
+        with self.lock:
+            if not args.quota_goals_only:
+                # keep the snapshot scheme installed
+                for kdamond in kdamonds:
+                    for ctx in kdamond.contexts:
+                        ctx.schemes.append(copy.deepcopy(
+                            self.session.monitor_scheme))
+            err = _damon.commit(kdamonds, args.quota_goals_only)
+            if err is not None:
+                return {'err': 'commit fail (%s)' % err}
+            if not args.quota_goals_only:
+                self.session.installed = True
+            err = self.session.install()
+            if err is not None:
+                return {'err': 'scheme install fail (%s)' % err}
+        return {'err': None}
+
+    def handle_request(self, request):
+        cmd_handlers = {'snapshot': self.snapshot, 'stats': self.stats,
+                        'tune': self.tune}
+        if type(request) is not dict or not request.get('cmd') in cmd_handlers:
+            return {'err': 'unsupported request (%s)' % request}
+        try:
+            return cmd_handlers[request['cmd']](request)
+        except Exception as e:
+            return {'err': 'request handling fail (%s)' % e}
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    '''Handle requests of a client, a json object per line'''
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except Exception as e:
+                response = {'err': 'json parsing fail (%s)' % e}
+            else:
+                response = self.server.damo_daemon.handle_request(request)
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    damo_daemon = None
+
+def serve(daemon, socket_path, socket_permission):
+    '''Serve until SIGINT or SIGTERM.  Returns an error if failed'''
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    old_umask = os.umask(0o777 & ~socket_permission)
+    try:
+        server = Server(socket_path, RequestHandler)
+    except Exception as e:
+        return 'socket creation fail (%s)' % e
+    finally:
+        os.umask(old_umask)
+    server.damo_daemon = daemon
+
+    def stop_server(sig, frame):
+        threading.Thread(target=server.shutdown).start()
+    signal.signal(signal.SIGINT, stop_server)
+    signal.signal(signal.SIGTERM, stop_server)
+    server.serve_forever()
+    server.server_close()
+    os.remove(socket_path)
+    return None
+
+def request(socket_path, request):
+    '''Send a request to the daemon.  Returns the response and an error'''
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(request).encode() + b'\n')
+            with sock.makefile('rb') as f:
+                response = json.loads(f.readline())
+    except Exception as e:
+        return None, 'request fail (%s)' % e
+    return response, None
+
+def main(args):
+    if args.request is not None:
+        try:
+            request_ = json.loads(args.request)
+        except Exception as e:
+            print('wrong --request (%s)' % e)
+            exit(1)
+        response, err = request(args.socket, request_)
+        if err is not None:
+            print(err)
+            exit(1)
+        print(json.dumps(response, indent=4))
+        return
+
+    socket_permission, err = _damo_records.parse_file_permission_str(
+            args.socket_permission)
+    if err is not None:
+        print('wrong --socket_permission (%s)' % err)
+        exit(1)
+
+    _damon.ensure_root_and_initialized(args)
+    if not _damon.any_kdamond_running():
+        print('DAMON is not turned on')
+        exit(1)
+
+    daemon = Daemon()
+    err = daemon.session.install()
+    if err is not None:
+        print('snapshot scheme install fail (%s)' % err)
+        exit(1)
+    err = serve(daemon, args.socket, socket_permission)
+    uninstall_err = daemon.session.close()
+    if err is not None:
+        print(err)
+    if uninstall_err is not None:
+        print('snapshot scheme uninstall fail (%s)' % uninstall_err)
+    if err is not None or uninstall_err is not None:
+        exit(1)
+
+def set_argparser(parser):
+    parser.add_argument('--socket', metavar='<path>',
+                        default='/run/damo.sock',
+                        help='path to the Unix domain socket')
+    parser.add_argument('--socket_permission', metavar='<mode>',
+                        default='600',
+                        help='permission of the socket, in octal')
+    parser.add_argument('--request', metavar='<json>',
+                        help=' '.join([
+                            'send the request to the running daemon and',
+                            'print the response, instead of serving']))
+    _damon_args.set_common_argparser(parser)
@@ -2,14 +2,23 @@
 
 "Record and report data access pattern in realtime"
 
+import argparse
+import copy
 import signal
 import subprocess
 import sys
+import time
 
+import _damo_records
 import _damon
 import _damon_args
+import damo_report_heatmap
+import damo_wss
 
 def cleanup(exit_code=0):
+    err = _damo_records.stop_snapshot_sessions()
+    if err is not None:
+        print('snapshot sessions stop fail (%s)' % err)
     if target_type == _damon_args.target_type_cmd and cmd_pipe.poll() == None:
         cmd_pipe.kill()
     if target_type != 'ongoing':
@@ -25,8 +34,104 @@ def sighandler(signum, frame):
     print('\nsignal %s received' % signum)
     cleanup()
 
+def update_records_window(records, snapshot_records, window_ns):
+    '''
+    Append snapshots of snapshot_records to records having same source, and
+    remove snapshots that ended window_ns before the last snapshot.
+    '''
+    for snapshot_record in snapshot_records:
+        for record in records:
+            if (record.kdamond_idx == snapshot_record.kdamond_idx and
+                    record.context_idx == snapshot_record.context_idx and
+                    record.scheme_idx == snapshot_record.scheme_idx and
+                    record.target_id == snapshot_record.target_id):
+                record.snapshots += snapshot_record.snapshots
+                break
+        else:
+            records.append(snapshot_record)
+    for record in records:
+        if len(record.snapshots) == 0:
+            continue
+        window_start = record.snapshots[-1].end_time - window_ns
+        record.snapshots = [s for s in record.snapshots
+                            if s.end_time > window_start]
+
+def fmt_heats(records, delay):
+    parser = argparse.ArgumentParser()
+    damo_report_heatmap.set_argparser(parser)
+    args = parser.parse_args(
+            ['--resol', '10', '80',
+             '--time_range', '%f s' % (delay * -1), '0 s', 'guided_end',
+             '--stdout_skip_colorset_example'])
+    err = damo_report_heatmap.complete_src_args(args, records)
+    if err is not None:
+        return None, 'source arguments completion fail (%s)' % err
+    lines = []
+    for idx in range(len(args.address_range)):
+        output = damo_report_heatmap.fmt_heats(args, idx, records)
+        lines += [line for line in output.strip().split('\n')
+                  if not line.startswith('#')]
+    return '\n'.join(lines), None
+
+def fmt_wss(records):
+    parser = argparse.ArgumentParser()
+    damo_wss.set_argparser(parser)
+    args = parser.parse_args([])
+    # adjusting the records changes those, but the records are reused for
+    # following reports
+    return damo_wss.fmt_wss_dists(args, copy.deepcopy(records)) + '\n', None
+
+def monitor_in_process(args):
+    '''
+    Repeatedly get live snapshots from the running kdamonds and report those
+    in this process, without recording to and reading from files.
+    '''
+    # keep the monitoring scheme for the snapshots installed for all frames
+    _damo_records.start_snapshot_sessions()
+    try:
+        show_snapshots(args)
+    finally:
+        err = _damo_records.stop_snapshot_sessions()
+        if err is not None:
+            print('snapshot sessions stop fail (%s)' % err)
+
+def show_snapshots(args):
+    records = []
+    window_ns = args.delay * 1000000000
+    nr_reports = 0
+    while not args.count or nr_reports < args.count:
+        if (target_type == _damon_args.target_type_cmd and
+                cmd_pipe.poll() != None):
+            break
+        deadline = time.time() + args.delay
+        snapshot_records, err = _damo_records.get_snapshot_records_of(
+                _damo_records.SnapshotRequest())
+        if err is not None:
+            print('Snapshot fail (%s)' % err)
+            if target_type == 'ongoing':
+                print('Maybe you stopped DAMON?')
+            break
+        update_records_window(records, snapshot_records, window_ns)
+
+        if args.report_type == 'heats':
+            output, err = fmt_heats(records, args.delay)
+        else:
+            output, err = fmt_wss(records)
+        if err is not None:
+            print('Report generating fail (%s)' % err)
+            break
+        print(output)
+        nr_reports += 1
+
+        time.sleep(max(deadline - time.time(), 0))
+
 def main(args):
     _damon.ensure_root_permission()
+    if args.in_process:
+        if args.report_type == 'holistic':
+            print('holistic report is not supported with --in_process')
+            exit(1)
+        _damon.ensure_root_and_initialized(args)
 
     global target_type
     global cmd_pipe
@@ -50,13 +155,23 @@ def main(args):
                     stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
             target = cmd_pipe.pid
 
-        if subprocess.call([damo, 'start', '%s' % target]) != 0:
+        start_cmd = [damo, 'start', '%s' % target]
+        if args.debug_damon:
+            start_cmd.append('--debug_damon')
+        if subprocess.call(start_cmd) != 0:
             print('starting DAMON fail')
             exit(1)
     else:
         target_type = 'ongoing'
 
+    if args.in_process:
+        monitor_in_process(args)
+        cleanup()
+
     record_cmd = [damo, 'record', '--timeout', '%f' % args.delay, 'ongoing']
+    if args.debug_damon:
+        # reports read only the record files.  Let the recording debug DAMON.
+        record_cmd.append('--debug_damon')
 
     report_cmd = [damo, 'report']
     if args.report_type == 'heats':
@@ -74,7 +189,10 @@ def main(args):
                 cmd_pipe.poll() != None):
             break
         try:
-            subprocess.check_output(record_cmd, stderr=subprocess.STDOUT)
+            output = subprocess.check_output(
+                    record_cmd, stderr=subprocess.STDOUT).decode()
+            if args.debug_damon:
+                print(output)
         except Exception as e:
             print('Recording fail (%s)' % e)
             if target_type == 'ongoing':
@@ -107,3 +225,10 @@ def set_argparser(parser):
             help='deplay between updates in seconds.')
     parser.add_argument('--count', type=int, metavar='<count>', default=0,
             help='number of updates.')
+    parser.add_argument(
+            '--in_process', action='store_true',
+            help=' '.join([
+                'get live snapshots and make reports in this process,',
+                'instead of recording to and reporting from files.',
+                'Supports only heats and wss report types.']))
+    _damon_args.set_common_argparser(parser)
@@ -24,6 +24,7 @@ class DataForCleanup:
 data_for_cleanup = DataForCleanup()
 
 cleaning = False
+signal_received = None
 
 def cleanup_exit(exit_code):
     global cleaning
@@ -43,8 +44,14 @@ def cleanup_exit(exit_code):
     exit(exit_code)
 
 def sighandler(signum, frame):
+    global signal_received
     print('\nsignal %s received' % signum)
-    cleanup_exit(signum)
+    if data_for_cleanup.record_handle is None:
+        cleanup_exit(signum)
+    # finishing the recording here could deadlock with the interrupted
+    # recording loop.  Let the loop stop, and cleanup after that.
+    signal_received = signum
+    data_for_cleanup.record_handle.stop_requested = True
 
 def handle_args(args):
     if not args.deducible_target:
@@ -226,6 +233,8 @@ def main(args):
     if record_handle.will_take_awhile():
         print('Press Ctrl+C to stop')
     _damo_records.start_recording(record_handle)
+    if signal_received is not None:
+        cleanup_exit(signal_received)
     cleanup_exit(0)
 
 def set_argparser(parser):
@@ -1,65 +1,283 @@
 # SPDX-License-Identifier: GPL-2.0
 
+import bisect
+import json
+import mmap
 import os
 import time
 
 import _damo_fmt_str
 import _damo_records
 
-page_map = {}
-
 sz_page = 4096
+sz_segment = 256 * 1024 * 1024
 
-def get_page(pfn):
-    if not pfn in page_map:
-        page_map[pfn] = bytearray(sz_page)
-    return page_map[pfn]
-
-def access_region(start_addr, end_addr):
-    for addr in range(start_addr, end_addr, sz_page):
-        page = get_page(addr / sz_page)
-        _ = page[int(sz_page / 2)]
-
-def replay_snapshot(snapshot, mon_intervals):
-    runtime_sec = (snapshot.end_time - snapshot.start_time) / 1000000000
-    max_nr_accesses = mon_intervals.aggr / mon_intervals.sample
-    time_slice = runtime_sec / max_nr_accesses
-    nr_slices = int(runtime_sec / time_slice)
-    for slice_idx in range(nr_slices):
-        start_time = time.time()
-        for region in snapshot.regions:
-            if slice_idx < region.nr_accesses.samples:
-                access_region(region.start, region.end)
-        while time.time() - start_time < time_slice:
-            pass
-
-def test_perf(size_mem, test_time):
-    test_start_time = time.time()
-    access_start_time = time.time()
-    next_output_time = time.time() + 1
-    nr_accesses = 0
-    while True:
-        access_region(0, size_mem)
-        nr_accesses += 1
-
-        if time.time() >= next_output_time:
-            print('replayer can access %s memory per second' %
-                  _damo_fmt_str.format_sz(
-                      size_mem * nr_accesses /
-                      (time.time() - access_start_time),
-                      machine_friendly=False))
-            next_output_time = time.time() + 1
-            nr_accesses = 0
-            access_start_time = time.time()
-
-        if time.time() - test_start_time >= test_time:
-            break
+class ReplayMemory:
+    '''
+    Address ranges to replay accesses to, and the offsets of those on the
+    replay memory.  The ranges are placed on the memory contiguously, without
+    the gaps between those.
+    '''
+    starts = None       # sorted start addresses of the ranges
+    offsets = None      # offset of each range on the memory
+    size = None
+
+    def __init__(self, addr_ranges):
+        self.starts = []
+        self.offsets = []
+        self.size = 0
+        last_end = None
+        for start, end in sorted(addr_ranges):
+            start = start // sz_page * sz_page
+            end = (end + sz_page - 1) // sz_page * sz_page
+            if last_end is not None and start <= last_end:
+                if end > last_end:
+                    self.size += end - last_end
+                    last_end = end
+                continue
+            self.starts.append(start)
+            self.offsets.append(self.size)
+            self.size += end - start
+            last_end = end
+
+    def offset_of(self, addr):
+        idx = bisect.bisect_right(self.starts, addr) - 1
+        return self.offsets[idx] + addr - self.starts[idx]
+
+    def chunks(self, nr_chunks):
+        '''Split the memory into page-aligned [start, end) offset ranges'''
+        nr_pages = self.size // sz_page
+        nr_chunks = max(min(nr_chunks, nr_pages), 1)
+        chunk_pages = (nr_pages + nr_chunks - 1) // nr_chunks
+        return [[idx * chunk_pages * sz_page,
+                 min((idx + 1) * chunk_pages, nr_pages) * sz_page]
+                for idx in range(nr_chunks)
+                if idx * chunk_pages < nr_pages]
+
+class ReplayBuffer:
+    '''
+    Anonymous memory to replay accesses to.  The memory is mapped in segments
+    on their first access, since the recorded regions could be larger than the
+    memory that a single mapping is allowed to have, and only pages that
+    really accessed need to be populated.
+    '''
+    size = None
+    segments = None
+
+    def __init__(self, size):
+        self.size = size
+        self.segments = {}
+
+    def segment(self, idx):
+        if not idx in self.segments:
+            self.segments[idx] = memoryview(mmap.mmap(
+                -1, sz_segment,
+                flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS))
+        return self.segments[idx]
+
+    def touch(self, start, end):
+        '''
+        Write a byte in the middle of each page of [start, end) of the memory,
+        all pages of a segment at once.  Returns the size of the touched pages.
+        '''
+        end = min(end, self.size)
+        sz_touched = 0
+        addr = start - start % sz_page
+        while addr < end:
+            idx = addr // sz_segment
+            seg_start = addr - idx * sz_segment
+            seg_end = min(end - idx * sz_segment, sz_segment)
+            nr_pages = len(range(seg_start + sz_page // 2, seg_end, sz_page))
+            self.segment(idx)[seg_start + sz_page // 2:seg_end:sz_page] = (
+                    b'\x01' * nr_pages)
+            sz_touched += nr_pages * sz_page
+            addr = (idx + 1) * sz_segment
+        return sz_touched
+
+def snapshot_accesses(snapshot, memory, chunk):
+    '''
+    Returns nr_accesses (samples) and [start, end) offsets in the chunk for
+    regions of the snapshot in the chunk, sorted by the nr_accesses in
+    descending order.
+    '''
+    chunk_start, chunk_end = chunk
+    accesses = []
+    for region in snapshot.regions:
+        if region.nr_accesses.samples <= 0:
+            continue
+        start = memory.offset_of(region.start)
+        end = start + region.size()
+        start = max(start, chunk_start)
+        end = min(end, chunk_end)
+        if start >= end:
+            continue
+        accesses.append([region.nr_accesses.samples, start - chunk_start,
+                         end - chunk_start])
+    accesses.sort(key=lambda x: x[0], reverse=True)
+    return accesses
+
+class ReplayStat:
+    nr_slices = None
+    nr_late_slices = None
+    sz_touched = None
+    busy_sec = None
+
+    def __init__(self):
+        self.nr_slices = 0
+        self.nr_late_slices = 0
+        self.sz_touched = 0
+        self.busy_sec = 0
+
+    def to_kvpairs(self):
+        return self.__dict__
+
+    @classmethod
+    def from_kvpairs(cls, kvpairs):
+        self = cls()
+        for key, value in kvpairs.items():
+            setattr(self, key, value)
+        return self
+
+def replay_chunk(record, memory, chunk, start_time, progress_notice_interval):
+    '''
+    Replay accesses of the record to the chunk of the memory.  Each time slice
+    of each snapshot is scheduled from 'start_time'.  If the accesses of a
+    time slice are done earlier than its end, sleep until the end.  If later,
+    start the next slice without sleep, to catch up the schedule.
+    '''
+    buf = ReplayBuffer(chunk[1] - chunk[0])
+    stat = ReplayStat()
+    snapshot_start_time = start_time
+    if progress_notice_interval is not None:
+        progress_notice_time = start_time + progress_notice_interval
+    for idx, snapshot in enumerate(record.snapshots):
+        runtime_sec = (snapshot.end_time - snapshot.start_time) / 1000000000
+        max_nr_accesses = record.intervals.aggr / record.intervals.sample
+        time_slice = runtime_sec / max_nr_accesses
+        nr_slices = int(runtime_sec / time_slice)
+        accesses = snapshot_accesses(snapshot, memory, chunk)
+        for slice_idx in range(nr_slices):
+            busy_start_time = time.time()
+            for nr_accesses, start, end in accesses:
+                if nr_accesses <= slice_idx:
+                    break
+                stat.sz_touched += buf.touch(start, end)
+            now = time.time()
+            stat.busy_sec += now - busy_start_time
+            stat.nr_slices += 1
+            slice_end_time = snapshot_start_time + (
+                    slice_idx + 1) * time_slice
+            if now > slice_end_time:
+                stat.nr_late_slices += 1
+            else:
+                time.sleep(slice_end_time - now)
+        snapshot_start_time += runtime_sec
+        if (progress_notice_interval is not None and
+                time.time() >= progress_notice_time):
+            print('%d/%d snapshots replayed in %.3f seconds' %
+                  (idx, len(record.snapshots), time.time() - start_time))
+            progress_notice_time += progress_notice_interval
+    return stat
+
+def run_workers(nr_workers, worker_fn):
+    '''
+    Run worker_fn(worker_idx) for each worker in a forked process, and return
+    the ReplayStat objects that returned by those, and an error.  Run it in
+    this process if only one worker is requested.
+    '''
+    if nr_workers == 1:
+        try:
+            return [worker_fn(0)], None
+        except Exception as e:
+            return None, 'replay worker 0 failed (%s)' % e
+    workers = []
+    for worker_idx in range(nr_workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            exit_code = 1
+            try:
+                stat = worker_fn(worker_idx)
+                with os.fdopen(write_fd, 'w') as f:
+                    json.dump(stat.to_kvpairs(), f)
+                exit_code = 0
+            except Exception as e:
+                print('replay worker %d failed (%s)' % (worker_idx, e))
+            finally:
+                os._exit(exit_code)
+        os.close(write_fd)
+        workers.append([pid, read_fd])
+    stats = []
+    failed_workers = []
+    for worker_idx, (pid, read_fd) in enumerate(workers):
+        with os.fdopen(read_fd, 'r') as f:
+            output = f.read()
+        _, status = os.waitpid(pid, 0)
+        if (not os.WIFEXITED(status) or os.WEXITSTATUS(status) != 0 or
+                output == ''):
+            failed_workers.append('%d' % worker_idx)
+            continue
+        stats.append(ReplayStat.from_kvpairs(json.loads(output)))
+    if len(failed_workers) > 0:
+        return None, 'replay workers %s failed' % ', '.join(failed_workers)
+    return stats, None
+
+def fmt_fidelity(stats, record_sec, replay_sec):
+    nr_slices = sum(s.nr_slices for s in stats)
+    nr_late_slices = sum(s.nr_late_slices for s in stats)
+    sz_touched = sum(s.sz_touched for s in stats)
+    busy_sec = max([s.busy_sec for s in stats] + [0])
+    lines = ['replay fidelity:']
+    if nr_slices > 0:
+        lines.append('- %d/%d (%.2f %%) time slices done in time' % (
+            nr_slices - nr_late_slices, nr_slices,
+            (nr_slices - nr_late_slices) * 100 / nr_slices))
+    lines.append('- %s of recorded time replayed in %s' % (
+        _damo_fmt_str.format_time_sec(record_sec, False),
+        _damo_fmt_str.format_time_sec(replay_sec, False)))
+    lines.append('- %s memory touched (%s per second while busy)' % (
+        _damo_fmt_str.format_sz(sz_touched, False),
+        _damo_fmt_str.format_sz(sz_touched / busy_sec, False)
+        if busy_sec > 0 else '-'))
+    return '\n'.join(lines)
+
+def test_perf_chunk(memory, chunk, test_time):
+    buf = ReplayBuffer(chunk[1] - chunk[0])
+    stat = ReplayStat()
+    start_time = time.time()
+    while time.time() - start_time < test_time:
+        stat.sz_touched += buf.touch(0, buf.size)
+    stat.busy_sec = time.time() - start_time
+    return stat
+
+def test_perf(size_mem, test_time, nr_workers):
+    memory = ReplayMemory([[0, size_mem]])
+    chunks = memory.chunks(nr_workers)
+    stats, err = run_workers(
+            len(chunks),
+            lambda idx: test_perf_chunk(memory, chunks[idx], test_time))
+    if err is not None:
+        print('performance test fail (%s)' % err)
+        exit(1)
+    print('replayer can access %s memory per second' %
+          _damo_fmt_str.format_sz(
+              sum(s.sz_touched / s.busy_sec for s in stats if s.busy_sec > 0),
+              machine_friendly=False))
 
 def main(args):
+    if args.nr_workers is None:
+        nr_workers = os.cpu_count()
+    else:
+        nr_workers = args.nr_workers
+    if nr_workers < 1:
+        print('wrong --nr_workers (%d)' % nr_workers)
+        exit(1)
+
     if args.test_perf is True:
         size_mem = _damo_fmt_str.text_to_bytes(args.test_perf_sz_mem)
         test_time = _damo_fmt_str.text_to_sec(args.test_perf_runtime)
-        return test_perf(size_mem, test_time)
+        return test_perf(size_mem, test_time, nr_workers)
 
     input_file = args.input
 
@@ -81,9 +299,13 @@ def main(args):
         print('supporting only single record for now')
 
     record = records[0]
+    addr_ranges = []
     for snapshot in record.snapshots:
         for region in snapshot.regions:
             region.nr_accesses.add_unset_unit(record.intervals)
+            addr_ranges.append([region.start, region.end])
+    memory = ReplayMemory(addr_ranges)
+    chunks = memory.chunks(nr_workers)
 
     if args.progress_notice_interval is None:
         progress_notice_interval = 3
@@ -92,14 +314,18 @@ def main(args):
                 args.progress_notice_interval)
 
     play_start_time = time.time()
-    progress_notice_time = play_start_time + + progress_notice_interval
-    for idx, snapshot in enumerate(record.snapshots):
-        replay_snapshot(snapshot, record.intervals)
-        if time.time() >= progress_notice_time:
-            print('%d/%d snapshots replayed in %.3f seconds' %
-                  (idx, len(record.snapshots), time.time() - play_start_time))
-            progress_notice_time += progress_notice_interval
+    # only the first worker notices the progress
+    stats, err = run_workers(
+            len(chunks), lambda idx: replay_chunk(
+                record, memory, chunks[idx], play_start_time,
+                progress_notice_interval if idx == 0 else None))
+    if err is not None:
+        print('replay fail (%s)' % err)
+        exit(1)
     print('all snapshots are replayed')
+    record_sec = sum(s.end_time - s.start_time
+                     for s in record.snapshots) / 1000000000
+    print(fmt_fidelity(stats, record_sec, time.time() - play_start_time))
 
 def set_argparser(parser):
     parser.add_argument('input', metavar='<file>', nargs='?',
@@ -107,6 +333,11 @@ def set_argparser(parser):
                         help='record file to replay')
     parser.add_argument('--progress_notice_interval', metavar='<seconds>',
                         help='time interval between replay progress notice')
+    parser.add_argument('--nr_workers', metavar='<number>', type=int,
+                        help=' '.join([
+                            'number of worker processes that replay accesses',
+                            'to each part of the address space.',
+                            'Number of CPUs by default.']))
     parser.add_argument('--test_perf', action='store_true',
                         help='measure performance of replayer')
     parser.add_argument('--test_perf_sz_mem', metavar='<bytes>',
@@ -1,11 +1,13 @@
 # SPDX-License-Identifier: GPL-2.0
 
 import argparse
+import bisect
 import code
 import copy
 import json
 import math
 import os
+import re
 import signal
 import sys
 import tempfile
@@ -441,18 +443,98 @@ def histogram_str(hist):
         lines.append('%s %s %s' % (xrange_str, y_str, bar))
     return '\n'.join(lines)
 
-def get_distribution(snapshot, fmt, get_metric_fn, aggr_us, get_count_fn):
-    dist = {}
-    for region in snapshot.regions:
-        metric_val = get_metric_fn(region, fmt, aggr_us)
-        if not metric_val in dist:
-            dist[metric_val] = 0
-        dist[metric_val] += get_count_fn(region, fmt)
-    return dist
+class SnapshotMetricDist:
+    '''
+    Distribution of region sizes of a snapshot over a metric of the regions.
+    Made by sorting the regions by the metric once.  Histograms and
+    percentiles of the metric are derived from it using binary search.
+    '''
+    metrics = None          # sorted distinct metric values
+    cumulated_counts = None # cumulated counts of metrics smaller than each
+    sorted_counts = None    # counts of regions that sorted by the metric
+    group_ends = None       # index of last region of each metric value
+    percents = None         # cumulated percents of each metric value
+
+    def __init__(self, snapshot, fmt, get_metric_fn, aggr_us, get_count_fn):
+        metric_counts = sorted(
+                [[get_metric_fn(r, fmt, aggr_us), get_count_fn(r, fmt)]
+                 for r in snapshot.regions], key=lambda x: x[0])
+        self.metrics = []
+        self.cumulated_counts = [0]
+        self.sorted_counts = []
+        self.group_ends = []
+        for metric, count in metric_counts:
+            if len(self.metrics) == 0 or self.metrics[-1] != metric:
+                self.metrics.append(metric)
+                self.cumulated_counts.append(self.cumulated_counts[-1])
+                self.group_ends.append(len(self.sorted_counts))
+            self.cumulated_counts[-1] += count
+            self.group_ends[-1] = len(self.sorted_counts)
+            self.sorted_counts.append(count)
+
+    def range_count(self, min_metric, max_metric):
+        '''Returns sum of counts of metrics in [min_metric, max_metric)'''
+        start_idx = bisect.bisect_left(self.metrics, min_metric)
+        end_idx = bisect.bisect_left(self.metrics, max_metric)
+        if end_idx <= start_idx:
+            return 0
+        return (self.cumulated_counts[end_idx] -
+                self.cumulated_counts[start_idx])
+
+    def cumulated_percents(self):
+        '''
+        Returns cumulated percents of counts for each metric value, until it
+        reaches 100.  The percents are accumulated in the order of the sorted
+        regions, to avoid making different floating point errors.
+        '''
+        if self.percents is not None:
+            return self.percents
+        total_count = self.cumulated_counts[-1]
+        self.percents = []
+        percentile = 0
+        group_idx = 0
+        for idx, count in enumerate(self.sorted_counts):
+            percentile += count * 100 / total_count
+            if idx == self.group_ends[group_idx] or percentile >= 100.0:
+                self.percents.append(percentile)
+                group_idx += 1
+            if percentile >= 100.0:
+                break
+        return self.percents
+
+    def percentile_values(self, percentiles_to_show):
+        percents = self.cumulated_percents()
+        percentile_values = []
+        idx = 0
+        for pidx, percentile in enumerate(percentiles_to_show):
+            idx = max(idx, bisect.bisect_left(percents, percentile))
+            if idx == len(percents):
+                if 100 in percentiles_to_show[pidx:]:
+                    percentile_values.append([100, self.metrics[idx - 1]])
+                break
+            percentile_values.append([percentile, self.metrics[idx]])
+        return percentile_values
+
+def get_snapshot_metric_dist(snapshot, fmt, get_metric_fn, aggr_us,
+                             df_passed):
+    '''
+    Returns SnapshotMetricDist of the snapshot for the metric.  The result is
+    cached in the snapshot, so that multiple formatters can reuse it.
+    '''
+    if df_passed is True:
+        get_count_fn = get_df_passed_sz_region
+    else:
+        get_count_fn = get_sz_region
+    key = (get_metric_fn, aggr_us, tuple(fmt.temperature_weights), df_passed)
+    if snapshot.metric_dists is None:
+        snapshot.metric_dists = {}
+    if not key in snapshot.metric_dists:
+        snapshot.metric_dists[key] = SnapshotMetricDist(
+                snapshot, fmt, get_metric_fn, aggr_us, get_count_fn)
+    return snapshot.metric_dists[key]
 
 def get_sorted_ranged_historgram(
-        hist, fmt, fmt_x_fn, parse_x_fn, fmt_y_fn, y_aggr_fn):
-    metrics = sorted(hist.keys())
+        dist, fmt, fmt_x_fn, parse_x_fn, fmt_y_fn):
     hist2 = []
     if fmt.hist_ranges is not None:
         hist_ranges = []
@@ -461,14 +543,13 @@ def get_sorted_ranged_historgram(
                     [parse_x_fn(fmt.hist_ranges[i]),
                      parse_x_fn(fmt.hist_ranges[i + 1])])
     else:
-        min_metric, max_metric = metrics[0], metrics[-1]
+        min_metric, max_metric = dist.metrics[0], dist.metrics[-1]
         hist_ranges = get_hist_ranges(
                 min_metric, max_metric, 10, fmt.hist_logscale,
                 fmt.hist_cumulate)
     raw = fmt.raw_number
     for min_m, max_m in hist_ranges:
-        yval = y_aggr_fn(
-                [hist[x] for x in metrics if x >= min_m and x < max_m])
+        yval = dist.range_count(min_m, max_m)
         metric_range_str = '[%s, %s)' % (
                 fmt_x_fn(min_m, raw), fmt_x_fn(max_m, raw))
         yval_str = fmt_y_fn(yval, raw)
@@ -485,15 +566,10 @@ def sz_hist_str(snapshot, fmt, df_passed_sz, get_metric_fn, aggr_us,
                 fmt_metric_fn, parse_metric_fn):
     if len(snapshot.regions) == 0:
         return 'no region in snapshot'
-    if df_passed_sz is True:
-        get_count_fn = get_df_passed_sz_region
-    else:
-        get_count_fn = get_sz_region
-    dist = get_distribution(
-            snapshot, fmt, get_metric_fn, aggr_us, get_count_fn)
+    dist = get_snapshot_metric_dist(
+            snapshot, fmt, get_metric_fn, aggr_us, df_passed_sz)
     hist = get_sorted_ranged_historgram(
-            dist, fmt, fmt_metric_fn, parse_metric_fn, _damo_fmt_str.format_sz,
-            lambda sz_list: sum(sz_list))
+            dist, fmt, fmt_metric_fn, parse_metric_fn, _damo_fmt_str.format_sz)
 
     return histogram_str(hist)
 
@@ -539,30 +615,9 @@ def get_percentile_values(snapshot, aggr_us, recency_or_temperature, df_passed,
         get_metric_fn = get_idle_time
     else:
         get_metric_fn = get_temperature
-    regions = sorted(snapshot.regions,
-                     key=lambda r: get_metric_fn(r, fmt, aggr_us))
-    if df_passed is True:
-        total_sz = sum(r.sz_filter_passed for r in regions)
-    else:
-        total_sz = sum(r.size() for r in regions)
-    percentile_values = []
-    percentile = 0
-    for r in regions:
-        if df_passed is True:
-            percentile += r.sz_filter_passed * 100 / total_sz
-        else:
-            percentile += r.size() * 100 / total_sz
-        while len(percentiles_to_show) > 0:
-            if percentile < percentiles_to_show[0]:
-                break
-            percentile_values.append(
-                    [percentiles_to_show[0], get_metric_fn(r, fmt, aggr_us)])
-            percentiles_to_show = percentiles_to_show[1:]
-        if percentile >= 100.0:
-            break
-    if 100 in percentiles_to_show:
-        percentile_values.append([100, get_metric_fn(r, fmt, aggr_us)])
-    return percentile_values
+    dist = get_snapshot_metric_dist(
+            snapshot, fmt, get_metric_fn, aggr_us, df_passed)
+    return dist.percentile_values(percentiles_to_show)
 
 def fmt_percentile_str_head(recency_or_temperature, df_passed, fmt):
     if recency_or_temperature == 'recency':
@@ -872,29 +927,41 @@ class ColoredBox:
         return box
 
 class SortedAccessPatterns:
+    '''
+    Minimum and maximum of access pattern values of all regions, as sorted
+    lists of the two values.
+    '''
     sz_regions = None
     access_rates_percent = None
     ages_us = None
 
     def __init__(self, records):
-        self.sz_regions = []
-        self.access_rates_percent = []
-        self.ages_us = []
+        sz_regions = []
+        access_rates_percent = []
+        ages_us = []
 
         for record in records:
             for snapshot in record.snapshots:
-                for region in snapshot.regions:
-                    self.sz_regions.append(region.size())
-
+                regions = snapshot.regions
+                if len(regions) == 0:
+                    continue
+                for region in regions:
                     region.nr_accesses.add_unset_unit(record.intervals)
-                    self.access_rates_percent.append(
-                            region.nr_accesses.percent)
-
                     region.age.add_unset_unit(record.intervals)
-                    self.ages_us.append(region.age.usec)
-        self.sz_regions.sort()
-        self.access_rates_percent.sort()
-        self.ages_us.sort()
+                sizes = [r.size() for r in regions]
+                sz_regions += [min(sizes), max(sizes)]
+                rates = [r.nr_accesses.percent for r in regions]
+                access_rates_percent += [min(rates), max(rates)]
+                ages = [r.age.usec for r in regions]
+                ages_us += [min(ages), max(ages)]
+        self.sz_regions = min_max_list(sz_regions)
+        self.access_rates_percent = min_max_list(access_rates_percent)
+        self.ages_us = min_max_list(ages_us)
+
+def min_max_list(values):
+    if len(values) == 0:
+        return []
+    return [min(values), max(values)]
 
 class RegionBoxAttr:
     value_name = None
@@ -1024,23 +1091,55 @@ def apply_min_chars(min_chars, field_name, txt):
             return txt
     return txt
 
+# (template, id of formatters list) to compiled template
+compiled_templates = {}
+
+def compile_template(template, formatters):
+    '''
+    Split the template into literal strings and Formatter objects of keywords
+    in the template.  Returns a list of the strings and the Formatter objects.
+    '''
+    key = (template, id(formatters))
+    if key in compiled_templates:
+        return compiled_templates[key]
+    keyword_formatters = {f.keyword: f for f in formatters}
+    keywords_pattern = re.compile('(%s)' % '|'.join(
+        re.escape(k) for k in sorted(keyword_formatters, key=len,
+                                     reverse=True)))
+    segments = []
+    for idx, segment in enumerate(keywords_pattern.split(template)):
+        # odd-indexed segments are the matched keywords
+        if idx % 2 == 1:
+            segments.append(keyword_formatters[segment])
+        elif segment != '':
+            segments.append(segment.replace('\\n', '\n'))
+    compiled_templates[key] = segments
+    return segments
+
 def format_output(template, formatters, fmt, record, snapshot=None,
                   region=None, index=None):
     if template == '':
         return
-    for formatter in formatters:
-        if template.find(formatter.keyword) == -1:
+    txts = []
+    formatted = {}
+    for segment in compile_template(template, formatters):
+        if type(segment) is str:
+            txts.append(segment)
+            continue
+        formatter = segment
+        if formatter.keyword in formatted:
+            txts.append(formatted[formatter.keyword])
             continue
-        if formatters == record_formatters:
+        if formatters is record_formatters:
             txt = formatter.format_fn(record, fmt)
-        elif formatters == snapshot_formatters:
+        elif formatters is snapshot_formatters:
             txt = formatter.format_fn(snapshot, record, fmt)
-        elif formatters == region_formatters:
+        elif formatters is region_formatters:
             txt = formatter.format_fn(index, region, snapshot, record, fmt)
         txt = apply_min_chars(fmt.min_chars_for, formatter.keyword, txt)
-        template = template.replace(formatter.keyword, txt)
-    template = template.replace('\\n', '\n')
-    return template
+        formatted[formatter.keyword] = txt
+        txts.append(txt)
+    return ''.join(txts)
 
 
 def temperature_of(region, weights):
@@ -1074,7 +1173,7 @@ def sorted_regions(regions, sort_fields, sort_dsc_keys, temperature_weights):
                     key=lambda r: temperature_of(r, temperature_weights))
     return regions
 
-def fmt_records(fmt, records):
+def fmt_records_outputs(fmt, records):
     sorted_access_patterns = SortedAccessPatterns(records)
     fmt.region_box_format = RegionBoxFormat(sorted_access_patterns,
             RegionBoxAttr(fmt.region_box_values[0],
@@ -1087,40 +1186,45 @@ def fmt_records(fmt, records):
                 fmt.region_box_min_max_height,
                 fmt.region_box_scales[2] == 'log'))
 
-    outputs = []
     for record in records:
-        outputs.append(
-                format_output(
-                    fmt.format_record_head, record_formatters, fmt, record))
+        yield format_output(
+                fmt.format_record_head, record_formatters, fmt, record)
         snapshots = record.snapshots
 
         for sidx, snapshot in enumerate(snapshots):
-            outputs.append(
-                    format_output(
-                        fmt.format_snapshot_head, snapshot_formatters,
-                        fmt, record, snapshot))
+            yield format_output(
+                    fmt.format_snapshot_head, snapshot_formatters, fmt, record,
+                    snapshot)
             for r in snapshot.regions:
                 r.nr_accesses.add_unset_unit(record.intervals)
                 r.age.add_unset_unit(record.intervals)
-            for idx, r in enumerate(
-                    sorted_regions(snapshot.regions, fmt.sort_regions_by,
-                        fmt.sort_regions_dsc, fmt.temperature_weights)):
-                outputs.append(
-                        format_output(
-                            fmt.format_region, region_formatters,
-                            fmt, record, snapshot, r, idx))
-            outputs.append(
-                    format_output(
-                        fmt.format_snapshot_tail, snapshot_formatters,
-                        fmt, record, snapshot))
+            if fmt.format_region != '':
+                for idx, r in enumerate(
+                        sorted_regions(snapshot.regions, fmt.sort_regions_by,
+                            fmt.sort_regions_dsc, fmt.temperature_weights)):
+                    yield format_output(
+                            fmt.format_region, region_formatters, fmt,
+                            record, snapshot, r, idx)
+            yield format_output(
+                    fmt.format_snapshot_tail, snapshot_formatters, fmt,
+                    record, snapshot)
 
             if sidx < len(snapshots) - 1 and not fmt.total_sz_only():
-                outputs.append('')
-        outputs.append(
-                format_output(
-                    fmt.format_record_tail, record_formatters, fmt, record))
-    outputs = [o for o in outputs if o is not None]
-    return '\n'.join(outputs)
+                yield ''
+        yield format_output(
+                fmt.format_record_tail, record_formatters, fmt, record)
+
+def fmt_records_lines(fmt, records):
+    '''
+    Yield formatted output of the records in pieces, which should be joined
+    with newlines.
+    '''
+    for output in fmt_records_outputs(fmt, records):
+        if output is not None:
+            yield output
+
+def fmt_records(fmt, records):
+    return '\n'.join(fmt_records_lines(fmt, records))
 
 def pr_records_raw_form(records, raw_number):
     lines = []
@@ -1167,11 +1271,11 @@ def pr_records(fmt, records, dont_use_pager):
     elif fmt.raw:
         pr_records_raw_form(records, fmt.raw_number)
     else:
-        to_show = fmt_records(fmt, records)
+        lines = fmt_records_lines(fmt, records)
         if dont_use_pager:
-            print(to_show)
+            _damo_print.pr_lines(lines)
         else:
-            _damo_print.pr_with_pager_if_needed(fmt_records(fmt, records))
+            _damo_print.pr_lines_with_pager_if_needed(lines)
 
 class ReportFormat:
     sort_regions_by = None
@@ -1802,8 +1906,23 @@ def read_and_show(args):
         exit(1)
 
     signal.signal(signal.SIGINT, sighandler)
-    global signal_received
 
+    sticky_snapshot = args.input_file is None and repeat_count != 1
+    if sticky_snapshot:
+        # keep the snapshot scheme installed across the repeats
+        signal.signal(signal.SIGTERM, sighandler)
+        _damo_records.start_snapshot_sessions()
+    try:
+        read_show_repeat(args, dfilters, record_filter, repeat_delay,
+                         repeat_count)
+    finally:
+        if sticky_snapshot:
+            err = _damo_records.stop_snapshot_sessions()
+            if err is not None:
+                print('snapshot sessions stop failed (%s)' % err)
+
+def read_show_repeat(args, dfilters, record_filter, repeat_delay,
+                     repeat_count):
     read_show_count = 0
     while read_show_count < repeat_count or repeat_count == -1:
         if signal_received is True:
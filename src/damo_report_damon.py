@@ -23,7 +23,7 @@ def read_kdamonds_from_file(input_file):
 
 def pr_damon_parameters(input_file, format, raw_nr, omit_defaults):
     if input_file is None:
-        kdamonds = _damon.current_kdamonds()
+        kdamonds = _damon.current_kdamonds(tried_regions_of=[])
     else:
         kdamonds, err = read_kdamonds_from_file(input_file)
         if err is not None:
@@ -52,7 +52,7 @@ def update_pr_schemes_stats(input_file, format, raw_nr, damos_stat_fields):
         if err:
             print(err)
             exit(1)
-        kdamonds = _damon.current_kdamonds()
+        kdamonds = _damon.current_kdamonds(tried_regions_of=[])
     else:
         kdamonds, err = read_kdamonds_from_file(input_file)
         if err is not None:
@@ -98,7 +98,7 @@ def update_pr_schemes_stats(input_file, format, raw_nr, damos_stat_fields):
 
 def pr_kdamonds_summary(input_file, format, raw_nr, show_cpu):
     if input_file is None:
-        kdamonds = _damon.current_kdamonds()
+        kdamonds = _damon.current_kdamonds(tried_regions_of=[])
     else:
         kdamonds, err = read_kdamonds_from_file(input_file)
         if err is None:
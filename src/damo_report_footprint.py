@@ -37,20 +37,16 @@ def get_dists(records, metric, do_sort):
     dists = []
     footprint_snapshots = _damo_records.load_mem_footprint(records)
     for snapshot in footprint_snapshots:
-        footprint_bytes = 0
-        for pid, fp in snapshot.footprints.items():
-            if metric == 'sys_used':
-                if pid is not None:
-                    continue
-                footprint_bytes = (fp.total - fp.free) * 1024
-            # ignore SysMemFootprint
-            if pid is None:
-                continue
-            # todo: get real page size of the system
-            if metric == 'vsz':
-                footprint_bytes += fp.size * 4096
-            elif metric == 'rss':
-                footprint_bytes += fp.resident * 4096
+        # todo: get real page size of the system
+        if metric == 'sys_used':
+            sys_fp = snapshot.sys_footprint
+            footprint_bytes = (sys_fp.total - sys_fp.free) * 1024
+        elif metric == 'vsz':
+            footprint_bytes = sum(snapshot.columns['size']) * 4096
+        elif metric == 'rss':
+            footprint_bytes = sum(snapshot.columns['resident']) * 4096
+        else:
+            footprint_bytes = 0
         dists.append(footprint_bytes)
     if do_sort:
         dists.sort()
@@ -28,23 +28,24 @@ import os
 import subprocess
 import tempfile
 
+try:
+    import numpy
+except ModuleNotFoundError:
+    # numpy is optional.  HeatMap uses lists of lists instead.
+    numpy = None
+
 import _damo_ascii_color
 import _damo_fmt_str
 import _damo_records
-import damo_record_info
 import damo_report_access
-
-class HeatPixel:
-    time = None
-    addr = None
-    heat = None
-
-    def __init__(self, time, addr, heat):
-        self.time = time
-        self.addr = addr
-        self.heat = heat
+import damo_report_record_info
 
 class HeatMap:
+    '''
+    Time x address matrix of heats.  The heats are stored in a numpy array if
+    numpy is available, or in lists of lists otherwise.  Pixels that are never
+    heated have None heat.
+    '''
     time_start = None
     time_unit = None
     time_resol = None
@@ -55,7 +56,10 @@ class HeatMap:
 
     heat_unit = None
 
-    pixels = None # list of list of pixels
+    pixel_times = None  # start time of each row of pixels
+    pixel_addrs = None  # start address of each column of pixels
+    heats = None
+    heated = None   # numpy matrix of whether each pixel is heated
 
     def __init__(self, time_start, time_unit, time_resol, addr_start,
                  addr_unit, addr_resol, heat_unit):
@@ -69,14 +73,15 @@ class HeatMap:
 
         self.heat_unit = heat_unit
 
-        self.pixels = []
-        for i in range(time_resol):
-            self.pixels.append([])
-            for j in range(addr_resol):
-                pixel_time = time_start + i * time_unit
-                pixel_addr = addr_start + j * addr_unit
-                self.pixels[-1].append(
-                        HeatPixel(int(pixel_time), int(pixel_addr), None))
+        self.pixel_times = [int(time_start + i * time_unit)
+                            for i in range(time_resol)]
+        self.pixel_addrs = [int(addr_start + j * addr_unit)
+                            for j in range(addr_resol)]
+        if numpy is not None:
+            self.heats = numpy.zeros((time_resol, addr_resol))
+            self.heated = numpy.zeros((time_resol, addr_resol), dtype=bool)
+        else:
+            self.heats = [[None] * addr_resol for _ in range(time_resol)]
 
     def pixels_idx_of_time(self, time_ns):
         return int((time_ns - self.time_start) / self.time_unit)
@@ -84,40 +89,42 @@ class HeatMap:
     def pixel_idx_of_addr(self, addr):
         return int((addr - self.addr_start) / self.addr_unit)
 
-    def add_pixel_heat(self, pixels_idx, pixel_idx, region, snapshot,
-                       record_intervals, df_passed):
-        pixel = self.pixels[pixels_idx][pixel_idx]
-        observe_start_time = snapshot.start_time
-        if record_intervals is not None:
-            observe_start_time -= region.age.aggr_intervals * \
-                    record_intervals.aggr * 1000
-
-        account_time_start = max(observe_start_time, pixel.time)
-        account_time_end = min(snapshot.end_time, pixel.time + self.time_unit)
-        account_time = account_time_end - account_time_start
-
-        account_addr_start = max(region.start, pixel.addr)
-        account_addr_end = min(region.end, pixel.addr + self.addr_unit)
-        account_sz = account_addr_end - account_addr_start
-
-        if record_intervals is not None:
-            aggr_us = damo_report_access.snapshot_monitoring_intervals(
-                    snapshot, record_intervals)[1]
-            heat_val = region.nr_accesses.in_hz(aggr_us)
-        else:
-            heat_val = region.nr_accesses.samples
-        if df_passed:
-            heat_val = heat_val * region.sz_filter_passed / region.size()
-
-        heat = heat_val * account_time * account_sz
-
-        if pixel.heat is None:
-            pixel.heat = 0
-
+    def add_pixels_heats(self, rows, cols, heat_val, account_times,
+                         account_szs):
+        '''
+        Add heat of a region to pixels of given rows and columns.  The region
+        has heat_val access frequency for account_times of the rows, and
+        account_szs of the columns.  Each pixel's heat is the average of the
+        heats for the pixel's time and space.
+        '''
         pixel_time_space = self.time_unit * self.addr_unit
 
-        heat += pixel.heat * pixel_time_space
-        pixel.heat = float(heat) / pixel_time_space
+        if numpy is None:
+            for row_idx, account_time in zip(rows, account_times):
+                row = self.heats[row_idx]
+                row_heat_val = heat_val * account_time
+                for col_idx, account_sz in zip(cols, account_szs):
+                    heat = row_heat_val * account_sz
+                    if row[col_idx] is None:
+                        row[col_idx] = 0
+                    heat += row[col_idx] * pixel_time_space
+                    row[col_idx] = float(heat) / pixel_time_space
+            return
+
+        if type(heat_val) is float:
+            heats = numpy.outer(
+                    heat_val * numpy.array([float(t) for t in account_times]),
+                    numpy.array([float(sz) for sz in account_szs]))
+        else:
+            # keep integer products exact, like the non-numpy version
+            heats = numpy.array([[float(heat_val * t * sz)
+                                  for sz in account_szs]
+                                 for t in account_times])
+        pixel_time_space = float(pixel_time_space)
+        pixels = (slice(rows.start, rows.stop), slice(cols.start, cols.stop))
+        self.heats[pixels] = (heats + self.heats[pixels] * pixel_time_space
+                              ) / pixel_time_space
+        self.heated[pixels] = True
 
     def pixels_idxs_range(self, region, snapshot, last_snapshot, aggr_ns):
         start_time = snapshot.start_time
@@ -132,6 +139,8 @@ class HeatMap:
     def add_heat(self, snapshot, last_snapshot, record_intervals, df_passed):
         if record_intervals is not None:
             aggr_ns = record_intervals.aggr * 1000
+            aggr_us = damo_report_access.snapshot_monitoring_intervals(
+                    snapshot, record_intervals)[1]
         else:
             aggr_ns = None
         heatmap_addr_end = self.addr_start + self.addr_unit * self.addr_resol
@@ -139,44 +148,84 @@ class HeatMap:
             if region.end < self.addr_start or heatmap_addr_end < region.start:
                 continue
 
-            for pixels_idx in self.pixels_idxs_range(
-                    region, snapshot, last_snapshot, aggr_ns):
-                if pixels_idx < 0 or self.time_resol <= pixels_idx:
-                    continue
-                for pixel_idx in range(
-                        self.pixel_idx_of_addr(region.start),
-                        self.pixel_idx_of_addr(region.end) + 1):
-                    if pixel_idx < 0 or self.addr_resol <= pixel_idx:
-                        continue
-                    self.add_pixel_heat(
-                            pixels_idx, pixel_idx, region, snapshot,
-                            record_intervals, df_passed)
+            time_range = self.pixels_idxs_range(
+                    region, snapshot, last_snapshot, aggr_ns)
+            rows = range(max(time_range.start, 0),
+                         min(time_range.stop, self.time_resol))
+            cols = range(max(self.pixel_idx_of_addr(region.start), 0),
+                         min(self.pixel_idx_of_addr(region.end) + 1,
+                             self.addr_resol))
+            if len(rows) == 0 or len(cols) == 0:
+                continue
+
+            observe_start_time = snapshot.start_time
+            if record_intervals is not None:
+                observe_start_time -= region.age.aggr_intervals * \
+                        record_intervals.aggr * 1000
+            account_times = []
+            for row_idx in rows:
+                pixel_time = self.pixel_times[row_idx]
+                account_time_start = max(observe_start_time, pixel_time)
+                account_time_end = min(snapshot.end_time,
+                                       pixel_time + self.time_unit)
+                account_times.append(account_time_end - account_time_start)
+            account_szs = []
+            for col_idx in cols:
+                pixel_addr = self.pixel_addrs[col_idx]
+                account_addr_start = max(region.start, pixel_addr)
+                account_addr_end = min(region.end, pixel_addr + self.addr_unit)
+                account_szs.append(account_addr_end - account_addr_start)
+
+            if record_intervals is not None:
+                heat_val = region.nr_accesses.in_hz(aggr_us)
+            else:
+                heat_val = region.nr_accesses.samples
+            if df_passed:
+                heat_val = heat_val * region.sz_filter_passed / region.size()
+
+            self.add_pixels_heats(rows, cols, heat_val, account_times,
+                                  account_szs)
+
+    def heat_rows(self):
+        '''Returns heats as lists of rows of heats'''
+        if numpy is None:
+            return self.heats
+        return [[heat if heated else None
+                 for heat, heated in zip(row, heated_row)]
+                for row, heated_row in zip(self.heats.tolist(),
+                                           self.heated.tolist())]
 
     def highest_lowest_heats(self):
+        if numpy is not None:
+            if not self.heated.any():
+                return None, None
+            heats = self.heats[self.heated]
+            return float(heats.max()), float(heats.min())
+
         highest = None
         lowest = None
-        for row in self.pixels:
-            for pixel in row:
-                if pixel.heat is None:
+        for row in self.heats:
+            for heat in row:
+                if heat is None:
                     continue
-                if highest is None or highest < pixel.heat:
-                    highest = pixel.heat
-                if lowest is None or lowest > pixel.heat:
-                    lowest = pixel.heat
+                if highest is None or highest < heat:
+                    highest = heat
+                if lowest is None or lowest > heat:
+                    lowest = heat
         return highest, lowest
 
     def fmt_gnuplot_str(self, abs_time, abs_addr):
         lines = []
-        for row in self.pixels:
-            for pixel in row:
-                time = pixel.time
-                addr = pixel.addr
+        for pixel_time, row in zip(self.pixel_times, self.heat_rows()):
+            for pixel_addr, heat in zip(self.pixel_addrs, row):
+                time = pixel_time
+                addr = pixel_addr
                 if not abs_time:
                     time -= self.time_start
                 if not abs_addr:
                     addr -= self.addr_start
 
-                heat = pixel.heat if pixel.heat is not None else 'NaN'
+                heat = heat if heat is not None else 'NaN'
                 lines.append('%s\t%s\t%s' % (time, addr, heat))
         return '\n'.join(lines)
 
@@ -187,16 +236,15 @@ class HeatMap:
         if highest_heat is None and lowest_heat is None:
             return lines
         heat_unit = float(highest_heat + 1 - lowest_heat) / 9
-        pixels = self.pixels
-        for snapshot in pixels:
+        for row in self.heat_rows():
             chars = []
-            for pixel in snapshot:
-                if pixel.heat is None:
+            for pixel_heat in row:
+                if pixel_heat is None:
                     chars.append('%s ' %
                                  _damo_ascii_color.color_mode_start_txt(
                                      colorset, 4))
                     continue
-                heat = int(float(pixel.heat - lowest_heat) / heat_unit)
+                heat = int(float(pixel_heat - lowest_heat) / heat_unit)
                 heat = min(heat, _damo_ascii_color.max_color_level())
                 chars.append('%s%d' %
                         (_damo_ascii_color.color_mode_start_txt(colorset, heat),
@@ -229,12 +277,11 @@ class HeatMap:
             _damo_fmt_str.format_time_ns(time_start, False),
             _damo_fmt_str.format_time_ns(time_end, False),
             _damo_fmt_str.format_time_ns(time_len, False)))
-        pixels = self.pixels
         lines.append('# resolution: %dx%d (%s and %s for each character)' % (
-            len(pixels[1]), len(pixels),
-            _damo_fmt_str.format_sz(float(addr_len) / len(pixels[1]), False),
+            self.addr_resol, self.time_resol,
+            _damo_fmt_str.format_sz(float(addr_len) / self.addr_resol, False),
             _damo_fmt_str.format_time_ns(
-                float(time_len) / len(pixels), False)))
+                float(time_len) / self.time_resol, False)))
         return lines
 
     def fmt_ascii_str(self, colorset, print_colorset):
@@ -351,12 +398,16 @@ def complete_address_range(user_input, draw_range, guide):
             address_ranges.append(ar)
         return address_ranges, None
 
-def complete_src_args(args, records):
+def complete_src_args(args, records, record_file=None):
     if (args.kdamond_idx is not None and args.context_idx is not None and
         args.scheme_idx is not None and args.tid is not None and
         args.time_range is not None and args.address_range is not None):
         return None
-    guides = damo_record_info.get_guide_info(records)
+    if record_file is None:
+        guides = _damo_records.get_guide_info(records)
+    else:
+        guides = damo_report_record_info.get_guide_info_of_file(
+                record_file, records)
     guide = guides[0]
     if args.kdamond_idx is None:
         args.kdamond_idx = guide.kdamond_idx
@@ -650,13 +701,14 @@ def main(args):
             args.resol = [500, 500]
 
     if args.guide:
-        damo_record_info.pr_guide(records)
+        damo_report_record_info.pr_guide(records, record_file=args.input)
         return
     if args.guide_human is True:
-        damo_record_info.pr_guide(records, raw_numbers=False)
+        damo_report_record_info.pr_guide(records, raw_numbers=False,
+                                         record_file=args.input)
         return
 
-    err = complete_src_args(args, records)
+    err = complete_src_args(args, records, args.input)
     if err is not None:
         print('source arguments completion fail (%s)' % err)
         exit(1)
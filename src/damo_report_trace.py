@@ -1,6 +1,8 @@
 # SPDX-License-Identifier: GPL-2.0
 
 import datetime
+import json
+import os
 import signal
 import subprocess
 
@@ -40,33 +42,42 @@ def read_trace_cmd_record(record_file):
         return None, '%s' % e
     return trace_text, None
 
-def read_damo_report_trace_output(output_file):
+def read_damo_report_trace_output_header(output_file):
     try:
         with open(output_file, 'r') as f:
-            text = f.read()
+            header_lines = [f.readline().strip() for i in range(3)]
     except Exception as e:
-        return None, None, '%s' % e
-    lines = text.strip().split('\n')
-    if len(lines) < 3:
-        return None, None, 'no header'
-    header_lines = lines[:3]
+        return None, '%s' % e
+    if header_lines[2] == '':
+        return None, 'no header'
     version_fields = header_lines[0].split()
     if len(version_fields) != 2:
-        return None, None, 'wrong number of version header field (%d)' % (
+        return None, 'wrong number of version header field (%d)' % (
                 len(version_fields))
     if version_fields[0] != 'damo_report_trace_output_format_version:':
-        return None, None, 'unexpected version header field (%s)' % (
+        return None, 'unexpected version header field (%s)' % (
                 version_fields[0])
     tracer_fields = header_lines[2].split()
     if len(tracer_fields) != 2:
-        return None, None, 'Wrong number of trace header field (%d)' % (
+        return None, 'Wrong number of trace header field (%d)' % (
                 len(tracer_fields))
     name, val = tracer_fields
     if name != 'damo_report_trace_output_tracer:':
-        return None, None, 'Wrong tracer field name (%d)' % name
+        return None, 'Wrong tracer field name (%s)' % name
     if not val in ['perf', 'trace-cmd']:
-        return None, None, 'Unsupported tracer (%d)' % val
-    return text, val, None
+        return None, 'Unsupported tracer (%s)' % val
+    return val, None
+
+def read_damo_report_trace_output(output_file):
+    tracer, err = read_damo_report_trace_output_header(output_file)
+    if err is not None:
+        return None, None, err
+    try:
+        with open(output_file, 'r') as f:
+            text = f.read()
+    except Exception as e:
+        return None, None, '%s' % e
+    return text, tracer, None
 
 def read_trace_record(record_file):
     '''
@@ -88,6 +99,164 @@ def read_trace_record(record_file):
             record_file, perf_err, trace_cmd_err, text_err)
     return None, None, err
 
+trace_index_version = 1
+trace_index_bucket_sec = 1
+
+def trace_text_file_path(record_file):
+    return '%s.trace_text' % record_file
+
+def trace_index_file_path(record_file):
+    return '%s.trace_index' % record_file
+
+def decode_trace_record(record_file):
+    '''
+    Same to read_trace_record(), but write the decoded text to a file rather
+    than returning it.  Returns the tracer, the path to the text file, and an
+    error.  For 'damo report trace --output <file>' outputs, the text file is
+    the record file itself.
+    '''
+    text_file = trace_text_file_path(record_file)
+    errs = []
+    for tracer, cmd in [
+            ['perf', ['perf', 'script', '--force', '-i', record_file]],
+            ['trace-cmd', ['trace-cmd', 'report', '-i', record_file]]]:
+        try:
+            with open(text_file, 'w') as f:
+                subprocess.check_call(cmd, stdout=f)
+            return tracer, text_file, None
+        except Exception as e:
+            errs.append('%s' % e)
+    if os.path.isfile(text_file):
+        os.remove(text_file)
+    tracer, text_err = read_damo_report_trace_output_header(record_file)
+    if text_err is None:
+        return tracer, record_file, None
+    err = 'cannot parse %s via perf (%s), trace-cmd (%s), file read (%s)' % (
+            record_file, errs[0], errs[1], text_err)
+    return None, None, err
+
+def tracer_to_cmd(tracer):
+    if tracer == 'perf':
+        return 'perf-script'
+    return 'trace-cmd-report'
+
+def build_trace_index(text_file, tracer):
+    '''
+    Returns buckets of the trace lines in the text file and indices of the
+    buckets having each event.  Each bucket is [first timestamp, last
+    timestamp, start offset, end offset] of contiguous lines having timestamps
+    in a same trace_index_bucket_sec-long time window.
+    '''
+    cmd = tracer_to_cmd(tracer)
+    buckets = []
+    events = {}
+    bucket_key = None
+    offset = 0
+    with open(text_file, 'rb') as f:
+        for line in f:
+            line_offset = offset
+            offset += len(line)
+            timestamp, proc, event, trace_fields = parse_trace_line(
+                    line.decode(), cmd)
+            if trace_fields is None:
+                continue
+            try:
+                time = float(timestamp)
+            except ValueError:
+                continue
+            key = int(time // trace_index_bucket_sec)
+            if key != bucket_key:
+                bucket_key = key
+                buckets.append([time, time, line_offset, offset])
+            else:
+                bucket = buckets[-1]
+                bucket[0] = min(bucket[0], time)
+                bucket[1] = max(bucket[1], time)
+                bucket[3] = offset
+            bucket_idxs = events.setdefault(event, [])
+            if len(bucket_idxs) == 0 or bucket_idxs[-1] != len(buckets) - 1:
+                bucket_idxs.append(len(buckets) - 1)
+    return buckets, events
+
+def trace_index_valid(index, record_file):
+    if index.get('version') != trace_index_version:
+        return False
+    stat = os.stat(record_file)
+    if (index['record_size'] != stat.st_size or
+            index['record_mtime_ns'] != stat.st_mtime_ns):
+        return False
+    text_file = trace_index_text_file(index, record_file)
+    return (os.path.isfile(text_file) and
+            os.path.getsize(text_file) == index['text_size'])
+
+def trace_index_text_file(index, record_file):
+    if index['text_is_record']:
+        return record_file
+    return trace_text_file_path(record_file)
+
+def get_trace_index(record_file):
+    '''
+    Returns the index of the trace record file, and an error.  The index and
+    the decoded text of the record are made and saved next to the record file
+    on the first call, and reused until the record file is changed.
+    '''
+    if not os.path.isfile(record_file):
+        return None, '%s not found' % record_file
+    index_file = trace_index_file_path(record_file)
+    if os.path.isfile(index_file):
+        try:
+            with open(index_file, 'r') as f:
+                index = json.load(f)
+            if trace_index_valid(index, record_file):
+                return index, None
+        except Exception:
+            pass
+
+    tracer, text_file, err = decode_trace_record(record_file)
+    if err is not None:
+        return None, err
+    try:
+        buckets, events = build_trace_index(text_file, tracer)
+    except Exception as e:
+        return None, 'indexing %s failed (%s)' % (text_file, e)
+    stat = os.stat(record_file)
+    index = {
+            'version': trace_index_version,
+            'tracer': tracer,
+            'record_size': stat.st_size,
+            'record_mtime_ns': stat.st_mtime_ns,
+            'text_is_record': text_file == record_file,
+            'text_size': os.path.getsize(text_file),
+            'bucket_sec': trace_index_bucket_sec,
+            'buckets': buckets,
+            'events': events,
+            }
+    try:
+        with open(index_file, 'w') as f:
+            json.dump(index, f)
+    except Exception:
+        # the index can still be used for this run
+        pass
+    return index, None
+
+def indexed_trace_lines(index, record_file, events, time_range):
+    '''
+    Yield lines of the indexed trace text that could have the events in the
+    time range, by reading only the buckets of the lines.
+    '''
+    bucket_idxs = set()
+    for event in events:
+        bucket_idxs.update(index['events'].get(event, []))
+    with open(trace_index_text_file(index, record_file), 'rb') as f:
+        for bucket_idx in sorted(bucket_idxs):
+            first_time, last_time, start, end = index['buckets'][bucket_idx]
+            if time_range is not None and (
+                    last_time < time_range[0] or first_time >= time_range[1]):
+                continue
+            f.seek(start)
+            for line in f.read(end - start).decode().split('\n'):
+                yield line
+
 damon_trace_events = _damo_sysinfo.tracepoint_to_feature_name_map.keys()
 
 def get_events_to_show(to_show, to_hide):
@@ -316,25 +485,47 @@ def pr_trace(timestamp, proc, event, trace_fields, max_cols):
         trace_text = ' '.join(trace_fields)
     pr_wrapped(' '.join([timestamp, proc, event, trace_text]), max_cols)
 
-def report_recorded_trace(args):
-    trace_text, tracer, err = read_trace_record(args.input)
-    if err is not None:
-        print(err)
-        return -1
+def in_time_range(timestamp, time_range):
+    if time_range is None:
+        return True
+    try:
+        time = float(timestamp)
+    except ValueError:
+        return False
+    return time_range[0] <= time and time < time_range[1]
 
+def report_recorded_trace(args):
     events = get_events_to_show(args.event, args.no_event)
-
-    if tracer == 'perf':
-        cmd = 'perf-script'
+    if args.time_range is None:
+        time_range = None
     else:
-        cmd = 'trace-cmd-report'
+        time_range = [_damo_fmt_str.text_to_sec(x) for x in args.time_range]
+
+    if os.access(os.path.dirname(os.path.abspath(args.input)), os.W_OK):
+        index, err = get_trace_index(args.input)
+        if err is not None:
+            print(err)
+            return -1
+        tracer = index['tracer']
+        lines = indexed_trace_lines(index, args.input, events, time_range)
+    else:
+        # the index cannot be saved.  Decode the whole record in memory.
+        trace_text, tracer, err = read_trace_record(args.input)
+        if err is not None:
+            print(err)
+            return -1
+        lines = trace_text.strip().split('\n')
+
+    cmd = tracer_to_cmd(tracer)
 
-    for line in trace_text.strip().split('\n'):
+    for line in lines:
         timestamp, proc, event, trace_fields = parse_trace_line(line, cmd)
         if trace_fields is None:
             continue
         if not event in events:
             continue
+        if not in_time_range(timestamp, time_range):
+            continue
         if args.raw:
             print(line)
         pr_trace(timestamp, proc, event, trace_fields, args.max_cols)
@@ -418,6 +609,10 @@ def set_argparser(parser):
                         help='tracer command to use')
     parser.add_argument('--input', '-i', metavar='<file>',
                         help='trace record file')
+    parser.add_argument('--time_range', metavar='<seconds>', nargs=2,
+                        help=' '.join([
+                            'start and end timestamps of the events to show',
+                            'from the trace record file']))
     parser.add_argument('--output', '-o', metavar='<file>',
                         help='save output to a file')
     parser.add_argument('--raw', action='store_true',
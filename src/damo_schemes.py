@@ -50,7 +50,7 @@ def main(args):
     if _damon_args.self_started_target(args):
         os.waitpid(kdamonds[0].contexts[0].targets[0].pid, 0)
     # damon will turn it off by itself if the target tasks are terminated.
-    _damon.wait_kdamonds_turned_off()
+    _damon.wait_kdamonds_turned_off(timeout=None)
 
     cleanup_exit(0)
 
@@ -14,7 +14,7 @@ import _damon_args
 import _damon_modules
 
 def handle_modules():
-    sysinfo = _damo_sysinfo.get_sysinfo_or_panic()
+    sysinfo = _damo_sysinfo.get_sysinfo_or_panic(areas=[])
     for module in os.listdir(os.path.join(sysinfo.sysfs_path, 'module')):
         if not module.startswith('damon_'):
             continue
@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: GPL-2.0
 
 import os
+import shutil
 import subprocess
 
 __version__ = '3.3.0'
@@ -12,11 +13,7 @@ def get_release_version():
 # src/ directory cannot be imported.  Otherwise, packaging/build.sh fails.
 # Implement avail_cmd() here.
 def avail_cmd(cmd):
-    try:
-        subprocess.check_output(['which', cmd], stderr=subprocess.DEVNULL)
-        return True
-    except:
-        return False
+    return shutil.which(cmd) is not None
 
 def get_real_version():
     src_dir = os.path.dirname(os.path.abspath(__file__))
@@ -36,6 +36,24 @@ def get_wss_dists(records, acc_thres, sz_thres, do_sort, collapse_targets):
         wss_dists = {0: collapsed_dist}
     return wss_dists
 
+def fmt_wss_dists(args, records):
+    '''
+    Adjust the records and format the working set size distributions of those
+    for the arguments, in the text form
+    '''
+    percentiles = range(args.range[0], args.range[1], args.range[2])
+    wss_sort = args.sortby != 'time'
+    _damo_records.adjust_records(records, args.work_time, args.exclude_samples)
+    wss_dists = get_wss_dists(records, args.acc_thres, args.sz_thres, wss_sort,
+                              args.collapse_targets)
+    lines = []
+    for tid, dists in wss_dists.items():
+        lines.append('# target_id\t%s' % tid)
+        lines.append(_damo_dist.fmt_dists(
+            'wss', dists, percentiles, args.all_wss, _damo_fmt_str.format_sz,
+            args.raw_number, args.nr_cols_bar))
+    return '\n'.join(lines)
+
 def set_argparser(parser):
     parser.add_argument('--input', '-i', type=str, metavar='<file>',
             default='damon.data', help='input file name')
@@ -78,7 +96,6 @@ def main(args):
     wss_sort = True
     if args.sortby == 'time':
         wss_sort = False
-    raw_number = args.raw_number
 
     records, err = _damo_records.get_records(record_file=file_path)
     if err != None:
@@ -86,18 +103,16 @@ def main(args):
                 (file_path, err))
         exit(1)
 
+    if not args.plot:
+        output = fmt_wss_dists(args, records)
+        if output != '':
+            print(output)
+        return
+
     _damo_records.adjust_records(records, args.work_time, args.exclude_samples)
     wss_dists = get_wss_dists(records, args.acc_thres, args.sz_thres, wss_sort,
                               args.collapse_targets)
 
-    if not args.plot:
-        for tid, dists in wss_dists.items():
-            print('# target_id\t%s' % tid)
-            _damo_dist.pr_dists(
-                    'wss', dists, percentiles, args.all_wss,
-                    _damo_fmt_str.format_sz, raw_number, args.nr_cols_bar)
-        return
-
     tmp_path = tempfile.mkstemp()[1]
     with open(tmp_path, 'w') as f:
         for tid, dists in wss_dists.items():
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+'''
+Compare speed of _damo_records.aggregate_snapshots() with the previous,
+linear search based implementation, using synthetic records.
+'''
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+bindir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(bindir, '..', '..', 'src'))
+
+import _damo_records
+import _damon
+
+def legacy_add_region(regions, region, nr_acc_to_add):
+    for r in regions:
+        if not _damo_records.regions_intersect(r, region):
+            continue
+        if not r in nr_acc_to_add:
+            nr_acc_to_add[r] = 0
+        nr_acc_to_add[r] = max(nr_acc_to_add[r],
+                region.nr_accesses.samples)
+
+        new_regions = []
+        if region.start < r.start:
+            new_regions.append(_damon.DamonRegion(
+                region.start, r.start,
+                region.nr_accesses.samples, _damon.unit_samples,
+                region.age.aggr_intervals, _damon.unit_aggr_intervals,
+                _damo_records.sz_filter_passed_for_new_size(
+                    region, r.start - region.start)))
+        if r.end < region.end:
+            new_regions.append(_damon.DamonRegion(
+                    r.end, region.end,
+                    region.nr_accesses.samples, _damon.unit_samples,
+                    region.age.aggr_intervals,
+                    _damon.unit_aggr_intervals,
+                    _damo_records.sz_filter_passed_for_new_size(
+                        region, region.end - r.end)))
+
+        for new_r in new_regions:
+            legacy_add_region(regions, new_r, nr_acc_to_add)
+        return
+    regions.append(region)
+
+def legacy_aggregate_snapshots(snapshots):
+    new_regions = []
+    for snapshot in snapshots:
+        nr_acc_to_add = {}
+        for region in snapshot.regions:
+            legacy_add_region(new_regions, region, nr_acc_to_add)
+        for region in nr_acc_to_add:
+            region.nr_accesses.samples += nr_acc_to_add[region]
+
+    return _damo_records.DamonSnapshot(snapshots[0].start_time,
+            snapshots[-1].end_time, new_regions, None)
+
+def synthetic_snapshots(nr_snapshots, nr_regions, space_sz):
+    snapshots = []
+    for idx in range(nr_snapshots):
+        boundaries = sorted(random.sample(range(1, space_sz), nr_regions - 1))
+        boundaries = [0] + boundaries + [space_sz]
+        regions = [_damon.DamonRegion(
+            boundaries[i], boundaries[i + 1], random.randint(0, 20),
+            _damon.unit_samples, random.randint(0, 100),
+            _damon.unit_aggr_intervals) for i in range(nr_regions)]
+        snapshots.append(_damo_records.DamonSnapshot(
+            idx * 100, (idx + 1) * 100, regions, None))
+    return snapshots
+
+def region_values(snapshot):
+    return [(r.start, r.end, r.nr_accesses.samples, r.age.aggr_intervals)
+            for r in snapshot.regions]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nr_snapshots', type=int, default=10,
+                        help='number of snapshots to aggregate')
+    parser.add_argument('--nr_regions', type=int, nargs='+',
+                        default=[100, 500, 1000, 2000],
+                        help='number of regions per snapshot')
+    parser.add_argument('--skip_legacy_over', type=int, default=2000,
+                        help='skip legacy implementation for more regions')
+    args = parser.parse_args()
+
+    random.seed(42)
+    print('nr_regions legacy_sec new_sec speedup')
+    for nr_regions in args.nr_regions:
+        snapshots = synthetic_snapshots(
+                args.nr_snapshots, nr_regions, nr_regions * 4096 * 16)
+        legacy_input = copy.deepcopy(snapshots)
+
+        start = time.time()
+        aggregated = _damo_records.aggregate_snapshots(snapshots)
+        new_sec = time.time() - start
+
+        if nr_regions > args.skip_legacy_over:
+            print('%d - %.3f -' % (nr_regions, new_sec))
+            continue
+
+        start = time.time()
+        legacy_aggregated = legacy_aggregate_snapshots(legacy_input)
+        legacy_sec = time.time() - start
+
+        if region_values(aggregated) != region_values(legacy_aggregated):
+            print('results are different for %d regions' % nr_regions)
+            exit(1)
+        print('%d %.3f %.3f %.1fx' % (nr_regions, legacy_sec, new_sec,
+                                      legacy_sec / new_sec))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+'''
+Measure startup time of damo for each subcommand, by running the subcommand
+with '--help' option, which makes damo exit right after its argument parsing.
+'''
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+bindir = os.path.dirname(os.path.realpath(__file__))
+damo_path = os.path.join(bindir, '..', '..', 'damo')
+sys.path.insert(0, os.path.join(bindir, '..', '..', 'src'))
+
+import damo
+import damo_report
+
+def default_cmds():
+    cmds = [[]]
+    for subcmd in damo.subcmds:
+        cmds.append([subcmd.name])
+        if subcmd.name == 'report':
+            for report_subcmd in damo_report.subcmds:
+                cmds.append([subcmd.name, report_subcmd.name])
+    return cmds
+
+def startup_secs(cmd, nr_runs):
+    secs = []
+    for i in range(nr_runs):
+        start = time.time()
+        subprocess.run([damo_path] + cmd + ['--help'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        secs.append(time.time() - start)
+    return secs
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cmds', nargs='+', metavar='<command>',
+                        help='commands to measure, e.g., "report damon"')
+    parser.add_argument('--nr_runs', type=int, default=10,
+                        help='number of runs for each command')
+    args = parser.parse_args()
+
+    if args.cmds is None:
+        cmds = default_cmds()
+    else:
+        cmds = [cmd.split() for cmd in args.cmds]
+
+    print('command median_sec min_sec')
+    for cmd in cmds:
+        secs = startup_secs(cmd, args.nr_runs)
+        print('"%s" %.3f %.3f' % (' '.join(['damo'] + cmd),
+                                  statistics.median(secs), min(secs)))
+
+if __name__ == '__main__':
+    main()
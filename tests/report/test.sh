@@ -44,6 +44,12 @@ test_report "$damo_report_raw damon.data" "raw"
 
 test_report "$damo_report_raw damon.data.json_compressed" "raw"
 
+test_report \
+	"$damo convert_record_format --record_file damon.data \
+	--format columnar --output_file damon.columnar.data && \
+	$damo_report_raw damon.columnar.data" \
+	"raw"
+
 test_report \
 	"$damo_report_raw perf.data.script" \
 	"raw_perf_script"
@@ -69,6 +75,6 @@ test_report "$damo report heatmap --guide" "heats_guide"
 
 test_report "$damo report heatmap --output raw" "heats"
 
-rm -fr results damon.adjusted.data
+rm -fr results damon.adjusted.data damon.columnar.data damon.data.guide
 
 echo "PASS" "$(basename "$(pwd)")"
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import os
+import tempfile
+import threading
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_records
+import _damon
+import damo_daemon
+
+class TestDamoDaemon(unittest.TestCase):
+    def test_coalescer(self):
+        nr_updates = [0]
+        first_update_started = threading.Event()
+        all_waiting = threading.Event()
+        def update():
+            nr_updates[0] += 1
+            if nr_updates[0] == 1:
+                first_update_started.set()
+                # hold the first run until all other callers are waiting
+                self.assertTrue(all_waiting.wait(timeout=10))
+            return nr_updates[0]
+
+        nr_waits = [0]
+        class WaitCountingCondition(threading.Condition):
+            def wait(self, timeout=None):
+                nr_waits[0] += 1
+                if nr_waits[0] == 7:
+                    all_waiting.set()
+                return super().wait(timeout)
+
+        coalescer = damo_daemon.Coalescer(update)
+        coalescer.cond = WaitCountingCondition()
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(coalescer.get()))
+                   for i in range(8)]
+        threads[0].start()
+        self.assertTrue(first_update_started.wait(timeout=10))
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # the first call runs the update, and the others share the second run
+        self.assertEqual(nr_updates[0], 2)
+        self.assertEqual(sorted(results), [1] + [2] * 7)
+        self.assertEqual(coalescer.get(), 3)
+
+    def test_serve_requests(self):
+        class FakeDaemon(damo_daemon.Daemon):
+            def update_snapshot_records(self, total_sz_only, merge_regions):
+                record = _damo_records.DamonRecord(
+                        0, 0, None, 0, None, None)
+                record.snapshots.append(_damo_records.DamonSnapshot(
+                    0, 100, [_damon.DamonRegion(
+                        4096 * i, 4096 * (i + 1), nr_accesses=i,
+                        nr_accesses_unit=_damon.unit_samples, age=0,
+                        age_unit=_damon.unit_aggr_intervals)
+                             for i in range(4)], None))
+                return [record], None
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            socket_path = os.path.join(tmpdir, 'damo.sock')
+            server = damo_daemon.Server(
+                    socket_path, damo_daemon.RequestHandler)
+            server.damo_daemon = FakeDaemon()
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+
+            response, err = damo_daemon.request(
+                    socket_path, {'cmd': 'snapshot'})
+            self.assertIsNone(err)
+            self.assertIsNone(response['err'])
+            regions = response['records'][0]['snapshots'][0]['regions']
+            self.assertEqual(len(regions), 4)
+
+            response, err = damo_daemon.request(
+                    socket_path, {'cmd': 'snapshot',
+                                  'address_ranges': [[4096, 8192]]})
+            regions = response['records'][0]['snapshots'][0]['regions']
+            self.assertEqual(len(regions), 1)
+
+            response, err = damo_daemon.request(socket_path, {'cmd': 'foo'})
+            self.assertIsNone(err)
+            self.assertIsNotNone(response['err'])
+
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+if __name__ == '__main__':
+    unittest.main()
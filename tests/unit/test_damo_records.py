@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
 # SPDX-License-Identifier: GPL-2.0
 
+import collections
+import copy
+import json
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
 import unittest
 
 import _test_damo_common
@@ -98,6 +108,306 @@ class TestDamon(unittest.TestCase):
         self.assertEqual(len(records), 1)
         self.assertEqual(len(records[0].snapshots), 1)
 
+    def test_columnar_format(self):
+        record = _damo_records.DamonRecord(
+                0, 0, _damon.DamonIntervals(5000, 100000, 1000000), 0, None,
+                [])
+        record.snapshots = [
+                _damo_records.DamonSnapshot(100, 200, [
+                    _damon.DamonRegion(10, 20, 3, _damon.unit_samples, 5,
+                                       _damon.unit_aggr_intervals),
+                    _damon.DamonRegion(20, 40, 0, _damon.unit_samples, 2,
+                                       _damon.unit_aggr_intervals,
+                                       sz_filter_passed=7,
+                                       probe_hits=[1, 2])], None),
+                _damo_records.DamonSnapshot(200, 300, [
+                    _damon.DamonRegion(10, 40, 1, _damon.unit_samples, 0,
+                                       _damon.unit_aggr_intervals)], None,
+                    damos_stats=_damon.DamosStats(nr_tried=1, sz_tried=30),
+                    sample_interval_us=5000)]
+        file_path = 'test_columnar_format.data'
+        record_kvpairs = record.to_kvpairs(raw=True)
+        _damo_records.write_damon_records(
+                [record], file_path, _damo_records.file_type_columnar)
+        # writing shouldn't change the records
+        self.assertEqual(record.to_kvpairs(raw=True), record_kvpairs)
+        records, err = _damo_records.parse_records_file(file_path)
+        os.remove(file_path)
+        self.assertIsNone(err)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].intervals, record.intervals)
+        snapshots = records[0].snapshots
+        self.assertEqual(len(snapshots), 2)
+        self.assertEqual(list(snapshots[0].region_column('end')), [20, 40])
+        for snapshot, expected in zip(snapshots, record.snapshots):
+            self.assertEqual(snapshot.start_time, expected.start_time)
+            self.assertEqual(snapshot.end_time, expected.end_time)
+            self.assertEqual(snapshot.total_bytes,
+                             sum([r.size() for r in expected.regions]))
+            self.assertEqual(snapshot.regions, expected.regions)
+        self.assertEqual(snapshots[1].damos_stats.sz_tried, 30)
+        self.assertEqual(snapshots[1].sample_interval_us, 5000)
+
+    def test_columnar_column(self):
+        buf = memoryview(struct.pack('<3q', 1, -2, 1 << 40))
+        self.assertEqual(
+                list(_damo_records.columnar_column(buf, 'q', 'little')),
+                [1, -2, 1 << 40])
+        # the column of big endian hosts is byte-swapped from the native
+        # representation.  Feed it in big endian to test on this host.
+        buf = memoryview(struct.pack('>3q', 1, -2, 1 << 40))
+        if sys.byteorder == 'little':
+            self.assertEqual(
+                    list(_damo_records.columnar_column(buf, 'q', 'big')),
+                    [1, -2, 1 << 40])
+
+    def test_compact_json_regions(self):
+        record = _damo_records.DamonRecord(
+                0, 0, _damon.DamonIntervals(5000, 100000, 1000000), 0, None,
+                [])
+        record.snapshots = [
+                _damo_records.DamonSnapshot(100, 200, [
+                    _damon.DamonRegion(10, 20, 3, _damon.unit_samples, 5,
+                                       _damon.unit_aggr_intervals),
+                    _damon.DamonRegion(20, 40, 0, _damon.unit_samples, 2,
+                                       _damon.unit_aggr_intervals,
+                                       sz_filter_passed=7)], None),
+                _damo_records.DamonSnapshot(200, 300, [
+                    _damon.DamonRegion(10, 40, 1, _damon.unit_samples, 0,
+                                       _damon.unit_aggr_intervals,
+                                       probe_hits=[1, 2])], None)]
+        records = _damo_records.parse_json(json.dumps(
+            [record.to_kvpairs(raw=True)]))
+        snapshots = records[0].snapshots
+        self.assertEqual(type(snapshots[0]), _damo_records.ColumnarSnapshot)
+        self.assertEqual(list(snapshots[0].region_column('start')), [10, 20])
+        # regions having probe hits are not stored in the columns
+        self.assertEqual(type(snapshots[1]), _damo_records.DamonSnapshot)
+        for snapshot, expected in zip(snapshots, record.snapshots):
+            self.assertEqual(snapshot.total_bytes, expected.total_bytes)
+            self.assertEqual(snapshot.regions, expected.regions)
+            self.assertEqual(snapshot.to_kvpairs(), expected.to_kvpairs())
+
+        region = snapshots[0].regions[1]
+        self.assertEqual(hash(region), hash(record.snapshots[0].regions[1]))
+        region.sz_filter_passed = 8
+        self.assertNotEqual(region, record.snapshots[0].regions[1])
+
+    def test_records_file_type(self):
+        record = _damo_records.DamonRecord(
+                0, 0, _damon.DamonIntervals(5000, 100000, 1000000), 0, None,
+                [])
+        record.snapshots = [
+                _damo_records.DamonSnapshot(100, 200, [
+                    _damon.DamonRegion(10, 20, 3, _damon.unit_samples, 5,
+                                       _damon.unit_aggr_intervals)], None)]
+        file_path = 'test_records_file_type.data'
+        for file_type in [_damo_records.file_type_json,
+                          _damo_records.file_type_json_compressed,
+                          _damo_records.file_type_columnar]:
+            _damo_records.write_damon_records([record], file_path, file_type)
+            self.assertEqual(
+                    _damo_records.records_file_type(file_path), file_type)
+            records, err = _damo_records.parse_records_files(
+                    [file_path, file_path])[1]
+            self.assertIsNone(err)
+            self.assertEqual(records[0].snapshots[0].regions,
+                             record.snapshots[0].regions)
+        with open(file_path, 'w') as f:
+            f.write('kdamond.0 123 [000] 10.0: damon:damon_aggregated: ...')
+        self.assertEqual(_damo_records.records_file_type(file_path),
+                         _damo_records.file_type_perf_script)
+        # starts with bytes that look like a zlib header
+        with open(file_path, 'w') as f:
+            f.write('x 123 [000] 10.0: damon:damon_aggregated: ...')
+        self.assertEqual(_damo_records.records_file_type(file_path),
+                         _damo_records.file_type_perf_script)
+        with open(file_path, 'wb') as f:
+            f.write(b'PERFILE2\x68\x00\x00\x00\x00\x00\x00\x00\xff')
+        self.assertEqual(_damo_records.records_file_type(file_path),
+                         _damo_records.file_type_perf_data)
+        os.remove(file_path)
+
+    def test_json_lines(self):
+        records = []
+        for target_id in range(3):
+            record = _damo_records.DamonRecord(
+                    0, 0, _damon.DamonIntervals(5000, 100000, 1000000), 0,
+                    target_id, [])
+            record.snapshots = [
+                    _damo_records.DamonSnapshot(100, 200, [
+                        _damon.DamonRegion(10, 20 + target_id, 3,
+                                           _damon.unit_samples, 5,
+                                           _damon.unit_aggr_intervals)],
+                        None)]
+            records.append(record)
+        file_path = 'test_json_lines.data'
+        writer = _damo_records.JsonLinesWriter(
+                file_path, to_kvpairs=lambda r: r.to_kvpairs(raw=True))
+        for record in records:
+            writer.append(record)
+        self.assertEqual(_damo_records.records_file_type(file_path),
+                         _damo_records.file_type_json_lines)
+
+        # conversion to json should be same to write_json()
+        json_path = 'test_json_lines.json'
+        _damo_records.convert_json_lines_to_json(file_path, json_path, False)
+        with open(json_path, 'r') as f:
+            converted = f.read()
+        _damo_records.write_json(records, json_path)
+        with open(json_path, 'r') as f:
+            self.assertEqual(converted, f.read())
+        _damo_records.convert_json_lines_to_json(file_path, json_path, True)
+        parsed, err = _damo_records.parse_records_file(json_path)
+        self.assertIsNone(err)
+        self.assertEqual([r.to_kvpairs() for r in parsed],
+                         [r.to_kvpairs() for r in records])
+        os.remove(json_path)
+
+        # truncated last line, e.g., due to a crash, should be ignored
+        writer.file.write('{"kdamond_idx": 0, "contex')
+        writer.file.flush()
+        parsed, err = _damo_records.parse_records_file(file_path)
+        self.assertIsNone(err)
+        self.assertEqual([r.to_kvpairs() for r in parsed],
+                         [r.to_kvpairs() for r in records])
+        writer.close()
+        os.remove(file_path)
+
+    def test_proc_sampler(self):
+        pid = os.getpid()
+        maps_path = '/proc/%d/maps' % pid
+        sampler = _damo_records.ProcSampler()
+        file_path = 'test_proc_sampler.vmas'
+        writer = _damo_records.JsonLinesWriter(file_path)
+        maps_contents = []
+        for i in range(5):
+            if i == 1:
+                mapped = mmap.mmap(-1, 4096 * 16)
+            elif i == 2:
+                mapped.close()
+            # the process is not sampled for a while at the fourth snapshot
+            pids = [] if i == 3 else [pid]
+            writer.append(_damo_records.ProcVmasSnapshot(pids, sampler))
+            maps_contents.append(sampler.last_contents.get(maps_path))
+        writer.close()
+        self.assertEqual(list(sampler.files.keys()), [maps_path])
+
+        snapshots = _damo_records.load_proc_vmas(file_path)
+        os.remove(file_path)
+        self.assertEqual(len(snapshots), 5)
+        self.assertEqual(snapshots[3].procvmas, [])
+        for snapshot, maps in zip(snapshots, maps_contents):
+            if maps is None:
+                continue
+            self.assertEqual(
+                    [v.to_kvpairs() for v in snapshot.procvmas[0].vmas],
+                    [v.to_kvpairs() for v in
+                     _damo_records.ProcVmas(pid, maps).vmas])
+        # only the difference is saved
+        self.assertTrue(len(snapshots[1].vmas_diffs[0][1]) > 0)
+        self.assertTrue(len(snapshots[1].vmas_diffs[0][1]) <
+                        len(snapshots[1].procvmas[0].vmas))
+
+        snapshot = _damo_records.MemFootprintsSnapshot([pid, pid], sampler)
+        self.assertEqual(list(sampler.files.keys()),
+                         ['/proc/%d/statm' % pid, '/proc/meminfo'])
+        self.assertEqual(snapshot.pids, [pid])
+        self.assertTrue(snapshot.columns['size'][0] > 0)
+        self.assertTrue(snapshot.sys_footprint.total > 0)
+        kvpairs = snapshot.to_kvpairs()
+        self.assertEqual(
+                _damo_records.MemFootprintsSnapshot.from_kvpairs(
+                    json.loads(json.dumps(kvpairs))).to_kvpairs(), kvpairs)
+        old_kvpairs = {'time': kvpairs['time'], 'footprints': [
+            {'pid': pid, 'footprint':
+             snapshot.footprints[pid].to_kvpairs()},
+            {'pid': None, 'footprint': kvpairs['sys_footprint']}]}
+        self.assertEqual(
+                _damo_records.MemFootprintsSnapshot.from_kvpairs(
+                    old_kvpairs).to_kvpairs(), kvpairs)
+        sampler.close()
+
+    def test_recording_producer(self):
+        write_queue = queue.Queue()
+        writer_thread = threading.Thread(
+                target=_damo_records.recording_writer_loop,
+                args=[write_queue])
+        writer_thread.start()
+        written = []
+        writer = _damo_records.JsonLinesWriter(None)
+        writer.append = written.append
+
+        sample_times = [0.0, 0.0, 0.35, 0.0]
+        def sample_fn(objs):
+            time.sleep(sample_times[len(written)])
+            objs.append(len(written))
+        start_time = time.time()
+        producer = _damo_records.RecordingProducer(
+                'test', 0.1, sample_fn, writer, start_time)
+        for i in range(len(sample_times)):
+            time.sleep(max(producer.next_deadline - time.time(), 0))
+            producer.sample(time.time(), write_queue)
+            # wait for the write, for sample_fn's use of 'written'
+            while len(written) < i + 1:
+                time.sleep(0.001)
+        write_queue.put(None)
+        writer_thread.join()
+
+        self.assertEqual(written, [0, 1, 2, 3])
+        self.assertEqual(producer.nr_samples, 4)
+        # the third sampling took more than three intervals
+        self.assertEqual(producer.nr_dropped, 3)
+        self.assertAlmostEqual(producer.next_deadline, start_time + 0.7,
+                               places=3)
+        self.assertTrue(producer.max_drift_sec < 0.1)
+
+    def test_sleep_recording(self):
+        class FakeHandle:
+            stop_requested = False
+        handle = FakeHandle()
+        threading.Timer(0.1, lambda: setattr(
+            handle, 'stop_requested', True)).start()
+        start_time = time.time()
+        _damo_records.sleep_recording(handle, start_time + 10)
+        self.assertTrue(time.time() - start_time < 1)
+
+    def test_merge_records(self):
+        records = []
+        for target_id, start_times in [
+                [0, [0, 20, 40]], [1, [0, 10]], [0, [10, 30, 50]],
+                [0, [60, 45]]]:
+            record = _damo_records.DamonRecord(0, 0, None, 0, target_id, [])
+            record.snapshots = [
+                    _damo_records.DamonSnapshot(t, t + 10, [], None)
+                    for t in start_times]
+            records.append(record)
+        merged = _damo_records.merge_records(records)
+        self.assertEqual(len(merged), 2)
+        self.assertEqual([s.start_time for s in merged[0].snapshots],
+                         [0, 10, 20, 30, 40, 45, 50, 60])
+        self.assertEqual([s.start_time for s in merged[1].snapshots],
+                         [0, 10])
+
+    def test_aggregate_snapshots(self):
+        def region(start, end, nr_accesses, age):
+            return _damon.DamonRegion(start, end, nr_accesses,
+                                      _damon.unit_samples, age,
+                                      _damon.unit_aggr_intervals)
+        snapshots = [
+                _damo_records.DamonSnapshot(0, 10, [
+                    region(1, 10, 5, 1), region(20, 30, 1, 1)], None),
+                _damo_records.DamonSnapshot(10, 20, [
+                    region(15, 25, 7, 2), region(1, 5, 2, 2),
+                    region(5, 10, 4, 2)], None)]
+        aggregated = _damo_records.aggregate_snapshots(snapshots)
+        self.assertEqual(aggregated.start_time, 0)
+        self.assertEqual(aggregated.end_time, 20)
+        self.assertEqual(
+                [(r.start, r.end, r.nr_accesses.samples, r.age.aggr_intervals)
+                 for r in aggregated.regions],
+                [(1, 10, 9, 1), (20, 30, 8, 1), (15, 20, 7, 2)])
+
     def test_filter_by_address(self):
         ranges = [[3, 5], [6, 9], [10, 12]]
         region = _damon.DamonRegion(7, 8)
@@ -118,6 +428,70 @@ class TestDamon(unittest.TestCase):
                     ranges), [_damon.DamonRegion(3, 5), _damon.DamonRegion(6,
                         9), _damon.DamonRegion(10, 12)])
 
+    def test_record_filter(self):
+        def test_records(columnar):
+            record = _damo_records.DamonRecord(
+                    0, 0, _damon.DamonIntervals(5000, 100000, 1000000), 0,
+                    None, [])
+            record.snapshots = []
+            for i in range(6):
+                regions = []
+                for j in range(10):
+                    regions.append(_damon.DamonRegion(
+                        100 * j, 100 * j + 10 * (j % 4 + 1),
+                        (i + j) % 20, _damon.unit_samples, i * j % 7,
+                        _damon.unit_aggr_intervals))
+                record.snapshots.append(_damo_records.DamonSnapshot(
+                    i * 100, (i + 1) * 100, regions, None))
+            if not columnar:
+                return [record]
+            return _damo_records.parse_json(json.dumps(
+                [record.to_kvpairs(raw=True)]))
+
+        def filter_sequentially(record_filter, records):
+            for record in records:
+                _damo_records.filter_by_pattern(
+                        record, record_filter.access_pattern)
+            if record_filter.address_ranges is not None:
+                _damo_records.filter_records_by_addr(
+                        records, record_filter.address_ranges)
+            if record_filter.snapshot_sz_ranges is not None:
+                _damo_records.filter_records_by_snapshot_sz(
+                        records, record_filter.snapshot_sz_ranges)
+            if record_filter.snapshot_time_ranges is not None:
+                _damo_records.filter_records_by_snapshot_time(
+                        records, record_filter.snapshot_time_ranges)
+            if record_filter.snapshot_index_ranges is not None:
+                _damo_records.filter_records_by_snapshot_indices(
+                        records, record_filter.snapshot_index_ranges)
+
+        patterns = [
+                _damon.DamosAccessPattern(
+                    [0, 1000], [0, 100], _damon.unit_percent, [0, 10000000],
+                    _damon.unit_usec),
+                _damon.DamosAccessPattern(
+                    [20, 1000], [20, 100], _damon.unit_percent,
+                    [0, 10000000], _damon.unit_usec),
+                _damon.DamosAccessPattern(
+                    [0, 1000], [99, 100], _damon.unit_percent,
+                    [0, 10000000], _damon.unit_usec)]
+        for pattern in patterns:
+            for addr_ranges in [None, [[15, 250], [650, 705]]]:
+                for sz_ranges in [None, [[0, 150]]]:
+                    for idx_ranges in [None, [[1, 2]]]:
+                        record_filter = _damo_records.RecordFilter(
+                                pattern, addr_ranges, sz_ranges, [[100, 600]],
+                                idx_ranges, None, None)
+                        expected = test_records(False)
+                        filter_sequentially(record_filter, expected)
+                        expected = [r.to_kvpairs() for r in expected]
+                        for columnar in [False, True]:
+                            records = test_records(columnar)
+                            record_filter.filter_records(records)
+                            self.assertEqual(
+                                    [r.to_kvpairs() for r in records],
+                                    expected)
+
     def test_parse_sort_bytes_ranges_input(self):
         self.assertEqual(
                 _damo_records.parse_sort_bytes_ranges_input([['1G', '2G']]),
@@ -213,6 +587,42 @@ class TestDamon(unittest.TestCase):
                 age_unit=_damon.unit_aggr_intervals),
              93214744389000, 12, 10))
 
+    def test_damon_trace_snapshots(self):
+        lines = [
+                '        kthreadd  264573 [002] 93214.744389:             '
+                'damon:damon_aggregated: target_id=12 nr_regions=2 '
+                '4096-8192: 3 4',
+                '        kthreadd  264573 [002] 93214.744389:             '
+                'damon:damon_aggregated: target_id=12 nr_regions=2 '
+                '8192-12288: 1 2',
+                '        kthreadd  264573 [002] 93214.844389:             '
+                'damon:damon_aggregated: target_id=12 nr_regions=2 '
+                '4096-12288: 0 5',
+                ]
+        read_lines = []
+
+        def consumed_lines():
+            for line in lines:
+                read_lines.append(line)
+                yield line
+
+        snapshots = _damo_records.damon_trace_snapshots(consumed_lines())
+        target_id, snapshot = next(snapshots)
+        self.assertEqual(len(read_lines), 2)
+        self.assertEqual(target_id, 12)
+        self.assertEqual(snapshot.start_time, None)
+        self.assertEqual(snapshot.end_time, 93214744389000)
+        self.assertEqual(snapshot.total_bytes, 8192)
+
+        # incomplete snapshot is yielded at the end
+        target_id, snapshot = next(snapshots)
+        self.assertEqual(snapshot.start_time, 93214744389000)
+        self.assertEqual(len(snapshot.regions), 1)
+        self.assertRaises(StopIteration, next, snapshots)
+
+        snapshots = _damo_records.damon_trace_snapshots(reversed(lines))
+        self.assertRaises(Exception, list, snapshots)
+
     def test_parse_damon_trace_intervals_tune(self):
         self.assertEqual(_damo_records.parse_damon_trace_intervals_tune(
             _damo_records.damon_trace_fields(
@@ -238,5 +648,155 @@ class TestDamon(unittest.TestCase):
                 '7473692672-8372879360: 3')),
             (False, None))
 
+    def test_snapshot_session(self):
+        calls = []
+        nr_schemes = [1]
+        def find_install_scheme(scheme):
+            calls.append('install')
+            nr_schemes[0] = 2
+            return True, [[0, 0, 1]], None, None
+        def update_get_snapshot_records(kidxs, idxs, total_sz_only, merge):
+            calls.append('update')
+            if nr_schemes[0] != 2:
+                return [], None
+            return ['record'], None
+        def current_kdamonds_interval_updated():
+            return [_damon.Kdamond(state='on', pid=None, contexts=[
+                _damon.DamonCtx(schemes=[_damon.Damos(), _damon.Damos()])])]
+        def commit(kdamonds):
+            calls.append('commit %d' %
+                         len(kdamonds[0].contexts[0].schemes))
+            return None
+
+        orig_fns = [_damo_records.find_install_scheme,
+                    _damo_records.update_get_snapshot_records,
+                    _damo_records.current_kdamonds_interval_updated,
+                    _damon.running_kdamond_idxs, _damon.any_kdamond_running,
+                    _damon.commit]
+        _damo_records.find_install_scheme = find_install_scheme
+        _damo_records.update_get_snapshot_records = \
+                update_get_snapshot_records
+        _damo_records.current_kdamonds_interval_updated = \
+                current_kdamonds_interval_updated
+        _damon.running_kdamond_idxs = lambda: [0]
+        _damon.any_kdamond_running = lambda: True
+        _damon.commit = commit
+
+        try:
+            _damo_records.start_snapshot_sessions()
+            for i in range(3):
+                records, err = _damo_records.get_snapshot_records(
+                        _damon.Damos(), False, False)
+                self.assertEqual(records, ['record'])
+                self.assertIsNone(err)
+            # removed by others
+            nr_schemes[0] = 1
+            records, err = _damo_records.get_snapshot_records(
+                    _damon.Damos(), False, False)
+            self.assertEqual(records, ['record'])
+            self.assertIsNone(_damo_records.stop_snapshot_sessions())
+        finally:
+            _damo_records.snapshot_sessions = None
+            [_damo_records.find_install_scheme,
+             _damo_records.update_get_snapshot_records,
+             _damo_records.current_kdamonds_interval_updated,
+             _damon.running_kdamond_idxs, _damon.any_kdamond_running,
+             _damon.commit] = orig_fns
+
+        self.assertEqual(calls, ['install', 'update', 'update', 'update',
+                                 'update', 'install', 'update', 'commit 1'])
+
+    def test_snapshot_session_moved_scheme(self):
+        calls = []
+        monitor_scheme = _damon.Damos(
+                access_pattern=_damon.DamosAccessPattern(), filters=[])
+        user_scheme = _damon.Damos(action='pageout')
+        def find_install_scheme(scheme):
+            calls.append('install')
+            return False, [[0, 0, 1]], None, None
+        def update_get_snapshot_records(kidxs, idxs, total_sz_only, merge):
+            calls.append('update %s' % idxs)
+            return ['record'], None
+        def current_kdamonds_interval_updated():
+            # others installed a scheme in front of the monitoring scheme
+            return [_damon.Kdamond(state='on', pid=None, contexts=[
+                _damon.DamonCtx(schemes=[
+                    user_scheme, copy.deepcopy(monitor_scheme)])])]
+
+        orig_fns = [_damo_records.find_install_scheme,
+                    _damo_records.update_get_snapshot_records,
+                    _damo_records.current_kdamonds_interval_updated,
+                    _damon.running_kdamond_idxs]
+        _damo_records.find_install_scheme = find_install_scheme
+        _damo_records.update_get_snapshot_records = \
+                update_get_snapshot_records
+        _damo_records.current_kdamonds_interval_updated = \
+                current_kdamonds_interval_updated
+        _damon.running_kdamond_idxs = lambda: [0]
+        try:
+            session = _damo_records.SnapshotSession(monitor_scheme)
+            session.scheme_idxs = [[0, 0, 0]]
+            records, err = session.snapshot_records(False, False)
+        finally:
+            [_damo_records.find_install_scheme,
+             _damo_records.update_get_snapshot_records,
+             _damo_records.current_kdamonds_interval_updated,
+             _damon.running_kdamond_idxs] = orig_fns
+        self.assertIsNone(err)
+        self.assertEqual(calls, ['install', 'update [[0, 0, 1]]'])
+
+    def test_snapshot_session_hide_scheme(self):
+        monitor_scheme = _damon.Damos(
+                access_pattern=_damon.DamosAccessPattern(), filters=[])
+        user_scheme = _damon.Damos(action='pageout')
+        session = _damo_records.SnapshotSession(monitor_scheme)
+        session.scheme_idxs = [[0, 0, 1]]
+        # others installed a scheme in front of the monitoring scheme
+        kdamonds = [_damon.Kdamond(state='on', pid=None, contexts=[
+            _damon.DamonCtx(schemes=[
+                user_scheme, copy.deepcopy(user_scheme),
+                copy.deepcopy(monitor_scheme)])])]
+        session.hide_scheme(kdamonds)
+        self.assertEqual(kdamonds[0].contexts[0].schemes,
+                         [user_scheme, user_scheme])
+        # others removed the monitoring scheme
+        session.hide_scheme(kdamonds)
+        self.assertEqual(kdamonds[0].contexts[0].schemes,
+                         [user_scheme, user_scheme])
+
+    def test_update_get_snapshot_records(self):
+        nr_updates = collections.Counter()
+        def update_schemes_tried_regions(kdamond_idxs):
+            nr_updates[kdamond_idxs[0]] += 1
+            # kdamond 1 fails on its first update
+            if kdamond_idxs == [1] and nr_updates[1] == 1:
+                return 'busy'
+            return None
+        def current_kdamond(kdamond_idx, tried_regions_of):
+            return _damon.Kdamond(state='on', pid=None, contexts=[
+                _damon.DamonCtx(schemes=[_damon.Damos(), _damon.Damos()])])
+
+        orig_fns = [_damon.update_schemes_stats,
+                    _damon.update_tuned_intervals,
+                    _damon.update_schemes_tried_regions,
+                    _damon.current_kdamond]
+        _damon.update_schemes_stats = lambda kdamond_idxs: None
+        _damon.update_tuned_intervals = lambda kdamond_idxs: None
+        _damon.update_schemes_tried_regions = update_schemes_tried_regions
+        _damon.current_kdamond = current_kdamond
+
+        try:
+            records, err = _damo_records.update_get_snapshot_records(
+                    [0, 1, 2], [[0, 0, 1], [1, 0, 1], [2, 0, 0]], False,
+                    False)
+        finally:
+            [_damon.update_schemes_stats, _damon.update_tuned_intervals,
+             _damon.update_schemes_tried_regions,
+             _damon.current_kdamond] = orig_fns
+        self.assertIsNone(err)
+        self.assertEqual([[r.kdamond_idx, r.context_idx, r.scheme_idx]
+                          for r in records], [[0, 0, 1], [1, 0, 1], [2, 0, 0]])
+        self.assertEqual(nr_updates, {0: 1, 1: 2, 2: 1})
+
 if __name__ == '__main__':
     unittest.main()
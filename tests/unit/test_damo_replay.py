@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_records
+import _damon
+import damo_replay
+
+class TestDamoReplay(unittest.TestCase):
+    def test_replay_memory(self):
+        memory = damo_replay.ReplayMemory(
+                [[4096 * 10, 4096 * 12], [4096 * 11, 4096 * 13],
+                 [100, 200], [4096 * 20, 4096 * 21 + 1]])
+        self.assertEqual(memory.starts, [0, 4096 * 10, 4096 * 20])
+        self.assertEqual(memory.offsets, [0, 4096, 4096 * 4])
+        self.assertEqual(memory.size, 4096 * 6)
+        self.assertEqual(memory.offset_of(150), 150)
+        self.assertEqual(memory.offset_of(4096 * 12 + 5), 4096 * 3 + 5)
+        self.assertEqual(memory.offset_of(4096 * 21), 4096 * 5)
+        self.assertEqual(memory.chunks(4),
+                         [[0, 4096 * 2], [4096 * 2, 4096 * 4],
+                          [4096 * 4, 4096 * 6]])
+        self.assertEqual(memory.chunks(100)[-1], [4096 * 5, 4096 * 6])
+
+        snapshot = _damo_records.DamonSnapshot(0, 100, [
+            _damon.DamonRegion(4096 * 10, 4096 * 13, 3, _damon.unit_samples,
+                               0, _damon.unit_aggr_intervals),
+            _damon.DamonRegion(4096 * 20, 4096 * 21, 7, _damon.unit_samples,
+                               0, _damon.unit_aggr_intervals),
+            _damon.DamonRegion(0, 4096, 0, _damon.unit_samples,
+                               0, _damon.unit_aggr_intervals)], 0)
+        self.assertEqual(
+                damo_replay.snapshot_accesses(
+                    snapshot, memory, [4096 * 2, 4096 * 6]),
+                [[7, 4096 * 2, 4096 * 3], [3, 0, 4096 * 2]])
+
+        buf = damo_replay.ReplayBuffer(damo_replay.sz_segment * 3)
+        seg_end = damo_replay.sz_segment
+        self.assertEqual(buf.touch(4096, 4096 * 3 + 1), 4096 * 2)
+        self.assertEqual(bytes(buf.segment(0)[2048:4096 * 4:4096]),
+                         b'\x00\x01\x01\x00')
+        self.assertEqual(buf.touch(seg_end - 4096, seg_end + 4096), 4096 * 2)
+        self.assertEqual(sorted(buf.segments.keys()), [0, 1])
+        self.assertEqual(bytes(buf.segment(1)[2048:4096 * 2:4096]),
+                         b'\x01\x00')
+
+    def test_run_workers(self):
+        def worker_fn(idx):
+            if idx == 1:
+                raise Exception('test failure')
+            stat = damo_replay.ReplayStat()
+            stat.nr_slices = idx + 1
+            return stat
+
+        stats, err = damo_replay.run_workers(1, worker_fn)
+        self.assertIsNone(err)
+        self.assertEqual([s.nr_slices for s in stats], [1])
+        stats, err = damo_replay.run_workers(3, worker_fn)
+        self.assertIsNone(stats)
+        self.assertEqual(err, 'replay workers 1 failed')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -118,6 +118,48 @@ class TestDamoShow(unittest.TestCase):
         self.assertEqual(damo_report_access.format_output(
             '<abs start time>', damo_report_access.record_formatters, fmt, record),
             '0 ns')
+        segments = damo_report_access.compile_template(
+                '[<abs start time>]\\n<abs start time><duration>',
+                damo_report_access.record_formatters)
+        self.assertEqual(len(segments), 5)
+        self.assertEqual(segments[1].keyword, '<abs start time>')
+        self.assertEqual(segments[2], ']\n')
+        self.assertEqual(damo_report_access.format_output(
+            '[<abs start time>]\\n<abs start time><unknown keyword>',
+            damo_report_access.record_formatters, fmt, record),
+            '[0 ns]\n0 ns<unknown keyword>')
+
+    def test_snapshot_metric_dist(self):
+        intervals = _damon.DamonIntervals('5ms', '100ms', '1s')
+        regions = []
+        for start, end, nr_accesses, age in [
+                [0, 10, 0, 3], [10, 40, 0, 1], [40, 50, 4, 2],
+                [50, 100, 0, 1]]:
+            region = _damon.DamonRegion(
+                    start, end, nr_accesses, _damon.unit_samples, age,
+                    _damon.unit_aggr_intervals)
+            region.nr_accesses.add_unset_unit(intervals)
+            region.age.add_unset_unit(intervals)
+            regions.append(region)
+        snapshot = _damo_records.DamonSnapshot(0, 100, regions, None)
+        fmt = damo_report_access.ReportFormat()
+        fmt.temperature_weights = [0, 100, 100]
+        dist = damo_report_access.get_snapshot_metric_dist(
+                snapshot, fmt, damo_report_access.get_idle_time, 100000,
+                False)
+        self.assertEqual(dist.metrics, [0, 200000, 400000])
+        self.assertEqual(dist.range_count(0, 200001), 90)
+        self.assertEqual(dist.range_count(1, 200000), 0)
+        self.assertEqual(dist.range_count(200000, 0), 0)
+        self.assertEqual(
+                dist.percentile_values([0, 10, 11, 90, 91, 100]),
+                [[0, 0], [10, 0], [11, 200000], [90, 200000],
+                 [91, 400000], [100, 400000]])
+        self.assertEqual(dist.percentile_values([50, 0]),
+                         [[50, 200000], [0, 200000]])
+        self.assertIs(damo_report_access.get_snapshot_metric_dist(
+            snapshot, fmt, damo_report_access.get_idle_time, 100000, False),
+            dist)
 
     def test_rescale(self):
         self.assertEqual(
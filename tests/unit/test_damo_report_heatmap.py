@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_records
+import _damon
+import damo_report_heatmap
+
+def heatmap_test_records(intervals):
+    snapshots = []
+    for i in range(10):
+        regions = []
+        for j in range(8):
+            regions.append(_damon.DamonRegion(
+                4096 * (j * 7), 4096 * (j * 7 + 3 + j % 4),
+                nr_accesses=(i * j) % 20, nr_accesses_unit=_damon.unit_samples,
+                age=j % 5, age_unit=_damon.unit_aggr_intervals,
+                sz_filter_passed=4096 * (j % 3)))
+        snapshots.append(_damo_records.DamonSnapshot(
+            i * 100000000, (i + 1) * 100000000, regions, 0))
+    record = _damo_records.DamonRecord(0, 0, intervals, None, None, None)
+    record.snapshots = snapshots
+    return [record]
+
+class TestDamoReportHeatmap(unittest.TestCase):
+    def test_heatmap_backends(self):
+        numpy = damo_report_heatmap.numpy
+        if numpy is None:
+            self.skipTest('numpy is not installed')
+
+        for intervals in [None, _damon.DamonIntervals('5ms', '100ms', '1s')]:
+            for df_passed in [False, True]:
+                outputs = []
+                for backend in [numpy, None]:
+                    damo_report_heatmap.numpy = backend
+                    heatmap = damo_report_heatmap.heatmap_from_records(
+                            heatmap_test_records(intervals),
+                            [0, 1000000000], [0, 4096 * 60], [13, 17],
+                            df_passed)
+                    outputs.append(
+                            [heatmap.fmt_gnuplot_str(False, False),
+                             heatmap.highest_lowest_heats()])
+                damo_report_heatmap.numpy = numpy
+                self.assertEqual(outputs[0], outputs[1])
+                self.assertTrue('NaN' in outputs[0][0])
+
+if __name__ == '__main__':
+    unittest.main()
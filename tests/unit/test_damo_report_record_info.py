@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import os
+import random
+import tempfile
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_records
+import _damon
+import damo_report_record_info
+
+def guide_test_records():
+    rand = random.Random(42)
+    snapshots = []
+    for i in range(20):
+        regions = []
+        addr = 4096 * rand.randint(1, 10)
+        for j in range(30):
+            start = addr + 4096 * rand.choice([0, 0, 1, 5])
+            addr = start + 4096 * rand.randint(1, 8)
+            regions.append(_damon.DamonRegion(
+                start, addr, nr_accesses=rand.randint(0, 20),
+                nr_accesses_unit=_damon.unit_samples, age=0,
+                age_unit=_damon.unit_aggr_intervals))
+        snapshots.append(_damo_records.DamonSnapshot(
+            i * 100000000, (i + 1) * 100000000, regions, 0))
+    record = _damo_records.DamonRecord(0, 0, None, None, None, None)
+    record.snapshots = snapshots
+    return [record]
+
+class TestDamoReportRecordInfo(unittest.TestCase):
+    def test_overlapping_sorted_regions(self):
+        rand = random.Random(42)
+        for i in range(100):
+            regions = []
+            for regions_ in [[], []]:
+                addr = 0
+                for j in range(rand.randint(0, 10)):
+                    start = addr + rand.randint(1, 10)
+                    addr = start + rand.randint(0, 10)
+                    regions_.append([start, addr])
+                regions.append(regions_)
+            self.assertEqual(
+                    _damo_records.overlapping_sorted_regions(
+                        *regions),
+                    _damo_records.overlapping_regions(*regions))
+
+    def test_guide_heats(self):
+        records = guide_test_records()
+        guide = _damo_records.get_guide_info(records)[0]
+        heats = {}
+        for snapshot in records[0].snapshots:
+            for region in snapshot.regions:
+                if region.nr_accesses.samples == 0:
+                    continue
+                for gregion in guide.contig_regions:
+                    if (region.end < gregion.start_addr or
+                            gregion.end_addr < region.start):
+                        continue
+                    key = gregion.start_addr
+                    heats[key] = heats.get(key, 0) + region.size() * \
+                            region.nr_accesses.samples
+        self.assertEqual(
+                {r.start_addr: r.heats for r in guide.contig_regions
+                 if r.heats is not None}, heats)
+
+    def test_guide_cache(self):
+        records = guide_test_records()
+        expected = [g.to_str(True) for g in
+                    _damo_records.get_guide_info(records)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for file_format in ['json', 'columnar']:
+                file_path = os.path.join(tmpdir, 'damon.%s' % file_format)
+                if file_format == 'columnar':
+                    _damo_records.write_columnar(records, file_path)
+                else:
+                    _damo_records.write_damon_records(
+                            records, file_path, file_format, None)
+                for i in range(2):
+                    guides = damo_report_record_info.get_guide_info_of_file(
+                            file_path, records)
+                    self.assertEqual([g.to_str(True) for g in guides],
+                                     expected)
+            self.assertTrue(os.path.isfile(
+                os.path.join(tmpdir, 'damon.json.guide')))
+            self.assertFalse(os.path.isfile(
+                os.path.join(tmpdir, 'damon.columnar.guide')))
+
+if __name__ == '__main__':
+    unittest.main()
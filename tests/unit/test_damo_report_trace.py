@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 # SPDX-License-Identifier: GPL-2.0
 
+import os
+import tempfile
 import unittest
 
 import _test_damo_common
@@ -61,5 +63,39 @@ class TestDamoReportTrace(unittest.TestCase):
             '99141.640633', '<...>-102481', 'damon:damon_aggregated',
             'target_id=0 nr_regions=12 4185931776-5007028224: 0 2022'.split()))
 
+    def test_trace_index(self):
+        lines = [
+                'damo_report_trace_output_format_version: 0',
+                'damo_report_trace_output_time: 1',
+                'damo_report_trace_output_tracer: perf']
+        for i in range(30):
+            event = ['damon_aggregated', 'damos_before_apply'][i % 10 // 8]
+            lines.append('kdamond.0  4452 [000] %.6f: damon:%s: %d' % (
+                100 + i * 0.1, event, i))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            record_file = os.path.join(tmp_dir, 'trace.out')
+            with open(record_file, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            index, err = damo_report_trace.get_trace_index(record_file)
+            self.assertIsNone(err)
+            self.assertEqual(index['tracer'], 'perf')
+            self.assertTrue(index['text_is_record'])
+            self.assertEqual(len(index['buckets']), 3)
+            self.assertEqual(index['events']['damon:damos_before_apply'],
+                             [0, 1, 2])
+            self.assertTrue(os.path.isfile(
+                damo_report_trace.trace_index_file_path(record_file)))
+
+            read_lines = [l for l in damo_report_trace.indexed_trace_lines(
+                index, record_file, ['damon:damon_aggregated'], [101, 102])
+                          if l != '']
+            self.assertEqual(read_lines, lines[13:23])
+
+            # changed record should be indexed again
+            with open(record_file, 'a') as f:
+                f.write('kdamond.0  4452 [000] 110.000000: damon:damon_aggregated: 30\n')
+            index, err = damo_report_trace.get_trace_index(record_file)
+            self.assertEqual(len(index['buckets']), 4)
+
 if __name__ == '__main__':
     unittest.main()
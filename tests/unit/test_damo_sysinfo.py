@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 # SPDX-License-Identifier: GPL-2.0
 
+import os
+import tempfile
 import unittest
 
 import _test_damo_common
@@ -32,5 +34,47 @@ class TestDamoSysinfo(unittest.TestCase):
         sinfo2 = _damo_sysinfo.SystemInfo.from_kvpairs(kvpairs)
         self.assertEqual(sinfo, sinfo2)
 
+        # cache files of old versions have all areas
+        del kvpairs['probed_areas']
+        sinfo2 = _damo_sysinfo.SystemInfo.from_kvpairs(kvpairs)
+        self.assertEqual(sinfo2.probed_areas, _damo_sysinfo.sysinfo_areas)
+
+    def test_probe_areas_lazily(self):
+        trace_feature = _damon_features.feature_of_name(
+                'trace/damon_aggregated')
+        nr_probes = {}
+        def trace_features():
+            nr_probes['trace'] = nr_probes.get('trace', 0) + 1
+            return [trace_feature], None
+        def interface_features():
+            nr_probes['interface'] = nr_probes.get('interface', 0) + 1
+            return []
+
+        orig_fns = [_damo_sysinfo.get_avail_damon_trace_features,
+                    _damo_sysinfo.get_avail_damon_interface_features,
+                    _damo_sysinfo.sysinfo_file_path]
+        _damo_sysinfo.get_avail_damon_trace_features = trace_features
+        _damo_sysinfo.get_avail_damon_interface_features = interface_features
+        with tempfile.TemporaryDirectory() as tmpdir:
+            _damo_sysinfo.sysinfo_file_path = os.path.join(tmpdir, 'sysinfo')
+            _damo_sysinfo.system_info = _damo_sysinfo.SystemInfo(
+                    damo_version='v3.1.1', kernel_version='6.18',
+                    avail_damon_features=[], probed_areas=[])
+            for i in range(2):
+                self.assertTrue(_damo_sysinfo.damon_feature_available(
+                    'trace/damon_aggregated'))
+                self.assertFalse(_damo_sysinfo.damon_feature_available(
+                    'interface/damon_sysfs'))
+            sinfo, err = _damo_sysinfo.read_sysinfo_file()
+        _damo_sysinfo.get_avail_damon_trace_features = orig_fns[0]
+        _damo_sysinfo.get_avail_damon_interface_features = orig_fns[1]
+        _damo_sysinfo.sysinfo_file_path = orig_fns[2]
+        _damo_sysinfo.system_info = None
+
+        self.assertEqual(nr_probes, {'trace': 1, 'interface': 1})
+        self.assertIsNone(err)
+        self.assertEqual(sinfo.probed_areas, ['trace', 'interface'])
+        self.assertEqual(sinfo.avail_damon_features, [trace_feature])
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,6 +4,8 @@
 import collections
 import copy
 import json
+import os
+import subprocess
 import unittest
 
 import _test_damo_common
@@ -364,5 +366,43 @@ class TestDamon(unittest.TestCase):
                 updated_targets, new_targets)
         self.assertEqual(result_targets, expect_targets)
 
+    def test_process_tree(self):
+        index = {'1': ['2', '3'], '2': ['4'], '4': ['5']}
+        self.assertEqual(_damon.get_childs_pids('1', index),
+                         ['2', '3', '4', '5'])
+        self.assertEqual(_damon.get_childs_pids(4, index), ['5'])
+        self.assertEqual(_damon.get_childs_pids('3', index), [])
+
+        child = subprocess.Popen(['sleep', '10'])
+        self.assertTrue('%d' % child.pid in
+                        _damon.get_childs_pids(os.getpid()))
+        self.assertTrue(_damon.pid_running(child.pid))
+        child.kill()
+        child.wait()
+        self.assertFalse(_damon.pid_running('%d' % child.pid))
+
+    def test_wait_kdamonds_state(self):
+        orig_nr_kdamonds = _damon.nr_kdamonds
+        orig_is_kdamond_running = _damon.is_kdamond_running
+        nr_reads = collections.Counter()
+        def is_kdamond_running(idx):
+            nr_reads[idx] += 1
+            # kdamond 'idx' is turned on after its 'idx + 1'-th check
+            return nr_reads[idx] > idx
+        _damon.nr_kdamonds = lambda: 3
+        _damon.is_kdamond_running = is_kdamond_running
+
+        try:
+            on_err = _damon.wait_kdamonds_turned_on()
+            on_nr_reads = dict(nr_reads)
+            off_err = _damon.wait_kdamonds_turned_off(timeout=0.05)
+        finally:
+            _damon.nr_kdamonds = orig_nr_kdamonds
+            _damon.is_kdamond_running = orig_is_kdamond_running
+        self.assertIsNone(on_err)
+        self.assertEqual(on_nr_reads, {0: 1, 1: 2, 2: 3})
+        self.assertTrue(_damon.last_kdamonds_wait_secs < 0.1)
+        self.assertIsNotNone(off_err)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 # SPDX-License-Identifier: GPL-2.0
 
+import os
+import tempfile
 import unittest
 
 import _test_damo_common
@@ -10,7 +12,143 @@ _test_damo_common.add_damo_dir_to_syspath()
 import _damo_fs
 import _damon_sysfs
 
+def write_files(root, files_content):
+    for filename, content in files_content.items():
+        filepath = os.path.join(root, filename)
+        if type(content) is dict:
+            os.mkdir(filepath)
+            write_files(filepath, content)
+        else:
+            with open(filepath, 'w') as f:
+                f.write(content)
+
+def scheme_files_content(nr_tried_regions):
+    tried_regions = {'total_bytes': '%d\n' % (nr_tried_regions * 4096)}
+    for i in range(nr_tried_regions):
+        tried_regions['%d' % i] = {
+                'start': '%d\n' % (i * 4096),
+                'end': '%d\n' % ((i + 1) * 4096),
+                'nr_accesses': '%d\n' % i, 'age': '%d\n' % i}
+    return {
+            'access_pattern': {
+                'age': {'max': '0\n', 'min': '0\n'},
+                'nr_accesses': {'max': '0\n', 'min': '0\n'},
+                'sz': {'max': '0\n', 'min': '0\n'}},
+            'action': 'stat\n',
+            'quotas': {
+                'bytes': '0\n', 'ms': '0\n', 'reset_interval_ms': '0\n',
+                'weights': {
+                    'age_permil': '0\n', 'nr_accesses_permil': '0\n',
+                    'sz_permil': '0\n'}},
+            'watermarks': {
+                'metric': 'none\n', 'high': '0\n', 'mid': '0\n',
+                'low': '0\n', 'interval_us': '0\n'},
+            'stats': {
+                'nr_applied': '0\n', 'nr_tried': '0\n', 'sz_applied': '0\n',
+                'sz_tried': '0\n', 'qt_exceeds': '0\n'},
+            'tried_regions': tried_regions}
+
 class TestDamonSysfs(unittest.TestCase):
+    def test_current_kdamonds_tried_regions_of(self):
+        kdamonds_content = {
+                'nr_kdamonds': '1\n',
+                '0': {
+                    'state': 'on\n', 'pid': '42\n',
+                    'contexts': {
+                        'nr_contexts': '1\n',
+                        '0': {
+                            'operations': 'paddr\n',
+                            'monitoring_attrs': {
+                                'intervals': {
+                                    'sample_us': '5000\n',
+                                    'update_us': '1000000\n',
+                                    'aggr_us': '100000\n'},
+                                'nr_regions': {
+                                    'max': '1000\n', 'min': '10\n'}},
+                            'targets': {'nr_targets': '0\n'},
+                            'schemes': {
+                                'nr_schemes': '2\n',
+                                '0': scheme_files_content(3),
+                                '1': scheme_files_content(5)}}}}}
+        orig_sysfs_root = _damon_sysfs.sysfs_root
+        # other tests could set dryrun mode
+        orig_dryrun_logs = _damo_fs.debug_dryrun_logs
+        _damo_fs.debug_dryrun_logs = None
+        with tempfile.TemporaryDirectory() as sysfs_root:
+            kdamonds_dir = os.path.join(
+                    sysfs_root, 'kernel/mm/damon/admin/kdamonds')
+            os.makedirs(kdamonds_dir)
+            write_files(kdamonds_dir, kdamonds_content)
+            _damon_sysfs.sysfs_root = sysfs_root
+
+            self.assertEqual(
+                    _damo_fs.read_files_concurrent(
+                        kdamonds_dir, _damon_sysfs.read_in_parallel),
+                    _damo_fs.read_files(kdamonds_dir))
+
+            for tried_regions_of, expected_nr_regions in [
+                    [None, [3, 5]], [[], [0, 0]], [[[0, 0, 1]], [0, 5]],
+                    [[[0, 0, 0], [0, 0, 1], [0, 1, 0]], [3, 5]]]:
+                kdamonds = _damon_sysfs.current_kdamonds(tried_regions_of)
+                schemes = kdamonds[0].contexts[0].schemes
+                self.assertEqual(
+                        [len(s.tried_regions) for s in schemes],
+                        expected_nr_regions)
+            self.assertEqual(
+                    [r.nr_accesses.samples for r in schemes[1].tried_regions],
+                    [0, 1, 2, 3, 4])
+        _damon_sysfs.sysfs_root = orig_sysfs_root
+        _damo_fs.debug_dryrun_logs = orig_dryrun_logs
+
+    def test_stage_only_changes(self):
+        kdamonds_content = {
+                'nr_kdamonds': '1\n',
+                '0': {
+                    'state': 'on\n', 'pid': '42\n',
+                    'contexts': {
+                        'nr_contexts': '1\n',
+                        '0': {
+                            'operations': 'paddr\n',
+                            'monitoring_attrs': {
+                                'intervals': {
+                                    'sample_us': '5000\n',
+                                    'update_us': '1000000\n',
+                                    'aggr_us': '100000\n'},
+                                'nr_regions': {
+                                    'max': '1000\n', 'min': '10\n'}},
+                            'targets': {'nr_targets': '0\n'},
+                            'schemes': {
+                                'nr_schemes': '2\n',
+                                '0': scheme_files_content(0),
+                                '1': scheme_files_content(0)}}}}}
+        orig_sysfs_root = _damon_sysfs.sysfs_root
+        orig_dryrun_logs = _damo_fs.debug_dryrun_logs
+        _damo_fs.debug_dryrun_logs = None
+        with tempfile.TemporaryDirectory() as sysfs_root:
+            kdamonds_dir = os.path.join(
+                    sysfs_root, 'kernel/mm/damon/admin/kdamonds')
+            os.makedirs(kdamonds_dir)
+            write_files(kdamonds_dir, kdamonds_content)
+            _damon_sysfs.sysfs_root = sysfs_root
+
+            kdamonds = _damon_sysfs.current_kdamonds()
+            self.assertIsNone(_damon_sysfs.stage_kdamonds(kdamonds))
+            self.assertEqual(_damon_sysfs.last_staging_nr_writes, 0)
+
+            kdamonds[0].contexts[0].schemes[1].quotas.time_ms = 10
+            self.assertIsNone(_damon_sysfs.stage_kdamonds(kdamonds))
+            self.assertEqual(_damon_sysfs.last_staging_nr_writes, 1)
+            ms_file = os.path.join(
+                    kdamonds_dir, '0/contexts/0/schemes/1/quotas/ms')
+            with open(ms_file, 'r') as f:
+                self.assertEqual(f.read(), '10')
+
+            self.assertIsNone(_damon_sysfs.stage_kdamonds(kdamonds))
+            self.assertEqual(_damon_sysfs.last_staging_nr_writes, 0)
+            self.assertEqual(_damo_fs.diff_writes_contents, None)
+        _damon_sysfs.sysfs_root = orig_sysfs_root
+        _damo_fs.debug_dryrun_logs = orig_dryrun_logs
+
     def test_json_kdamonds_staging(self):
         sysfs_dict = {
                 "nr_kdamonds": "1\n",